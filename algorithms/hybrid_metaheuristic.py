@@ -3,7 +3,7 @@ This module implements a hybrid metaheuristic algorithm combining Iterated Local
 to solve the Traveling Salesman Problem (TSP). The main function `ils_sa_tsp` reads a TSP instance from a TSPLIB file, 
 generates an initial solution, and iteratively improves it using perturbation and simulated annealing.
 Functions:
-    ils_sa_tsp(file_path, iterations, DEBUG=False):
+    ils_sa_tsp(file_path, iterations, DEBUG=False, backend="dict", use_cache=False, candidates_k=None, candidates_method="nearest", tour_backend="array", local_search_engine=None, seed=None, schedule="geometric"):
 Usage:
     To execute this module, run it as a script. It will test the `ils_sa_tsp` function using a sample TSP instance file.
     Example:
@@ -14,38 +14,78 @@ Usage:
 '''
 
 from .perturbation import *
-from .metaheuristic_algorithms import simulated_annealing
+from .metaheuristic_algorithms import simulated_annealing, SA_SCHEDULES
+from .local_search_algorithms import candidate_distances, LOCAL_SEARCH_ENGINES
+from .tour import make_tour
 from tqdm import tqdm
 
-from ..utils.algorithm_metrics import path_length
-from ..utils.path_utils import generate_random_path, nearest_neighbor_second
-from ..utils.tsp_utils import readTSPLIB
+from ..utils.algorithm_metrics import path_length, tour_cost, validate_path
+from ..utils.path_utils import generate_random_path, nearest_neighbor_second, make_rng
+from ..utils.tsp_instance import load_instance
+from ..utils.candidates import candidate_lists, DEFAULT_K
 
-def ils_sa_tsp(file_path, iterations, DEBUG=False):
+def ils_sa_tsp(file_path, iterations, DEBUG=False, backend="dict", use_cache=False, candidates_k=None, candidates_method="nearest", tour_backend="array", local_search_engine=None, seed=None, schedule="geometric"):
     """
     Perform Iterated Local Search (ILS) combined with Simulated Annealing (SA) to solve the Traveling Salesman Problem (TSP).
     Args:
-        file_path (str): Path to the TSPLIB file containing the TSP instance.
+        file_path (str or TSPInstance): Path to the TSPLIB file containing the TSP instance, or an already loaded TSPInstance.
         iterations (int): Number of iterations for the ILS algorithm.
         DEBUG (bool, optional): If True, print debug information. Default is False.
+        backend (str, optional): The distance backend used by readTSPLIB ("dict", "matrix", "memmap", "oracle" or "triangular"). Default is "dict".
+        use_cache (bool, optional): If True, the instance is loaded through the binary instance cache. Default is False.
+        candidates_k (int, optional): If given, the 2-opt moves of SA are restricted to the candidates_k nearest
+                                      neighbors of each node (see utils/candidates.py). Default is None.
+        candidates_method (str, optional): How the candidates are chosen: "nearest" (k nearest neighbors) or
+                                           "alpha" (alpha-nearness, dense backends only). Default is "nearest".
+        tour_backend (str, optional): The tour representation used by SA, "array" or "two_level" (see tour.py). Default is "array".
+        local_search_engine (str, optional): If given, every solution returned by SA is improved with this local search
+                                             (see LOCAL_SEARCH_ENGINES, e.g. "lin_kernighan"), on the candidate lists
+                                             (DEFAULT_K candidates if candidates_k is None). Default is None.
+        seed (int or numpy.random.Generator, optional): The seed of the random draws of SA and of the perturbations
+                                                        (see make_rng). Default is None.
+        schedule (str, optional): The cooling schedule of SA, "geometric" or "adaptive" (see simulated_annealing).
+                                  Default is "geometric".
     Returns:
         tuple: A tuple containing the best solution found and its path length.
     """
-    n, points, dist = readTSPLIB(file_path)
+    if local_search_engine is not None and local_search_engine not in LOCAL_SEARCH_ENGINES:
+        raise ValueError(f"Motore di local search non valido: {local_search_engine}. "
+                         f"Valori ammessi: {tuple(LOCAL_SEARCH_ENGINES)}")
+    if schedule not in SA_SCHEDULES:
+        raise ValueError(f"Schedule di raffreddamento non valida: {schedule}. Valori ammessi: {SA_SCHEDULES}")
+    rng = make_rng(seed)
+    instance = load_instance(file_path, backend=backend, use_cache=use_cache)
+    n, points, dist = instance.n, instance, instance.dist
+    candidates = candidate_lists(instance, candidates_k, candidates_method) if candidates_k else None
+    if local_search_engine is not None:
+        if candidates is None:
+            candidates = candidate_lists(instance, DEFAULT_K, candidates_method)
+        improve = LOCAL_SEARCH_ENGINES[local_search_engine]
+        neighbor_distances = candidate_distances(dist, candidates)
+
+    def polish(solution):
+        # Local search sul posto dopo il SA (solo se è stato scelto un motore)
+        if local_search_engine is None:
+            return solution
+        tour = make_tour(solution, tour_backend)
+        improve(tour, dist, candidates, None, neighbor_distances)
+        return tour.to_path()
 
     if n > 2000:
-        current_solution = generate_random_path(n)
+        current_solution = generate_random_path(n, rng)
     else:
-        current_solution = nearest_neighbor_second(points, dist)
+        current_solution = nearest_neighbor_second(points, dist, rng=rng)
     if DEBUG:
         print("Costo della soluzione iniziale:", path_length(dist, current_solution))
     
-    if not check_path(points, current_solution, DEBUG=True):
+    if not validate_path(points, current_solution, DEBUG=True):
         input("Nella funzione ils_sa_tsp, la soluzione iniziale non è valida. Premi invio per continuare...")
     best_solution = simulated_annealing(current_solution, dist, T_0=1000, alpha=0.95, max_iterations=10000,
-                        number_of_iterations_with_same_temperature=50, DEBUG=False, points=points)
+                        number_of_iterations_with_same_temperature=50, DEBUG=False, points=points, candidates=candidates,
+                        tour_backend=tour_backend, seed=rng, schedule=schedule)
+    best_solution = polish(best_solution)
 
-    if not check_path(points, current_solution, DEBUG=True):
+    if not validate_path(points, best_solution, DEBUG=True):
         input("Nella funzione ils_sa_tsp, la soluzione migliore non è valida. Premi invio per continuare...")
         
     no_improvement_count = 0
@@ -62,20 +102,22 @@ def ils_sa_tsp(file_path, iterations, DEBUG=False):
             phase = "soft"
 
         # Applica la perturbazione basata sulla fase
-        new_solution = perturbation(best_solution, phase, points, n)
+        new_solution = perturbation(best_solution, phase, points, n, rng=rng)
         #new_solution = multi_swap(best_solution, k=n//50 , points=points, DEBUG=False)
         
-        if not check_path(points, current_solution, DEBUG=True):
+        if not validate_path(points, new_solution, DEBUG=True):
             input("Nella funzione ils_sa_tsp, la soluzione perturbata non è valida. Premi invio per continuare...")
         # Applica SA alla soluzione perturbata
         new_solution = simulated_annealing(new_solution, dist, T_0=1000, alpha=0.95, max_iterations=10000,
-                        number_of_iterations_with_same_temperature=50, DEBUG=False, points=points)
+                        number_of_iterations_with_same_temperature=50, DEBUG=False, points=points, candidates=candidates,
+                        tour_backend=tour_backend, seed=rng, schedule=schedule)
+        new_solution = polish(new_solution)
         
-        if not check_path(points, current_solution, DEBUG=True):
+        if not validate_path(points, new_solution, DEBUG=True):
             input("Nella funzione ils_sa_tsp, la soluzione intemerdia del SA non è valida. Premi invio per continuare...")
         
         # Aggiorna la soluzione corrente e globale
-        if path_length(dist, new_solution) < path_length(dist, best_solution):
+        if tour_cost(dist, new_solution) < tour_cost(dist, best_solution):
             best_solution = new_solution
             no_improvement_count = 0  # Reset se troviamo un miglioramento
         else:
@@ -4,13 +4,49 @@ The algorithms include basic local search, optimized local search, and multistar
 Each algorithm attempts to find an optimized path by exploring neighboring solutions and iteratively improving the current solution.
 Functions:
     multistart_local_search(points, dist, path_function, neighborhood_function, num_starts=10)
-    local_search(dist, path, neighborhood_function):
+        Perform a multistart local search; points can also be a TSPInstance (with dist=None).
+    local_search(dist, path, neighborhood_function, strategy="best"):
         Perform a local search on a given path using a neighborhood function.
-    local_search_optimized(dist, path):
-        Perform a first improvement local search on a given path using the 2-opt neighborhood function.
+    local_search_optimized(dist, path, candidates=None, tour_backend="array"):
+        Perform a first improvement local search on a given path using the 2-opt neighborhood function,
+        optionally restricted to the candidate lists of the instance.
+    two_opt_dlb(dist, path, candidates, dirty=None, tour_backend="array"):
+        Perform a 2-opt local search with candidate lists and don't-look bits, in near-linear time per pass.
+    two_opt_dlb_tour(tour, dist, candidates, dirty=None, neighbor_distances=None, changed=None):
+        Same as two_opt_dlb, in place on a tour object, starting from the given dirty nodes.
+    or_opt(dist, path, candidates, dirty=None, tour_backend="array"):
+        Perform an Or-opt local search: segments of 1 to 3 nodes are moved, optionally reversed, next to a candidate.
+    or_opt_tour(tour, dist, candidates, dirty=None, neighbor_distances=None, changed=None):
+        Same as or_opt, in place on a tour object.
+    two_opt_or_opt_tour(tour, dist, candidates, dirty=None, neighbor_distances=None, changed=None):
+        Alternates two_opt_dlb_tour and or_opt_tour until the tour is optimal for both neighborhoods.
+    or_opt_delta(dist, p, s1, s2, nx, e, f):
+        Calculate the difference in cost of moving the segment s1..s2 between e and f, and the best orientation.
+    or_opt_move(tour, s1, s2, e, reverse=False):
+        Move in place the segment s1..s2 between e and next(e).
+    swap_delta(dist, px, x, nx, py, y, ny):
+        Calculate the difference in cost of swapping the nodes x and y, also when they are adjacent.
+    three_opt(dist, path, candidates, dirty=None, tour_backend="array"):
+        Perform a sequential 3-opt local search (2-opt and pure 3-opt moves) with candidate lists and don't-look bits.
+    three_opt_ls_tour(tour, dist, candidates, dirty=None, neighbor_distances=None, changed=None):
+        Same as three_opt, in place on a tour object.
+    three_opt_delta(dist, a, b, c, d, e, f, reconnection):
+        Calculate the difference in cost of a pure 3-opt move.
+    three_opt_move(tour, a, b, c, d, e, f, reconnection):
+        Apply in place a pure 3-opt move.
+    lin_kernighan(dist, path, candidates, dirty=None, tour_backend="array", max_depth=DEFAULT_LK_DEPTH, breadth=DEFAULT_LK_BREADTH):
+        Perform a Lin-Kernighan style variable-depth local search with candidate lists and don't-look bits.
+    lin_kernighan_tour(tour, dist, candidates, dirty=None, neighbor_distances=None, changed=None, max_depth=DEFAULT_LK_DEPTH, breadth=DEFAULT_LK_BREADTH):
+        Same as lin_kernighan, in place on a tour object.
+    lin_kernighan_or_opt_tour(tour, dist, candidates, dirty=None, neighbor_distances=None, changed=None):
+        Alternates lin_kernighan_tour and or_opt_tour.
+    candidate_distances(dist, candidates):
+        Returns the distances between each node and its candidates, and whether the lists are sorted by distance.
+    two_opt_delta(dist, a, b, c, d):
+        Calculate the difference in cost of the 2-opt move that replaces the edges (a, b) and (c, d) with (a, c) and (b, d).
     calculate_delta(dist, path, i, j):
         Calculate the difference in cost (delta) caused by reversing the segment between indices i and j.
-    local_search_with_counted_iterations(dist, path, neighborhood_function, iterations=100):
+    local_search_with_counted_iterations(dist, path, neighborhood_function, iterations=100, strategy="best"):
         Perform a local search on a given path for a specified number of iterations.
 Usage:
     To use this module, you need to have the necessary data files for the TSP instances and the optimal tour. 
@@ -19,44 +55,56 @@ Usage:
         python local_search_algorithms.py
     This will read the TSP instance from "TSP/data/TSP_instances/a280.tsp" and execute local search and multistart local search.
 '''
+from collections import deque
 from tqdm import tqdm
-from .neighborhood_generators import swap_neighborhood, two_opt_neighborhood
+import numpy as np
+from .neighborhood_generators import swap_neighborhood, two_opt_neighborhood, move_generator, BEST_MOVE_KERNELS
+from .tour import make_tour, reverse_segment
 
-from ..utils.algorithm_metrics import path_length
-from ..utils.path_utils import nearest_neighbor_random, nearest_neighbor_second, reset_points, print_in_square
+from ..utils.algorithm_metrics import path_length, tour_cost
+from ..utils.distances import is_matrix
+from ..utils.path_utils import nearest_neighbor_random, nearest_neighbor_second, print_in_square
+from ..utils.tsp_instance import resolve_instance
 from ..utils.tsp_utils import read_optimal_tour, readTSPLIB 
+
+# Profondità massima (numero di inversioni) di una mossa Lin-Kernighan e alternative provate ai primi livelli
+DEFAULT_LK_DEPTH = 30
+DEFAULT_LK_BREADTH = (5, 3)
+# Strategie di local_search sui generatori di mosse
+LOCAL_SEARCH_STRATEGIES = ("best", "first")
  
 def multistart_local_search(points, dist, path_function, neighborhood_function, num_starts=10):
     """
     Perform a multistart local search to find an optimized path.
+    The input is never modified, so the same points (or TSPInstance) can be shared by concurrent runs.
     Args:
-        points (list): A list of points representing the locations.
-        dist (function): A function to calculate the distance between two points.
+        points (list or TSPInstance): A list of points representing the locations, or a TSPInstance.
+        dist (dict or numpy.ndarray): The distances between the points. If None, the distances of the TSPInstance are used.
         path_function (function): A function to generate an initial path.
         neighborhood_function (function): A function to generate neighboring solutions.
         num_starts (int, optional): The number of random starts for the local search. Default is 10.
     Returns:
         tuple: A tuple containing the best path found and its length.
     """
+    _, dist = resolve_instance(points, dist)
     best_path = None
     best_length = float('inf')
     
     # Add a progress bar to show the progress on each start
     for _ in tqdm(range(num_starts), desc="Multistart Execution"):
         # Generate an initial path with the provided function
-        reset_points(points)
         initial_path = path_function(points, dist)
         
         # Perform local search with this initial path
         current_path = local_search(dist, initial_path, neighborhood_function)
-        current_length = path_length(dist, current_path)
+        current_length = tour_cost(dist, current_path)
         
         # Update the best path if the new solution is better
         if current_length < best_length:
             best_path = current_path
             best_length = current_length
     
-    return best_path, best_length
+    return best_path, path_length(dist, best_path)
 
 # Pseudocode:
 # Local Search (LS):
@@ -65,22 +113,32 @@ def multistart_local_search(points, dist, path_function, neighborhood_function,
 #  solution
 #  3. iterates 2. until no improvement can be found (local
 #  optimum)
-def local_search(dist, path, neighborhood_function):
+def local_search(dist, path, neighborhood_function, strategy="best"):
     """
     Performs a local search on a given path in the Traveling Salesman Problem (TSP) using a given neighborhood function.
     The local search iteratively explores the neighborhood of the current path and moves to the best neighbor that improves the path.
     The search continues until no neighbor can be found that improves the path.
+    The neighborhoods with a move generator (swap_neighborhood, two_opt_neighborhood, or directly swap_moves,
+    two_opt_moves, or_opt_moves, see neighborhood_generators.py) are explored lazily: each neighbor is a move with its
+    delta computed in O(1), and only the chosen move is applied, in place. The other neighborhood functions are
+    materialized as before.
     Args:
-        dist (dict): A dictionary containing the pairwise distances between nodes.
+        dist (dict or numpy.ndarray): The pairwise distances between nodes (dictionary keyed by (i, j) or dense matrix).
         path (list): A list representing the current path of nodes in the TSP.
-        neighborhood_function (function): A function that generates the neighborhood of a given path.
+        neighborhood_function (function): A function that generates the neighborhood of a given path, or a move generator.
+        strategy (str, optional): "best" (best improvement) or "first" (first improvement, only with the move
+                                  generators). Default is "best".
     Returns:
         list: The best path found during the local search.
     """
+    generator = move_generator(neighborhood_function)
+    if generator is not None:
+        return _local_search_moves(dist, path, generator, strategy)
+
     # Initialize the current path with the one provided as a parameter
     current_path = path
     # Calculate the length of the initial path
-    current_length = path_length(dist, path)
+    current_length = tour_cost(dist, path)
     # Set the 'improved' variable to True to enter the loop
     improved = True
     # This loop will continue as long as there are improvements in the path
@@ -91,7 +149,7 @@ def local_search(dist, path, neighborhood_function):
         
         # For each neighbor, calculate the path length
         for neighbor in neighbors:
-            neighbor_length = path_length(dist, neighbor)
+            neighbor_length = tour_cost(dist, neighbor)
             # If the neighbor has a shorter length (indicating an improvement)
             if neighbor_length < current_length:
                 # Update the path and its length
@@ -102,48 +160,143 @@ def local_search(dist, path, neighborhood_function):
     # Return the improved path at the end of the algorithm
     return current_path
 
-def local_search_optimized(dist, path):
+def _improving_move(moves, strategy):
+    """
+    Returns the best move with a negative delta ("best") or the first one ("first"), or None.
+    Among moves with the same delta the first one is chosen, like the materialized local search.
+    """
+    best = None
+    for move in moves:
+        if move.delta < 0 and (best is None or move.delta < best.delta):
+            if strategy == "first":
+                return move
+            best = move
+    return best
+
+def _local_search_moves(dist, path, generator, strategy="best", iterations=None):
+    """
+    Local search on a move generator: at each step the improving move chosen by the strategy is applied
+    in place to a copy of the path, and the neighborhood is generated again from the new path.
+    In best improvement on a dense backend, the neighborhoods with a vectorized kernel (BEST_MOVE_KERNELS)
+    are scanned with NumPy instead of move by move; the chosen move is the same.
+    Args:
+        iterations (int, optional): The maximum number of moves. If None, until a local optimum. Default is None.
+    """
+    if strategy not in LOCAL_SEARCH_STRATEGIES:
+        raise ValueError(f"Strategia non valida: {strategy}. Valori ammessi: {LOCAL_SEARCH_STRATEGIES}")
+    kernel = BEST_MOVE_KERNELS.get(generator) if strategy == "best" and is_matrix(dist) else None
+    current_path = list(path)
+    performed = 0
+    while iterations is None or performed < iterations:
+        if kernel is not None:
+            move = kernel(current_path, dist)
+        else:
+            move = _improving_move(generator(current_path, dist), strategy)
+        if move is None:
+            break
+        move.apply(current_path)
+        performed += 1
+    return current_path
+
+def local_search_optimized(dist, path, candidates=None, tour_backend="array"):
     """
     Performs a local search on a given path in the Traveling Salesman Problem (TSP) using a given neighborhood function.
     This version don't choose the best neighbor, but it applies the first improvement found.
     The search continues until no neighbor can be found that improves the path.
+    With the candidate lists, only the 2-opt moves that create an edge (path[i-1], c) with c among the nearest
+    neighbors of path[i-1] are evaluated: O(n * k) moves per pass instead of O(n²).
+    The path is handled as a tour object (see tour.py), so every move reverses a segment in place instead of rebuilding the list.
     Args:
-        dist (dict): A dictionary containing the pairwise distances between nodes.
+        dist (dict or numpy.ndarray): The pairwise distances between nodes (dictionary keyed by (i, j) or dense matrix).
         path (list): A list representing the current path of nodes in the TSP.
-        neighborhood_function (function): A function that generates the neighborhood of a given path.
+        candidates (numpy.ndarray, optional): The candidate lists of the instance (see utils/candidates.py).
+                                              If None, all the pairs (i, j) are evaluated. Default is None.
+        tour_backend (str, optional): The representation of the tour during the search, "array" (Tour) or
+                                      "two_level" (TwoLevelTour, faster reversals on very large instances).
+                                      Default is "array".
     Returns:
         list: The best path found during the local search.
     """
-    # Initialize the current path with the one provided as a parameter
-    current_path = path
-    # Calculate the length of the initial path
-    current_length = path_length(dist, path)
-    # Set the 'improved' variable to True to enter the loop
+    if candidates is not None:
+        return _local_search_candidates(dist, path, candidates, tour_backend)
+
+    # Il percorso è gestito come Tour: le inversioni avvengono sul posto, senza ricostruire la lista
+    tour = make_tour(path, tour_backend)
+    n = len(tour)
+    # Il giro può invertire il suo verso (si inverte il lato più corto del ciclo): il nodo che deve seguire
+    # il primo fissa il verso di lettura, così le posizioni i..j sono quelle della versione su liste
+    second = path[1]
     improved = True
 # in questa versione la funzione di vicinato è la 2-opt, è già inclusa ed è più efficiente
     while improved:
         improved = False
-        for i in range(1, len(path) - 1):  # Evita il primo nodo e l'ultimo
-            for j in range(i + 2, len(path) - 1):  # j è almeno due posizioni dopo i
+        order, flipped = _oriented_path(tour, second)  # Copia del giro corrente per le letture veloci
+        for i in range(1, n):  # Evita il primo nodo e l'ultimo
+            for j in range(i + 2, n):  # j è almeno due posizioni dopo i
 
                 # Calcola solo la differenza di costo
-                delta = calculate_delta(dist, current_path, i, j)
-                
+                delta = calculate_delta(dist, order, i, j)
+
                 if delta < 0:  # Miglioramento trovato
                     # Applica lo scambio solo se migliora
-                    current_path = (
-                        current_path[:i] +
-                        current_path[i:j+1][::-1] +
-                        current_path[j+1:]
-                    )
-                    current_length += delta  # Aggiorna la lunghezza
+                    if flipped:
+                        tour.reverse_path(order[j], order[i])  # Nel verso del giro il segmento va da j a i
+                    else:
+                        tour.reverse_path(order[i], order[j])
+                    if i == 1:
+                        second = order[j]
                     improved = True
                     break  # Esci dal ciclo per cercare di nuovo
             if improved:
                 break
 
     # Return the improved path at the end of the algorithm
-    return current_path
+    return _oriented_path(tour, second)[0]
+
+def _oriented_path(tour, second):
+    """
+    Restituisce il giro come lista chiusa che parte dal nodo iniziale e prosegue con second,
+    e True se la lista è letta nel verso opposto a quello del giro.
+    """
+    path = tour.to_path()
+    flipped = path[1] != second
+    if flipped:
+        path.reverse()
+    return path, flipped
+
+def _local_search_candidates(dist, path, candidates, tour_backend="array"):
+    """
+    First improvement 2-opt restricted to the candidate edges, see local_search_optimized.
+    For each node a, with b = next(a), the moves that add the edge (a, c) for a candidate c of a are evaluated;
+    an improving move is applied at once and the scan goes on from the next node.
+    """
+    neighbors = candidates.tolist()
+    tour = make_tour(path, tour_backend)
+    n = len(tour)
+    improved = True
+    while improved:
+        improved = False
+        for a in range(n):
+            b = tour.next(a)
+            for c in neighbors[a]:
+                d = tour.next(c)
+                if c == b or d == a:
+                    continue  # Archi adiacenti: la mossa non cambia il giro
+                delta = two_opt_delta(dist, a, b, c, d)
+                if delta < 0:
+                    tour.reverse_path(b, c)  # Nuovi archi (a, c) e (b, d)
+                    improved = True
+                    break
+
+    return tour.to_path()
+
+def two_opt_delta(dist, a, b, c, d):
+    """
+    Calcola la differenza di costo della mossa 2-opt che sostituisce gli archi (a, b) e (c, d) con (a, c) e (b, d).
+    """
+    delta = (dist[a,c] + dist[b,d]) - (dist[a,b] + dist[c,d])
+    # Con le matrici numpy il delta è uno scalare numpy: lo si converte per sommarlo esattamente ai costi interi
+    return delta.item() if isinstance(delta, np.generic) else delta
 
 def calculate_delta(dist, path, i, j):
     """
@@ -154,25 +307,633 @@ def calculate_delta(dist, path, i, j):
     c, d = path[j], path[j+1]   # Arco uscente prima dello scambio
     
     # Delta di costo
-    delta = (dist[a,c] + dist[b,d]) - (dist[a,b] + dist[c,d])
-    return delta
+    return two_opt_delta(dist, a, b, c, d)
+
+
+def candidate_distances(dist, candidates):
+    """
+    Returns the distances between each node and its candidates as lists of Python numbers, and whether every
+    list is sorted by distance (true for the nearest neighbor lists, not necessarily for the alpha-nearness ones).
+    """
+    if is_matrix(dist):
+        rows = np.arange(candidates.shape[0])[:, np.newaxis]
+        values = np.asarray(dist[rows, candidates])
+    else:
+        values = np.array([[dist[i, c] for c in row] for i, row in enumerate(candidates.tolist())])
+    sorted_lists = bool((np.diff(values, axis=1) >= 0).all())
+    return values.tolist(), sorted_lists
+
+def _initial_queue(n, dirty):
+    """
+    Returns the queue of the nodes to process and the flags of the nodes in the queue (the don't-look bits
+    are the nodes not in the queue): all the nodes, or only the dirty ones.
+    """
+    nodes = range(n) if dirty is None else dirty
+    queue = deque()
+    queued = bytearray(n)
+    for node in nodes:
+        if not queued[node]:
+            queued[node] = 1
+            queue.append(node)
+    return queue, queued
+
+def two_opt_dlb_tour(tour, dist, candidates, dirty=None, neighbor_distances=None, changed=None):
+    """
+    Improves a tour in place with the 2-opt neighborhood restricted to the candidate lists and driven by
+    don't-look bits, until it is 2-optimal with respect to the candidate edges.
+    Only the nodes in a queue are processed (at the beginning all of them, or only the dirty ones returned by a
+    perturbation). For a node a and both its tour neighbors b (successor and predecessor), the moves that add
+    an edge (a, c) with c among the candidates of a are evaluated; the candidates are skipped as soon as
+    d(a, c) >= d(a, b) (gain criterion), if the lists are sorted by distance. The first improving move is
+    applied in place and its four endpoints are queued again; a node that has no improving move leaves the
+    queue (its don't-look bit is set) until one of its edges changes.
+    Args:
+        tour (Tour or TwoLevelTour): The tour, improved in place.
+        dist (dict or dense backend): The distances between the nodes.
+        candidates (numpy.ndarray): The candidate lists of the instance (see utils/candidates.py).
+        dirty (iterable, optional): The nodes to start from. If None, all the nodes. Default is None.
+        neighbor_distances (tuple, optional): The result of candidate_distances, to reuse it between calls.
+        changed (set, optional): If given, the endpoints of the edges changed by the applied moves are added to it.
+    Returns:
+        float: The total gain (decrease of the cost of the tour).
+    """
+    neighbors = candidates.tolist()
+    neighbor_dist, sorted_lists = neighbor_distances or candidate_distances(dist, candidates)
+    queue, queued = _initial_queue(len(tour), dirty)
+    total_gain = 0
+
+    while queue:
+        a = queue.popleft()
+        queued[a] = 0
+        improved = False
+        for successor in (True, False):
+            b = tour.next(a) if successor else tour.prev(a)
+            d_ab = dist[a, b]
+            for c, d_ac in zip(neighbors[a], neighbor_dist[a]):
+                if d_ac >= d_ab:
+                    if sorted_lists:
+                        break  # Nessun candidato successivo può dare un guadagno
+                    continue
+                d = tour.next(c) if successor else tour.prev(c)
+                if c == b or d == a:
+                    continue
+                delta = d_ac + dist[b, d] - d_ab - dist[c, d]
+                if delta < 0:
+                    # Nuovi archi (a, c) e (b, d)
+                    if successor:
+                        tour.reverse_path(b, c)
+                    else:
+                        tour.reverse_path(a, d)
+                    total_gain -= delta
+                    if changed is not None:
+                        changed.update((a, b, c, d))
+                    for node in (a, b, c, d):
+                        if not queued[node]:
+                            queued[node] = 1
+                            queue.append(node)
+                    improved = True
+                    break
+            if improved:
+                break
+
+    return total_gain.item() if isinstance(total_gain, np.generic) else total_gain
+
+def two_opt_dlb(dist, path, candidates, dirty=None, tour_backend="array"):
+    """
+    2-opt local search with candidate lists and don't-look bits (see two_opt_dlb_tour).
+    Unlike local_search_optimized, it never restarts the scan after an improvement: each pass costs about
+    O(n * k), so a 2-opt local optimum (with respect to the candidate edges) is reached in near-linear time.
+    Args:
+        dist (dict or dense backend): The distances between the nodes.
+        path (list): The initial path (closed).
+        candidates (numpy.ndarray): The candidate lists of the instance (see utils/candidates.py).
+        dirty (iterable, optional): The nodes to start from. If None, all the nodes. Default is None.
+        tour_backend (str, optional): The tour representation, "array" or "two_level". Default is "array".
+    Returns:
+        list: The improved path.
+    """
+    tour = make_tour(path, tour_backend)
+    two_opt_dlb_tour(tour, dist, candidates, dirty)
+    return tour.to_path()
+
+def or_opt_delta(dist, p, s1, s2, nx, e, f):
+    """
+    Calcola la differenza di costo dello spostamento del segmento s1..s2 (preceduto da p e seguito da nx)
+    tra i nodi adiacenti e ed f, in O(1).
+    Returns:
+        tuple: Il delta migliore e True se conviene inserire il segmento invertito (e, s2, ..., s1, f).
+    """
+    forward = dist[e,s1] + dist[s2,f]
+    backward = dist[e,s2] + dist[s1,f]
+    delta = dist[p,nx] + min(forward, backward) - (dist[p,s1] + dist[s2,nx] + dist[e,f])
+    if isinstance(delta, np.generic):
+        delta = delta.item()
+    return delta, backward < forward
+
+def swap_delta(dist, px, x, nx, py, y, ny):
+    """
+    Calcola la differenza di costo dello scambio dei nodi x e y (px, nx e py, ny sono i loro vicini nel giro), in O(1).
+    Se i nodi sono adiacenti l'arco tra loro resta nel giro e cambiano solo i due archi esterni.
+    """
+    if nx == y:
+        # px x y ny diventa px y x ny
+        delta = dist[px,y] + dist[x,ny] - dist[px,x] - dist[y,ny]
+    elif ny == x:
+        # py y x nx diventa py x y nx
+        delta = dist[py,x] + dist[y,nx] - dist[py,y] - dist[x,nx]
+    else:
+        delta = (dist[px,y] + dist[y,nx] + dist[py,x] + dist[x,ny]) - (dist[px,x] + dist[x,nx] + dist[py,y] + dist[y,ny])
+    return delta.item() if isinstance(delta, np.generic) else delta
+
+def or_opt_move(tour, s1, s2, e, reverse=False):
+    """
+    Sposta sul posto il segmento s1..s2 (nel verso del giro) tra e ed f = next(e), che non devono appartenere
+    al segmento. Con M = next(s2)..e il giro p S M f diventa p M S f con due o tre inversioni:
+    S M -> M^r S^r -> M S^r (inserimento invertito) -> M S.
+    """
+    p, nx = tour.prev(s1), tour.next(s2)
+    tour.reverse_path(s1, e)             # p e..nx s2..s1 f
+    reverse_segment(tour, p, e, nx)      # p nx..e s2..s1 f
+    if not reverse:
+        reverse_segment(tour, e, s2, s1)  # p nx..e s1..s2 f
+
+def _or_opt_from(tour, dist, a, neighbors, neighbor_dist, sorted_lists):
+    """
+    Cerca uno spostamento Or-opt migliorativo di un segmento di 1-3 nodi che inizia o finisce in a e lo applica.
+    Returns:
+        tuple: Il delta e i nodi estremi degli archi modificati, oppure None se non c'è alcun miglioramento.
+    """
+    n = len(tour)
+    for length in range(1, min(3, n - 5) + 1):
+        for backward in ((False,) if length == 1 else (False, True)):
+            segment = [a]
+            for _ in range(length - 1):
+                segment.append(tour.prev(segment[-1]) if backward else tour.next(segment[-1]))
+            s1, s2 = (segment[-1], a) if backward else (a, segment[-1])
+            p, nx = tour.prev(s1), tour.next(s2)
+            removal_gain = dist[p,s1] + dist[s2,nx] - dist[p,nx]
+            if removal_gain <= 0:
+                continue
+            for end in (s1, s2) if length > 1 else (s1,):
+                for c, d_c in zip(neighbors[end], neighbor_dist[end]):
+                    if d_c >= removal_gain:
+                        if sorted_lists:
+                            break  # Il nuovo arco (end, c) costa già più di quanto si guadagna rimuovendo il segmento
+                        continue
+                    if c in segment:
+                        continue
+                    for e, f in ((c, tour.next(c)), (tour.prev(c), c)):
+                        if e in segment or f in segment:
+                            continue
+                        delta, reverse = or_opt_delta(dist, p, s1, s2, nx, e, f)
+                        if delta < 0:
+                            or_opt_move(tour, s1, s2, e, reverse)
+                            return delta, (p, nx, s1, s2, e, f)
+    return None
+
+def or_opt_tour(tour, dist, candidates, dirty=None, neighbor_distances=None, changed=None):
+    """
+    Improves a tour in place with the Or-opt neighborhood, driven by candidate lists and don't-look bits.
+    For every node in the queue, the segments of 1, 2 or 3 nodes that start or end in it are removed and
+    reinserted (in the best orientation) next to a candidate of one of their endpoints, if the cost decreases.
+    The deltas are computed in O(1) and the moves are applied in place with reversals.
+    Args:
+        tour (Tour or TwoLevelTour): The tour, improved in place.
+        dist (dict or dense backend): The distances between the nodes.
+        candidates (numpy.ndarray): The candidate lists of the instance (see utils/candidates.py).
+        dirty (iterable, optional): The nodes to start from. If None, all the nodes. Default is None.
+        neighbor_distances (tuple, optional): The result of candidate_distances, to reuse it between calls.
+        changed (set, optional): If given, the endpoints of the edges changed by the applied moves are added to it.
+    Returns:
+        float: The total gain (decrease of the cost of the tour).
+    """
+    neighbors = candidates.tolist()
+    neighbor_dist, sorted_lists = neighbor_distances or candidate_distances(dist, candidates)
+    queue, queued = _initial_queue(len(tour), dirty)
+    total_gain = 0
+
+    while queue:
+        a = queue.popleft()
+        queued[a] = 0
+        result = _or_opt_from(tour, dist, a, neighbors, neighbor_dist, sorted_lists)
+        if result is None:
+            continue
+        delta, touched = result
+        total_gain -= delta
+        if changed is not None:
+            changed.update(touched)
+        # Il nodo a viene riesaminato insieme agli estremi degli archi modificati
+        for node in (a,) + touched:
+            if not queued[node]:
+                queued[node] = 1
+                queue.append(node)
+
+    return total_gain
+
+def or_opt(dist, path, candidates, dirty=None, tour_backend="array"):
+    """
+    Or-opt local search: moves segments of 1 to 3 nodes, optionally reversed, next to one of the candidates
+    of their endpoints (see or_opt_tour). It's cheap and it improves the 2-opt local optima.
+    Args:
+        dist (dict or dense backend): The distances between the nodes.
+        path (list): The initial path (closed).
+        candidates (numpy.ndarray): The candidate lists of the instance (see utils/candidates.py).
+        dirty (iterable, optional): The nodes to start from. If None, all the nodes. Default is None.
+        tour_backend (str, optional): The tour representation, "array" or "two_level". Default is "array".
+    Returns:
+        list: The improved path.
+    """
+    tour = make_tour(path, tour_backend)
+    or_opt_tour(tour, dist, candidates, dirty)
+    return tour.to_path()
+
+def two_opt_or_opt_tour(tour, dist, candidates, dirty=None, neighbor_distances=None, changed=None):
+    """
+    Alternates two_opt_dlb_tour and or_opt_tour, each one restarting from the nodes changed by the other,
+    until the tour is a local optimum for both neighborhoods.
+    Args:
+        See or_opt_tour.
+    Returns:
+        float: The total gain (decrease of the cost of the tour).
+    """
+    neighbor_distances = neighbor_distances or candidate_distances(dist, candidates)
+    total_gain = 0
+    active = dirty
+    while True:
+        touched = set()
+        total_gain += two_opt_dlb_tour(tour, dist, candidates, active, neighbor_distances, touched)
+        moved = set()
+        or_nodes = None if active is None else set(active) | touched
+        total_gain += or_opt_tour(tour, dist, candidates, or_nodes, neighbor_distances, moved)
+        if changed is not None:
+            changed.update(touched)
+            changed.update(moved)
+        if not moved:
+            return total_gain
+        active = moved
+
+def three_opt_delta(dist, a, b, c, d, e, f, reconnection):
+    """
+    Calcola la differenza di costo della mossa 3-opt pura che rimuove gli archi (a, b), (c, d) ed (e, f),
+    incontrati in quest'ordine lungo il giro, e ricollega i segmenti S1 = b..c ed S2 = d..e secondo reconnection:
+        1: a S2 S1 f      (inserimento di segmento, or-3opt)
+        2: a S2 S1^r f
+        3: a S2^r S1 f
+        4: a S1^r S2^r f
+    """
+    if reconnection == 1:
+        added = dist[a,d] + dist[e,b] + dist[c,f]
+    elif reconnection == 2:
+        added = dist[a,d] + dist[e,c] + dist[b,f]
+    elif reconnection == 3:
+        added = dist[a,e] + dist[d,b] + dist[c,f]
+    else:
+        added = dist[a,c] + dist[b,e] + dist[d,f]
+    delta = added - (dist[a,b] + dist[c,d] + dist[e,f])
+    return delta.item() if isinstance(delta, np.generic) else delta
+
+def three_opt_move(tour, a, b, c, d, e, f, reconnection):
+    """
+    Applica sul posto la mossa 3-opt pura descritta in three_opt_delta, con due o tre inversioni.
+    I nodi devono seguire il verso corrente del giro (b = next(a), d = next(c), f = next(e)).
+    """
+    if reconnection == 1:
+        or_opt_move(tour, b, c, e)
+    elif reconnection == 2:
+        or_opt_move(tour, b, c, e, reverse=True)
+    elif reconnection == 3:
+        tour.reverse_path(b, e)            # a e..d c..b f
+        reverse_segment(tour, d, c, b)     # a e..d b..c f
+    else:
+        reverse_segment(tour, a, b, c)     # a c..b d..e f
+        reverse_segment(tour, b, d, e)     # a c..b e..d f
+
+# Con il giro letto all'indietro S1 ed S2 si scambiano: le ricongiunzioni 2 e 3 si scambiano, le altre no
+_MIRRORED_RECONNECTION = {1: 1, 2: 3, 3: 2, 4: 4}
+
+def _three_opt_from(tour, dist, t1, neighbors, neighbor_dist, sorted_lists):
+    """
+    Cerca una mossa 2-opt o 3-opt pura sequenziale migliorativa che rimuove uno dei due archi di t1 e la applica.
+    Si aggiunge l'arco (t2, t3), si rimuove (t3, t4), si aggiunge (t4, t5), si rimuove (t5, t6) e si chiude con
+    (t6, t1); t3 e t5 sono candidati di t2 e t4 e ogni guadagno parziale deve restare positivo.
+    Returns:
+        tuple: Il delta e i nodi estremi degli archi modificati, oppure None se non c'è alcun miglioramento.
+    """
+    for forward in (True, False):
+        if forward:
+            succ, pred, between = tour.next, tour.prev, tour.between
+        else:
+            succ, pred = tour.prev, tour.next
+            between = lambda x, y, z: tour.between(z, y, x)
+        t2 = succ(t1)
+        d12 = dist[t1,t2]
+        for t3, d23 in zip(neighbors[t2], neighbor_dist[t2]):
+            g1 = d12 - d23
+            if g1 <= 0:
+                if sorted_lists:
+                    break
+                continue
+            if t3 == t1 or t3 == t2:
+                continue
+            for t4 in (succ(t3), pred(t3)):
+                g1_open = g1 + dist[t3,t4]
+                if t4 != succ(t3):
+                    # Chiusura 2-opt: t1 t2..t4 t3 diventa t1 t4..t2 t3
+                    delta = dist[t4,t1] - g1_open
+                    if delta < 0 and t4 != t2:
+                        reverse_segment(tour, t1, t2, t4)
+                        return (delta.item() if isinstance(delta, np.generic) else delta), (t1, t2, t3, t4)
+                for t5, d45 in zip(neighbors[t4], neighbor_dist[t4]):
+                    g2 = g1_open - d45
+                    if g2 <= 0:
+                        if sorted_lists:
+                            break
+                        continue
+                    if t5 == t3:
+                        continue
+                    if t4 == succ(t3):
+                        # t3 = e, t4 = f: t5 è c (ricongiunzione 1) o d (ricongiunzione 4) dentro t2..t3
+                        if not between(t2, t5, t3):
+                            continue
+                        options = [((t1, t2, t5, succ(t5), t3, t4), 1)]
+                        if t5 != t2:
+                            options.append(((t1, t2, pred(t5), t5, t3, t4), 4))
+                    elif between(t2, t5, t4):
+                        # t3 = f, t4 = e, t5 = c dentro t2..t4 (ricongiunzione 2)
+                        if t5 == t4:
+                            continue
+                        options = [((t1, t2, t5, succ(t5), t4, t3), 2)]
+                    else:
+                        # t3 = d, t4 = c, t5 = f dopo t3 (ricongiunzione 3)
+                        options = [((t1, t2, t4, t3, pred(t5), t5), 3)]
+                    for nodes, reconnection in options:
+                        if not forward:
+                            nodes, reconnection = nodes[::-1], _MIRRORED_RECONNECTION[reconnection]
+                        delta = three_opt_delta(dist, *nodes, reconnection)
+                        if delta < 0:
+                            three_opt_move(tour, *nodes, reconnection)
+                            return delta, nodes
+    return None
+
+def three_opt_ls_tour(tour, dist, candidates, dirty=None, neighbor_distances=None, changed=None):
+    """
+    Improves a tour in place with the sequential 3-opt neighborhood, driven by candidate lists and don't-look bits.
+    From every node t1 in the queue both its edges are tried as the first removed edge; the search goes on
+    like Lin-Kernighan with depth 3, adding only edges towards a candidate and keeping the partial gain positive.
+    The 2-opt closures and the four pure 3-opt reconnections (see three_opt_delta), including the segment
+    insertion (or-3opt), are evaluated in O(1) and the first improving move is applied in place.
+    Args:
+        tour (Tour or TwoLevelTour): The tour, improved in place.
+        dist (dict or dense backend): The distances between the nodes.
+        candidates (numpy.ndarray): The candidate lists of the instance (see utils/candidates.py).
+        dirty (iterable, optional): The nodes to start from. If None, all the nodes. Default is None.
+        neighbor_distances (tuple, optional): The result of candidate_distances, to reuse it between calls.
+        changed (set, optional): If given, the endpoints of the edges changed by the applied moves are added to it.
+    Returns:
+        float: The total gain (decrease of the cost of the tour).
+    """
+    neighbors = candidates.tolist()
+    neighbor_dist, sorted_lists = neighbor_distances or candidate_distances(dist, candidates)
+    queue, queued = _initial_queue(len(tour), dirty)
+    total_gain = 0
+
+    while queue:
+        a = queue.popleft()
+        queued[a] = 0
+        result = _three_opt_from(tour, dist, a, neighbors, neighbor_dist, sorted_lists)
+        if result is None:
+            continue
+        delta, touched = result
+        total_gain -= delta
+        if changed is not None:
+            changed.update(touched)
+        for node in (a,) + tuple(touched):
+            if not queued[node]:
+                queued[node] = 1
+                queue.append(node)
 
+    return total_gain
 
-def local_search_with_counted_iterations(dist, path, neighborhood_function, iterations=100):
+def three_opt(dist, path, candidates, dirty=None, tour_backend="array"):
+    """
+    Sequential 3-opt local search with candidate lists and don't-look bits (see three_opt_ls_tour).
+    Slower than two_opt_dlb, but its local optima are clearly better.
+    Args:
+        dist (dict or dense backend): The distances between the nodes.
+        path (list): The initial path (closed).
+        candidates (numpy.ndarray): The candidate lists of the instance (see utils/candidates.py).
+        dirty (iterable, optional): The nodes to start from. If None, all the nodes. Default is None.
+        tour_backend (str, optional): The tour representation, "array" or "two_level". Default is "array".
+    Returns:
+        list: The improved path.
+    """
+    tour = make_tour(path, tour_backend)
+    three_opt_ls_tour(tour, dist, candidates, dirty)
+    return tour.to_path()
+
+def _lin_kernighan_step(tour, dist, t1, t2, gain, level, state):
+    """
+    Un livello della ricerca di lin_kernighan_tour. Il giro corrente contiene l'arco (t1, t2) da rimuovere e il
+    guadagno parziale gain; per ogni t3 candidato di t2 (al più state["breadth"][level - 1] alternative, scelte
+    massimizzando d(t3, t4) - d(t2, t3)) si applica la inversione che aggiunge (t2, t3) e rimuove (t3, t4),
+    ottenendo di nuovo un giro chiuso con l'arco (t4, t1), e si prosegue dal nuovo arco (t1, t4).
+    Returns:
+        bool: True se è stato trovato un giro migliore (le inversioni restano applicate).
+    """
+    neighbors, neighbor_dist, sorted_lists = state["neighbors"], state["neighbor_dist"], state["sorted"]
+    added, removed, flips, best = state["added"], state["removed"], state["flips"], state["best"]
+    # Nel verso in cui t2 segue t1, t4 deve precedere t3 perché la chiusura (t4, t1) dia un giro
+    pred = tour.prev if tour.next(t1) == t2 else tour.next
+
+    alternatives = []
+    for t3, d23 in zip(neighbors[t2], neighbor_dist[t2]):
+        open_gain = gain - d23
+        if open_gain <= 0:
+            if sorted_lists:
+                break  # Criterio del guadagno: nessun candidato successivo può dare un guadagno positivo
+            continue
+        if t3 == t1 or (min(t2, t3), max(t2, t3)) in removed:
+            continue
+        t4 = pred(t3)
+        if t4 == t2 or (min(t3, t4), max(t3, t4)) in added:
+            continue
+        alternatives.append((open_gain + dist[t3,t4], t3, t4))
+    alternatives.sort(reverse=True)
+    breadth = state["breadth"]
+    width = breadth[level - 1] if level <= len(breadth) else 1
+
+    for new_gain, t3, t4 in alternatives[:width]:
+        reverse_segment(tour, t1, t2, t4)  # t1 t2..t4 t3 -> t1 t4..t2 t3
+        flips.append((t2, t3, t4))
+        added.add((min(t2, t3), max(t2, t3)))
+        removed.add((min(t3, t4), max(t3, t4)))
+        closed_gain = new_gain - dist[t4,t1]
+        if closed_gain > best[0]:
+            best[0], best[1] = closed_gain, len(flips)
+        if level < state["max_depth"]:
+            if _lin_kernighan_step(tour, dist, t1, t4, new_gain, level + 1, state):
+                return True
+        if best[0] > 0:
+            return True  # Il miglioramento è su questo livello: le inversioni successive vengono annullate dal chiamante
+        # Nessun miglioramento: si annulla l'inversione e si prova l'alternativa seguente
+        reverse_segment(tour, t1, t4, t2)
+        flips.pop()
+        added.discard((min(t2, t3), max(t2, t3)))
+        removed.discard((min(t3, t4), max(t3, t4)))
+    return False
+
+def _lin_kernighan_from(tour, dist, t1, state):
+    """
+    Cerca una mossa Lin-Kernighan migliorativa che rimuove uno dei due archi di t1 e la applica.
+    Returns:
+        tuple: Il delta e i nodi estremi degli archi modificati, oppure None se non c'è alcun miglioramento.
+    """
+    for t2 in (tour.next(t1), tour.prev(t1)):
+        state["added"], state["removed"] = set(), {(min(t1, t2), max(t1, t2))}
+        state["flips"], state["best"] = [], [0, 0]
+        gain = dist[t1,t2]
+        found = _lin_kernighan_step(tour, dist, t1, t2, gain, 1, state)
+        flips, best = state["flips"], state["best"]
+        # Si annullano le inversioni applicate dopo il giro migliore, dall'ultima
+        while len(flips) > best[1]:
+            f2, _, f4 = flips.pop()
+            reverse_segment(tour, t1, f4, f2)
+        if found and best[0] > 0:
+            touched = {t1}
+            for nodes in flips:
+                touched.update(nodes)
+            delta = -best[0]
+            return (delta.item() if isinstance(delta, np.generic) else delta), tuple(touched)
+    return None
+
+def lin_kernighan_tour(tour, dist, candidates, dirty=None, neighbor_distances=None, changed=None,
+                       max_depth=DEFAULT_LK_DEPTH, breadth=DEFAULT_LK_BREADTH):
+    """
+    Improves a tour in place with a Lin-Kernighan style variable-depth search, driven by candidate lists
+    and don't-look bits.
+    From every node t1 in the queue both its edges (t1, t2) are tried as the first removed edge. At each level
+    an edge (t2, t3) towards a candidate of t2 is added and the edge (t3, t4) that closes the tour is removed,
+    applying the corresponding reversal: the tour is always a valid cycle, and the closing edge (t4, t1) gives
+    the gain of stopping at that level. The search goes deeper while the partial gain stays positive, up to
+    max_depth levels; the added edges are never removed and the removed ones are never added back. The
+    alternatives are ordered by d(t3, t4) - d(t2, t3) and only the first breadth[level - 1] are tried (one
+    beyond the given levels). At the end the tour is brought back to the best level with the reversals undone.
+    Args:
+        tour (Tour or TwoLevelTour): The tour, improved in place.
+        dist (dict or dense backend): The distances between the nodes.
+        candidates (numpy.ndarray): The candidate lists of the instance (see utils/candidates.py).
+        dirty (iterable, optional): The nodes to start from. If None, all the nodes. Default is None.
+        neighbor_distances (tuple, optional): The result of candidate_distances, to reuse it between calls.
+        changed (set, optional): If given, the endpoints of the edges changed by the applied moves are added to it.
+        max_depth (int, optional): The maximum number of reversals of a move. Default is DEFAULT_LK_DEPTH.
+        breadth (tuple, optional): The number of alternatives tried at the first levels. Default is DEFAULT_LK_BREADTH.
+    Returns:
+        float: The total gain (decrease of the cost of the tour).
+    """
+    neighbor_dist, sorted_lists = neighbor_distances or candidate_distances(dist, candidates)
+    state = {
+        "neighbors": candidates.tolist(),
+        "neighbor_dist": neighbor_dist,
+        "sorted": sorted_lists,
+        "max_depth": max_depth,
+        "breadth": breadth,
+    }
+    queue, queued = _initial_queue(len(tour), dirty)
+    total_gain = 0
+
+    while queue:
+        a = queue.popleft()
+        queued[a] = 0
+        result = _lin_kernighan_from(tour, dist, a, state)
+        if result is None:
+            continue
+        delta, touched = result
+        total_gain -= delta
+        if changed is not None:
+            changed.update(touched)
+        for node in (a,) + touched:
+            if not queued[node]:
+                queued[node] = 1
+                queue.append(node)
+
+    return total_gain
+
+def lin_kernighan(dist, path, candidates, dirty=None, tour_backend="array", max_depth=DEFAULT_LK_DEPTH,
+                  breadth=DEFAULT_LK_BREADTH):
+    """
+    Lin-Kernighan style local search with candidate lists and don't-look bits (see lin_kernighan_tour).
+    Its local optima are usually within a few percent of the optimum, much better than the 2-opt and 3-opt ones.
+    Args:
+        dist (dict or dense backend): The distances between the nodes.
+        path (list): The initial path (closed).
+        candidates (numpy.ndarray): The candidate lists of the instance (see utils/candidates.py).
+        dirty (iterable, optional): The nodes to start from. If None, all the nodes. Default is None.
+        tour_backend (str, optional): The tour representation, "array" or "two_level". Default is "array".
+        max_depth (int, optional): The maximum number of reversals of a move. Default is DEFAULT_LK_DEPTH.
+        breadth (tuple, optional): The number of alternatives tried at the first levels. Default is DEFAULT_LK_BREADTH.
+    Returns:
+        list: The improved path.
+    """
+    tour = make_tour(path, tour_backend)
+    lin_kernighan_tour(tour, dist, candidates, dirty, max_depth=max_depth, breadth=breadth)
+    return tour.to_path()
+
+def lin_kernighan_or_opt_tour(tour, dist, candidates, dirty=None, neighbor_distances=None, changed=None):
+    """
+    Alternates lin_kernighan_tour and or_opt_tour (see two_opt_or_opt_tour): the Or-opt moves reach
+    the segment insertions that the reversals of Lin-Kernighan can't make in a single sequential move.
+    Args:
+        See or_opt_tour.
+    Returns:
+        float: The total gain (decrease of the cost of the tour).
+    """
+    neighbor_distances = neighbor_distances or candidate_distances(dist, candidates)
+    total_gain = 0
+    active = dirty
+    while True:
+        touched = set()
+        total_gain += lin_kernighan_tour(tour, dist, candidates, active, neighbor_distances, touched)
+        moved = set()
+        or_nodes = None if active is None else set(active) | touched
+        total_gain += or_opt_tour(tour, dist, candidates, or_nodes, neighbor_distances, moved)
+        if changed is not None:
+            changed.update(touched)
+            changed.update(moved)
+        if not moved:
+            return total_gain
+        active = moved
+
+# Motori di local search sul posto, selezionabili per nome negli algoritmi (es. iterated_local_search)
+LOCAL_SEARCH_ENGINES = {
+    "two_opt": two_opt_dlb_tour,
+    "or_opt": two_opt_or_opt_tour,
+    "three_opt": three_opt_ls_tour,
+    "lin_kernighan": lin_kernighan_tour,
+    "lin_kernighan_or_opt": lin_kernighan_or_opt_tour,
+}
+
+def local_search_with_counted_iterations(dist, path, neighborhood_function, iterations=100, strategy="best"):
     """
     Performs a local search on a given path in the Traveling Salesman Problem (TSP) using a given neighborhood function.
     The local search iteratively explores the neighborhood of the current path and moves to the best neighbor that improves the path.
     The search continues for a number of iterations as long as an improvement is found at each iteration until no neighbor is found that improves the path.
+    As in local_search, the neighborhoods with a move generator are explored lazily with O(1) deltas.
     Args:
-        dist (dict): A dictionary containing the pairwise distances between nodes.
+        dist (dict or numpy.ndarray): The pairwise distances between nodes (dictionary keyed by (i, j) or dense matrix).
         path (list): A list representing the current path of nodes in the TSP.
-        neighborhood_function (function): A function that generates the neighborhood of a given path.
+        neighborhood_function (function): A function that generates the neighborhood of a given path, or a move generator.
         iterations (int, optional): The number of iterations to perform. Default is 100.
+        strategy (str, optional): "best" (best improvement) or "first" (first improvement, only with the move
+                                  generators). Default is "best".
     Returns:
         list: The best path found during the local search.
     """
+    generator = move_generator(neighborhood_function)
+    if generator is not None:
+        return _local_search_moves(dist, path, generator, strategy, iterations)
+
     current_path = path
-    current_length = path_length(dist, path)
+    current_length = tour_cost(dist, path)
     improved = True
     
     # Add a progress bar to show iterations
@@ -180,7 +941,7 @@ def local_search_with_counted_iterations(dist, path, neighborhood_function, iter
         improved = False
         neighbors = neighborhood_function(current_path)
         for neighbor in neighbors:
-            neighbor_length = path_length(dist, neighbor)
+            neighbor_length = tour_cost(dist, neighbor)
             if neighbor_length < current_length:
                 current_path = neighbor
                 current_length = neighbor_length
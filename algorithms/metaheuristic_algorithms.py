@@ -5,12 +5,14 @@ Functions:
     simulated_annealing_easy(current_solution, dist, T_0=1000, alpha=0.95, max_iterations=10000, DEBUG=False):
         Perform a simplified version of the Simulated Annealing algorithm to find an optimized solution for the TSP.
         This function is a simplified version of the simulated_annealing function, because it execute only one iteration for each temperature.
-    simulated_annealing(current_solution, dist, T_0=1000, alpha=0.95, max_iterations=10000, number_of_iterations_with_same_temperature=50, DEBUG=False, points=None):
+    simulated_annealing(current_solution, dist, T_0=1000, alpha=0.95, max_iterations=10000, number_of_iterations_with_same_temperature=50, DEBUG=False, points=None, candidates=None, tour_backend="array", moves=("two_opt",), seed=None, schedule="geometric", target_acceptance=SA_INITIAL_ACCEPTANCE, reheat=None):
         Perform the Simulated Annealing optimization algorithm to find a near-optimal solution for the TSP.
         This version starts from a given initial solution. It is used in the hybrid metaheuristic algorithm.
-    complete_simulated_annealing(file_path, T_0=1000, alpha=0.95, max_iterations=10000, number_of_iterations_with_same_temperature=50, DEBUG=False):
+        With schedule="adaptive" the initial temperature is calibrated on the instance and the cooling rate follows
+        the acceptance ratio, so the same iteration budget fits instances of any scale.
+    complete_simulated_annealing(file_path, T_0=1000, alpha=0.95, max_iterations=10000, number_of_iterations_with_same_temperature=50, DEBUG=False, backend="dict", use_cache=False, candidates_k=None, candidates_method="nearest", tour_backend="array", moves=("two_opt",), seed=None, schedule="geometric", target_acceptance=SA_INITIAL_ACCEPTANCE, reheat=None):
         Perform the Simulated Annealing algorithm to solve the TSP using a TSPLIB file.
-    iterated_local_search(file_path, max_iterations, DEBUG=False):
+    iterated_local_search(file_path, max_iterations, DEBUG=False, backend="dict", use_cache=False, candidates_k=None, candidates_method="nearest", tour_backend="array", local_search_engine="two_opt", seed=None):
         Perform Iterated Local Search (ILS) to solve the TSP using a TSPLIB file.
 Usage:
     Execute this module to test the implemented metaheuristic algorithms for solving the TSP.
@@ -20,15 +22,32 @@ Usage:
     In this example, the sample TSP instance is read from the file "TSP/data/TSP_instances/a280.tsp".
 '''
 from tqdm import tqdm
+import numpy as np
 import math
 import random
 
 from .perturbation import *
-from .local_search_algorithms import local_search, local_search_optimized
+from .local_search_algorithms import (local_search, local_search_optimized, two_opt_delta, or_opt_delta, or_opt_move,
+                                      swap_delta, candidate_distances, LOCAL_SEARCH_ENGINES)
+from .tour import make_tour
 from .neighborhood_generators import two_opt_single_neighbor, two_opt_neighborhood
-from ..utils.algorithm_metrics import path_length
-from ..utils.path_utils import generate_random_path, nearest_neighbor_second
-from ..utils.tsp_utils import readTSPLIB
+from ..utils.algorithm_metrics import path_length, tour_cost, validate_path
+from ..utils.path_utils import generate_random_path, nearest_neighbor_second, make_rng
+from ..utils.tsp_instance import load_instance
+from ..utils.candidates import candidate_lists, DEFAULT_K
+
+# Tipi di mossa del Simulated Annealing
+SA_MOVES = ("two_opt", "or_opt", "swap", "insertion")
+# Numero di estrazioni casuali generate in un solo blocco dal motore del Simulated Annealing
+SA_BATCH_SIZE = 4096
+# Schedule di raffreddamento del Simulated Annealing
+SA_SCHEDULES = ("geometric", "adaptive")
+# Schedule adattiva: probabilità media di accettare una mossa peggiorativa all'inizio (default) e alla fine,
+# fascia di accettazione in cui il raffreddamento rallenta e numero di mosse usate per calibrare le temperature
+SA_INITIAL_ACCEPTANCE = 0.5
+SA_FINAL_ACCEPTANCE = 0.001
+SA_PRODUCTIVE_ACCEPTANCE = (0.01, 0.3)
+SA_CALIBRATION_MOVES = 1000
 
 
 def simulated_annealing_easy(current_solution, dist, T_0=1000, alpha=0.95, max_iterations=10000, DEBUG=False):
@@ -37,7 +56,7 @@ def simulated_annealing_easy(current_solution, dist, T_0=1000, alpha=0.95, max_i
     This function is a simplified version of the simulated_annealing function, because it execute only one iteration for each temperature.
     Parameters:
     current_solution (list): The initial solution to start the optimization process.
-    dist (2D list): The distance matrix representing the problem space.
+    dist (dict or numpy.ndarray): The distances between the nodes (dictionary keyed by (i, j) or dense matrix).
     T_0 (float, optional): The initial temperature for the annealing process. Default is 1000.
     alpha (float, optional): The cooling rate, a factor by which the temperature is multiplied each iteration. Default is 0.95.
     max_iterations (int, optional): The maximum number of iterations to perform. Default is 10000.
@@ -48,7 +67,7 @@ def simulated_annealing_easy(current_solution, dist, T_0=1000, alpha=0.95, max_i
 
     # Inizializzazione
     T = T_0  # Temperatura iniziale
-    current_cost = path_length(dist, current_solution)  # Calcolo del costo iniziale
+    current_cost = tour_cost(dist, current_solution)  # Calcolo del costo iniziale
 
     # La migliore soluzione trovata
     best_solution = current_solution
@@ -64,7 +83,7 @@ def simulated_annealing_easy(current_solution, dist, T_0=1000, alpha=0.95, max_i
 
         # Genera il vicinato usando il metodo 2-opt
         neighbor_solution = two_opt_single_neighbor(current_solution)
-        neighbor_cost = path_length(dist, neighbor_solution)
+        neighbor_cost = tour_cost(dist, neighbor_solution)
 
         # Calcolo della differenza di costo
         delta = neighbor_cost - current_cost
@@ -99,215 +118,405 @@ def simulated_annealing_easy(current_solution, dist, T_0=1000, alpha=0.95, max_i
     return best_solution
 
 def simulated_annealing(current_solution, dist, T_0=1000, alpha=0.95, max_iterations=10000,
-                        number_of_iterations_with_same_temperature=50, DEBUG=False, points=None):
+                        number_of_iterations_with_same_temperature=50, DEBUG=False, points=None, candidates=None,
+                        tour_backend="array", moves=("two_opt",), seed=None, schedule="geometric",
+                        target_acceptance=SA_INITIAL_ACCEPTANCE, reheat=None):
     """
     Perform the Simulated Annealing optimization algorithm to find a near-optimal solution for the TSP.
     This version starts from a given initial solution. It is used in the hybrid metaheuristic algorithm.
+    The solution is kept in a tour object: the cost of each 2-opt move is computed in O(1) from the four edges
+    involved and only the accepted moves are applied, in place, so an iteration doesn't cost O(n) anymore.
     Parameters:
         current_solution (list): The initial solution path.
-        dist (2D list): The distance matrix representing the TSP.
+        dist (dict or numpy.ndarray): The distances between the nodes (dictionary keyed by (i, j) or dense matrix).
         T_0 (float): The initial temperature. Default is 1000.
         alpha (float): The cooling rate. Default is 0.95.
         max_iterations (int): The maximum number of iterations. Default is 10000.
         number_of_iterations_with_same_temperature (int): Number of iterations to perform at each temperature level. Default is 50.
         DEBUG (bool): If True, print debug information. Default is False.
-        points (list): List of points representing the TSP. Default is None.
+        points (list): List of points representing the TSP. Not needed anymore: the moves are valid by construction,
+                       it's kept for compatibility. Default is None.
+        candidates (numpy.ndarray): The candidate lists of the instance. If given, the 2-opt moves only create edges
+                                    between a node and one of its nearest neighbors. Default is None.
+        tour_backend (str): The tour representation, "array" or "two_level" (see tour.py). Default is "array".
+        moves (tuple): The move types, chosen at random at each iteration: "two_opt" (2-opt), "or_opt"
+                       (a segment of 1 to 3 nodes moved, optionally reversed), "swap" (two nodes exchanged) and
+                       "insertion" (a node moved elsewhere), see SA_MOVES. Default is ("two_opt",).
+        seed (int or numpy.random.Generator): The seed of the random draws, or a Generator (see make_rng).
+                                              If None, it is drawn from the random module. Default is None.
+        schedule (str): The cooling schedule, see SA_SCHEDULES. "geometric" multiplies the temperature by alpha
+                        after every level, starting from T_0. "adaptive" ignores T_0 and alpha: the initial
+                        temperature is calibrated on a sample of random moves so that a worsening move is accepted
+                        with probability target_acceptance, and after every level the cooling rate is recomputed to
+                        reach SA_FINAL_ACCEPTANCE at the end of max_iterations, faster while the acceptance ratio of
+                        the worsening moves is high and slower while it is in SA_PRODUCTIVE_ACCEPTANCE.
+                        Default is "geometric".
+        target_acceptance (float): The initial acceptance probability of the worsening moves of the adaptive
+                                   schedule, in (0, 1). Default is SA_INITIAL_ACCEPTANCE.
+        reheat (int): Adaptive schedule only: if given, after this many temperature levels without improvements
+                      of the best solution the temperature goes back to the one of the last improvement.
+                      Default is None (no reheating).
     Returns:
         list: The best solution found.
     """
-    # Inizializzazione
+    return _simulated_annealing_tour(current_solution, dist, T_0, alpha, max_iterations,
+                                     number_of_iterations_with_same_temperature, DEBUG, candidates, tour_backend,
+                                     moves=moves, seed=seed, schedule=schedule,
+                                     target_acceptance=target_acceptance, reheat=reheat)
+
+def _simulated_annealing_tour(current_solution, dist, T_0, alpha, max_iterations,
+                              number_of_iterations_with_same_temperature, DEBUG, candidates, tour_backend,
+                              progress=None, moves=("two_opt",), seed=None, schedule="geometric",
+                              target_acceptance=SA_INITIAL_ACCEPTANCE, reheat=None):
+    """
+    Simulated Annealing engine shared by simulated_annealing and complete_simulated_annealing.
+    A 2-opt move is chosen by nodes: a random node a with b = next(a), and a node c (random, or one of the
+    candidates of a) with d = next(c); the move replaces the edges (a, b) and (c, d) with (a, c) and (b, d).
+    The best tour is not copied at every improvement: while the current tour is the best one nothing is stored,
+    and a snapshot is taken only when an accepted move leaves the best state. During the long improving runs
+    (and at low temperature) the tour is therefore copied rarely.
+    An Or-opt move takes the segment of 1 to 3 nodes starting at a random node and moves it between a node c
+    (random, or one of the candidates of its first node) and next(c), in the cheapest orientation; an insertion
+    move does the same with a single node. A swap move exchanges the random node and c. All the deltas are O(1).
+    The random numbers are drawn in blocks of SA_BATCH_SIZE from a seeded NumPy Generator (see _sa_random_stream),
+    and the Metropolis criterion u < exp(-delta / T) is checked as delta < T * E, with E = -log(u) drawn
+    directly from the exponential distribution: no exp and no call to the random module per iteration.
+    Args:
+        progress (tqdm, optional): A progress bar updated with the number of iterations performed.
+        moves (tuple, optional): The move types (see SA_MOVES). Default is ("two_opt",).
+        seed (int or numpy.random.Generator, optional): The seed of the random draws (see make_rng). Default is None.
+        schedule, target_acceptance, reheat (optional): The cooling schedule (see simulated_annealing).
+    With the adaptive schedule a level is a block of number_of_iterations_with_same_temperature iterations: at its
+    end the cooling factor (T_final / T) ** (1 / remaining levels) keeps the run on track to end at T_final, and
+    it is squared or square-rooted according to the acceptance ratio of the worsening moves of the level.
+    """
+    for move in moves:
+        if move not in SA_MOVES:
+            raise ValueError(f"Tipo di mossa non valido: {move}. Valori ammessi: {SA_MOVES}")
+    if schedule not in SA_SCHEDULES:
+        raise ValueError(f"Schedule di raffreddamento non valida: {schedule}. Valori ammessi: {SA_SCHEDULES}")
+    if not 0 < target_acceptance < 1:
+        raise ValueError(f"La probabilità di accettazione iniziale deve essere in (0, 1): {target_acceptance}")
+    tour = make_tour(current_solution, tour_backend)
+    n = len(tour)
+    if n < 8:
+        moves = ("two_opt",)  # Troppo pochi nodi per spostare un segmento lontano dai suoi vicini
+    stream = _sa_random_stream(make_rng(seed), n, candidates, len(moves))
+    adaptive = schedule == "adaptive"
+    if adaptive:
+        temperatures = _calibrate_temperatures(tour, dist, stream, moves, target_acceptance)
+        if temperatures is None:
+            adaptive = False  # Nessuna mossa peggiorativa nel campione: si usa la schedule geometrica
+        else:
+            T_0, T_final = temperatures
     T = T_0  # Temperatura iniziale
-    current_cost = path_length(dist, current_solution)  # Calcolo del costo iniziale
+    current_cost = tour_cost(dist, current_solution)
 
-    # La migliore soluzione trovata
+    # La migliore soluzione trovata: finché il giro corrente è il migliore, non serve salvarlo
     best_solution = current_solution
     best_cost = current_cost
-    
+    at_best = True
+
     total_iterations = 0
     T_min = 0.0001  # Temperatura minima
-    
+    T_improved = None  # Temperatura dell'ultimo miglioramento della soluzione migliore (per il reheating)
+    stagnant_stages = 0
+
     if DEBUG:
         print(f"Temperatura iniziale: {T_0}")
         print(f"Soluzione iniziale: {current_solution} con costo {current_cost}")
-    
-    while T > T_min and total_iterations < max_iterations:
-        for iteration in range(number_of_iterations_with_same_temperature):
-            total_iterations += 1
-
-            if DEBUG:  # Stampa periodica ogni 10 iterazioni
-                print(f"Temperatura attuale: {T:.4f}")
-
-                # Genera il vicinato usando il metodo 2-opt
-            neighbor_solution = two_opt_single_neighbor(current_solution)
-            if not check_path(points, current_solution, DEBUG=True):
-                input("Nella funzione intermedia SA del ILS_SA, la soluzione intermedia non è valida. Premi invio per continuare...")
-
-            neighbor_cost = path_length(dist, neighbor_solution)
-
-            # Calcolo della differenza di costo
-            delta = neighbor_cost - current_cost
 
-                # Decidi se accettare la nuova soluzione
-            if delta < 0 or random.uniform(0, 1) < math.exp(-delta / T):
+    while (adaptive or T > T_min) and total_iterations < max_iterations:
+        iterations = min(number_of_iterations_with_same_temperature, max_iterations - total_iterations)
+        uphill = accepted_uphill = 0  # Mosse peggiorative proposte e accettate a questa temperatura
+        improved = False
+        for iteration in range(iterations):
+            # Sceglie la mossa tramite i nodi coinvolti, estratti a blocchi insieme alla soglia di accettazione
+            a, c, exponential, kind, extra = next(stream)
+            move = moves[kind]
+            evaluated = _sa_move_delta(tour, dist, move, a, c, extra)
+            if evaluated is None:
+                continue  # La mossa non cambia il giro
+            delta, b, s2, reverse = evaluated
+            if delta > 0:
+                uphill += 1
+
+            # Decidi se accettare la nuova soluzione: u < exp(-delta / T) equivale a delta < -T * log(u)
+            if delta < T * exponential:
+                if delta > 0:
+                    accepted_uphill += 1
+                    if at_best:
+                        # Si lascia il giro migliore: è l'unico momento in cui va copiato
+                        best_solution = tour.to_path()
+                        at_best = False
+                if move == "two_opt":
+                    tour.reverse_path(b, c)
+                elif move == "swap":
+                    tour.swap_nodes(a, c)
+                else:
+                    or_opt_move(tour, a, s2, c, reverse)
+                current_cost += delta
                 if DEBUG:
-                    if delta < 0:
-                        print(f"Nuova soluzione CORRENTE, perchè MIGLIORE di {delta}. Costo {neighbor_cost}")
-                    else:
-                        print(f"Nuova soluzione CORRENTE, anche se  PEGGIORE di {delta}. Costo {neighbor_cost}")
-                    # Accetta la nuova soluzione
-                current_solution = neighbor_solution
-                current_cost = neighbor_cost
-
-                    # Aggiorna la migliore soluzione trovata
+                    print(f"Nuova soluzione CORRENTE con delta {delta}. Costo {current_cost}")
+
+                # Aggiorna la migliore soluzione trovata
                 if current_cost < best_cost:
-                    best_solution = current_solution
                     best_cost = current_cost
+                    at_best = True
+                    improved = True
                     if DEBUG:
                         print(f"Nuova soluzione GENERALE con costo {best_cost}")
-            else:
-                if DEBUG:
-                    print(f"Nuova soluzione SCARTATA, perchè PEGGIORE di {delta}. Costo {neighbor_cost}")
-            # Aggiorna la temperatura
-        T = T * alpha
+        total_iterations += iterations
+        if progress is not None:
+            progress.update(iterations)
+        # Aggiorna la temperatura
+        if not adaptive:
+            T = T * alpha
+            continue
+        if improved:
+            T_improved, stagnant_stages = T, 0
+        else:
+            stagnant_stages += 1
+        # Stadi rimasti nel budget: il raffreddamento è ricalcolato per arrivare a T_final all'ultima iterazione
+        remaining_stages = -(-(max_iterations - total_iterations) // number_of_iterations_with_same_temperature)
+        if (reheat and T_improved is not None and stagnant_stages >= reheat and remaining_stages > reheat
+                and T < T_improved):
+            # Stagnazione: si torna alla temperatura dell'ultimo miglioramento
+            T, stagnant_stages = T_improved, 0
+            if DEBUG:
+                print(f"Reheating alla temperatura {T}")
+            continue
+        cooling = min(1.0, (T_final / T) ** (1 / max(1, remaining_stages)))
+        acceptance = accepted_uphill / uphill if uphill else 0.0
+        if acceptance > SA_PRODUCTIVE_ACCEPTANCE[1]:
+            cooling *= cooling  # Quasi una passeggiata casuale: si raffredda più in fretta
+        elif acceptance > SA_PRODUCTIVE_ACCEPTANCE[0]:
+            cooling = math.sqrt(cooling)  # Fascia produttiva: si resta più a lungo a queste temperature
+        T = T * cooling
 
     # Ritorna la migliore soluzione trovata
+    return tour.to_path() if at_best else best_solution
 
-    return best_solution
-
+def _sa_move_delta(tour, dist, move, a, c, extra):
+    """
+    Calcola in O(1) il delta di una mossa del Simulated Annealing senza applicarla.
+    Restituisce None se la mossa non cambia il giro, altrimenti (delta, b, s2, reverse): b = next(a) per la 2-opt,
+    s2 l'ultimo nodo del segmento e reverse l'orientamento migliore per Or-opt e inserimento.
+    """
+    if move == "two_opt":
+        b = tour.next(a)
+        d = tour.next(c)
+        if c == a or c == b or d == a:
+            return None  # Archi adiacenti
+        return two_opt_delta(dist, a, b, c, d), b, None, False
+    if move == "swap":
+        if c == a:
+            return None
+        return swap_delta(dist, tour.prev(a), a, tour.next(a), tour.prev(c), c, tour.next(c)), None, None, False
+    # Segmento a..s2 di 1-3 nodi (uno solo per l'inserimento), inserito tra c e d = next(c)
+    segment = [a]
+    for _ in range(extra if move == "or_opt" else 0):
+        segment.append(tour.next(segment[-1]))
+    s2 = segment[-1]
+    d = tour.next(c)
+    if c in segment or d in segment:
+        return None  # Il segmento tornerebbe nella stessa posizione
+    delta, reverse = or_opt_delta(dist, tour.prev(a), a, s2, tour.next(s2), c, d)
+    return delta, None, s2, reverse
+
+def _temperature_for(deltas, acceptance):
+    """
+    Temperatura a cui la probabilità media di accettare i delta peggiorativi del campione è acceptance
+    (metodo iterativo di Ben-Ameur, partendo dalla stima -media / log(acceptance)).
+    """
+    T = -deltas.mean() / math.log(acceptance)
+    for _ in range(50):
+        observed = np.exp(-deltas / T).mean()
+        if observed <= 0:
+            T *= 2  # Tutte le probabilità sono sotto la precisione: si riparte da una temperatura più alta
+            continue
+        T_next = T * math.log(observed) / math.log(acceptance)
+        if abs(T_next - T) <= 1e-6 * T:
+            return T_next
+        T = T_next
+    return T
+
+def _calibrate_temperatures(tour, dist, stream, moves, target_acceptance, size=SA_CALIBRATION_MOVES):
+    """
+    Stima la temperatura iniziale e quella finale della schedule adattiva da un campione di size mosse casuali
+    (valutate e non applicate): a T_0 le mosse peggiorative sono accettate in media con probabilità
+    target_acceptance, a T_final con probabilità SA_FINAL_ACCEPTANCE.
+    Restituisce None se il campione non contiene mosse peggiorative.
+    """
+    deltas = []
+    for _ in range(size):
+        a, c, _, kind, extra = next(stream)
+        evaluated = _sa_move_delta(tour, dist, moves[kind], a, c, extra)
+        if evaluated is not None and evaluated[0] > 0:
+            deltas.append(evaluated[0])
+    if not deltas:
+        return None
+    deltas = np.array(deltas, dtype=np.float64)
+    T_0 = _temperature_for(deltas, target_acceptance)
+    return T_0, min(T_0, _temperature_for(deltas, SA_FINAL_ACCEPTANCE))
+
+def _sa_random_stream(rng, n, candidates, number_of_moves, batch_size=SA_BATCH_SIZE):
+    """
+    Endless stream of the random draws of the Simulated Annealing engine, generated batch_size at a time.
+    Every item is (a, c, exponential, kind, extra): the random node a, the node c (random, or a random candidate
+    of a), a draw of the standard exponential distribution (-log(u) for the acceptance test), the index of the
+    move type and a number in 0..2 (the extra nodes of an Or-opt segment).
+    """
+    while True:
+        a = rng.integers(0, n, batch_size)
+        if candidates is not None:
+            c = candidates[a, rng.integers(0, candidates.shape[1], batch_size)]
+        else:
+            c = rng.integers(0, n, batch_size)
+        exponential = rng.standard_exponential(batch_size)
+        kind = rng.integers(0, number_of_moves, batch_size)
+        extra = rng.integers(0, 3, batch_size)
+        yield from zip(a.tolist(), c.tolist(), exponential.tolist(), kind.tolist(), extra.tolist())
 
-def complete_simulated_annealing(file_path, T_0=1000, alpha=0.95, max_iterations=10000, number_of_iterations_with_same_temperature=50, DEBUG=False):
+def complete_simulated_annealing(file_path, T_0=1000, alpha=0.95, max_iterations=10000, number_of_iterations_with_same_temperature=50, DEBUG=False, backend="dict", use_cache=False, candidates_k=None, candidates_method="nearest", tour_backend="array", moves=("two_opt",), seed=None, schedule="geometric", target_acceptance=SA_INITIAL_ACCEPTANCE, reheat=None):
     """
     Perform the Simulated Annealing algorithm to solve the Traveling Salesman Problem (TSP).
     Parameters:
-        file_path (str): The path to the TSPLIB file containing the TSP instance.
+        file_path (str or TSPInstance): The path to the TSPLIB file containing the TSP instance, or an already loaded TSPInstance.
         T_0 (float, optional): The initial temperature. Default is 1000.
         alpha (float, optional): The cooling rate. Default is 0.95.
         max_iterations (int, optional): The maximum number of iterations. Default is 10000.
         number_of_iterations_with_same_temperature (int, optional): The number of iterations to perform at the same temperature before cooling. Default is 50.
         DEBUG (bool, optional): If True, print debug information. Default is False.
+        backend (str, optional): The distance backend used by readTSPLIB ("dict", "matrix", "memmap", "oracle" or "triangular"). Default is "dict".
+        use_cache (bool, optional): If True, the instance is loaded through the binary instance cache. Default is False.
+        candidates_k (int, optional): If given, the 2-opt moves are restricted to the candidate_k nearest neighbors
+                                      of each node (see utils/candidates.py). Default is None.
+        candidates_method (str, optional): How the candidates are chosen: "nearest" (k nearest neighbors) or
+                                           "alpha" (alpha-nearness, dense backends only). Default is "nearest".
+        tour_backend (str, optional): The tour representation, "array" or "two_level" (see tour.py). Default is "array".
+        moves (tuple, optional): The move types, among "two_opt", "or_opt", "swap" and "insertion" (see simulated_annealing). Default is ("two_opt",).
+        seed (int or numpy.random.Generator, optional): The seed of the random draws (see make_rng). Default is None.
+        schedule (str, optional): The cooling schedule, "geometric" or "adaptive" (see simulated_annealing). Default is "geometric".
+        target_acceptance (float, optional): The initial acceptance probability of the adaptive schedule. Default is SA_INITIAL_ACCEPTANCE.
+        reheat (int, optional): The stagnant temperature levels before a reheating (adaptive schedule only). Default is None.
     Returns:
         tuple: A tuple containing the best solution found and its cost.
     """
     # Inizializzazione
-    n, points, dist = readTSPLIB(file_path)
+    instance = load_instance(file_path, backend=backend, use_cache=use_cache)
+    n, points, dist = instance.n, instance, instance.dist
+    candidates = candidate_lists(instance, candidates_k, candidates_method) if candidates_k else None
+    rng = make_rng(seed)
     if n > 2000:
-        current_solution = generate_random_path(n)
+        current_solution = generate_random_path(n, rng)
     else:
-        current_solution = nearest_neighbor_second(points, dist)
+        current_solution = nearest_neighbor_second(points, dist, rng=rng)
 
-    if not check_path(points, current_solution, DEBUG=True):
+    if not validate_path(points, current_solution, DEBUG=True):
         input("Nella funzione SA, la soluzione iniziale non è valida. Premi invio per continuare...")
-    T = T_0  # Temperatura iniziale
-    current_cost = path_length(dist, current_solution)  # Calcolo del costo iniziale
 
-    # La migliore soluzione trovata
-    best_solution = current_solution
-    best_cost = current_cost
-    
-    total_iterations = 0
-    T_min = 0.0001  # Temperatura minima
-    
-    if DEBUG:
-        print(f"Temperatura iniziale: {T_0}")
-        print(f"Soluzione iniziale: {current_solution} con costo {current_cost}")
-    
-    # Calcolo delle iterazioni totali previste per tqdm
+    # Stesso motore di simulated_annealing, con la barra di avanzamento
     with tqdm(total=max_iterations, desc="Simulated Annealing Progress") as pbar:
-        while T > T_min and total_iterations < max_iterations:
-            for iteration in range(number_of_iterations_with_same_temperature):
-                total_iterations += 1
-                pbar.update(1)  # Aggiorna la barra di progresso
-                
-                if DEBUG:  # Stampa periodica ogni 10 iterazioni
-                    print(f"Temperatura attuale: {T:.4f}")
-
-                # Genera il vicinato usando il metodo 2-opt
-                neighbor_solution = two_opt_single_neighbor(current_solution)
-                
-                if not check_path(points, current_solution, DEBUG=True):
-                    input("Nella funzione SA, una soluzione intermedia non è valida. Premi invio per continuare...")
-                neighbor_cost = path_length(dist, neighbor_solution)
-
-                # Calcolo della differenza di costo
-                delta = neighbor_cost - current_cost
-
-                # Decidi se accettare la nuova soluzione
-                if delta < 0 or random.uniform(0, 1) < math.exp(-delta / T):
-                    if DEBUG:
-                        if delta < 0:
-                            print(f"Nuova soluzione CORRENTE, perchè MIGLIORE di {delta}. Costo {neighbor_cost}")
-                        else:
-                            print(f"Nuova soluzione CORRENTE, anche se PEGGIORE di {delta}. Costo {neighbor_cost}")
-                    # Accetta la nuova soluzione
-                    current_solution = neighbor_solution
-                    current_cost = neighbor_cost
-
-                    # Aggiorna la migliore soluzione trovata
-                    if current_cost < best_cost:
-                        best_solution = current_solution
-                        best_cost = current_cost
-                        if DEBUG:
-                            print(f"Nuova soluzione GENERALE con costo {best_cost}")
-                else:
-                    if DEBUG:
-                        print(f"Nuova soluzione SCARTATA, perchè PEGGIORE di {delta}. Costo {neighbor_cost}")
-            # Aggiorna la temperatura
-            T = T * alpha
+        best_solution = _simulated_annealing_tour(current_solution, dist, T_0, alpha, max_iterations,
+                                                  number_of_iterations_with_same_temperature, DEBUG, candidates,
+                                                  tour_backend, progress=pbar, moves=moves, seed=rng,
+                                                  schedule=schedule, target_acceptance=target_acceptance,
+                                                  reheat=reheat)
 
     # Ritorna la migliore soluzione trovata
     return best_solution, path_length(dist, best_solution)
 
 
-def iterated_local_search(file_path, max_iterations, DEBUG=False):
+def iterated_local_search(file_path, max_iterations, DEBUG=False, backend="dict", use_cache=False, candidates_k=None, candidates_method="nearest", tour_backend="array", local_search_engine="two_opt", seed=None):
     """
     Perform Iterated Local Search (ILS) to solve the Traveling Salesman Problem (TSP).
     Parameters:
-        file_path (str): Path to the TSPLIB file containing the TSP instance.
+        file_path (str or TSPInstance): Path to the TSPLIB file containing the TSP instance, or an already loaded TSPInstance.
         max_iterations (int): Maximum number of iterations for the ILS algorithm.
         DEBUG (bool): If True, print debug information. Default is False.
+        backend (str): The distance backend used by readTSPLIB ("dict", "matrix", "memmap", "oracle" or "triangular"). Default is "dict".
+        use_cache (bool): If True, the instance is loaded through the binary instance cache. Default is False.
+        candidates_k (int): If given, the local search is the 2-opt with candidate lists and don't-look bits
+                            (two_opt_dlb) on the candidates_k nearest neighbors of each node (see utils/candidates.py).
+                            On the instances with more than 500 nodes it is always used, with 10 candidates
+                            if candidates_k is None. Default is None.
+        candidates_method (str): How the candidates are chosen: "nearest" (k nearest neighbors) or
+                                 "alpha" (alpha-nearness, dense backends only). Default is "nearest".
+        tour_backend (str): The tour representation used by the local search ("array" or "two_level"). Default is "array".
+        local_search_engine (str): The local search used with the candidate lists (see LOCAL_SEARCH_ENGINES):
+                                   "two_opt" (two_opt_dlb), "or_opt" (2-opt alternated with Or-opt) or
+                                   "three_opt" (sequential 3-opt, slower but with better local optima),
+                                   "lin_kernighan" (Lin-Kernighan style variable-depth search, the strongest)
+                                   or "lin_kernighan_or_opt" (Lin-Kernighan alternated with Or-opt).
+                                   All but "two_opt" always use the candidate lists. Default is "two_opt".
+        seed (int or numpy.random.Generator): The seed of the perturbations (see make_rng). Default is None.
     Returns:
         tuple: A tuple containing the best solution found and its path length.
     """
-    n, points, dist = readTSPLIB(file_path)
+    if local_search_engine not in LOCAL_SEARCH_ENGINES:
+        raise ValueError(f"Motore di local search non valido: {local_search_engine}. "
+                         f"Valori ammessi: {tuple(LOCAL_SEARCH_ENGINES)}")
+    improve = LOCAL_SEARCH_ENGINES[local_search_engine]
+    rng = make_rng(seed)
+    instance = load_instance(file_path, backend=backend, use_cache=use_cache)
+    n, points, dist = instance.n, instance, instance.dist
+    if candidates_k:
+        candidates = candidate_lists(instance, candidates_k, candidates_method)
+    elif n > 500 or local_search_engine != "two_opt":
+        # Sulle istanze grandi la local search usa sempre le liste dei candidati
+        candidates = candidate_lists(instance, DEFAULT_K, candidates_method)
+    else:
+        candidates = None
+    neighbor_distances = candidate_distances(dist, candidates) if candidates is not None else None
 
     if n > 2000:
-        current_solution = generate_random_path(n)
+        current_solution = generate_random_path(n, rng)
     else:
-        current_solution = nearest_neighbor_second(points, dist)
+        current_solution = nearest_neighbor_second(points, dist, rng=rng)
 
     if DEBUG:
         print("Costo della soluzione iniziale:", path_length(dist, current_solution))
         
         
-    if not check_path(points, current_solution, DEBUG=True):
+    if not validate_path(points, current_solution, DEBUG=True):
         input("Nella funzione ILS, la soluzione iniziale non è valida. Premi invio per continuare...")
-        
-    best_solution = local_search_optimized(dist, current_solution) 
+
+    if candidates is not None:
+        tour = make_tour(current_solution, tour_backend)
+        improve(tour, dist, candidates, None, neighbor_distances)
+        best_solution = tour.to_path()
+    else:
+        best_solution = local_search_optimized(dist, current_solution, candidates, tour_backend)
+    best_cost = tour_cost(dist, best_solution)
     
-    if not check_path(points, current_solution, DEBUG=True):
+    if not validate_path(points, best_solution, DEBUG=True):
         input("Nella funzione ILS, la prima soluzione locale non è valida. Premi invio per continuare...")
     
     no_improvement_count = 0
     max_no_improvement = 20  # Numero massimo di iterazioni senza miglioramenti
 
     for iteration in tqdm(range(max_iterations), desc="Iterated Local Search Progress"):
-        # Perturba la soluzione
-        new_solution = multi_swap(best_solution, k=n//25 , points=points, DEBUG=DEBUG)
-        if not check_path(points, current_solution, DEBUG=True):
-            input("Nella funzione ILS, la soluzione perturbata locale non è valida. Premi invio per continuare...")
-
-        # Applica SA alla soluzione perturbata
-        if n > 500:
-            new_solution =  local_search_optimized(dist, new_solution)
+        if candidates is not None:
+            # Perturbazione sul posto: la local search riparte solo dai nodi degli archi modificati
+            tour = make_tour(best_solution, tour_backend)
+            dirty = multi_swap_tour(tour, n//25, rng=rng)
+            improve(tour, dist, candidates, dirty, neighbor_distances)
+            new_solution = tour.to_path()
         else:
-            new_solution = local_search(dist, new_solution, two_opt_neighborhood) 
+            # Perturba la soluzione
+            new_solution = multi_swap(best_solution, k=n//25 , points=points, DEBUG=DEBUG, rng=rng)
+            if not validate_path(points, new_solution, DEBUG=True):
+                input("Nella funzione ILS, la soluzione perturbata locale non è valida. Premi invio per continuare...")
+            new_solution = local_search(dist, new_solution, two_opt_neighborhood)
             
-        if not check_path(points, current_solution, DEBUG=True):
+        if not validate_path(points, new_solution, DEBUG=True):
             input("Nella funzione ILS, la soluzione locale intermedia non è valida. Premi invio per continuare...")
 
         # Aggiorna la soluzione corrente e globale
-        if path_length(dist, new_solution) < path_length(dist, best_solution):
-            best_solution = new_solution
+        new_cost = tour_cost(dist, new_solution)
+        if new_cost < best_cost:
+            best_solution, best_cost = new_solution, new_cost
             no_improvement_count = 0  # Reset se troviamo un miglioramento
         else:
             no_improvement_count += 1
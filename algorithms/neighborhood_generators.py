@@ -10,6 +10,25 @@ Functions:
         Generates a single neighbor of the given path using the 2-opt algorithm by reversing the order of nodes between two randomly selected indices.
     swap_single_neighbor(path):
         Generates a single neighbor of the given path by swapping two randomly selected nodes.
+    swap_moves(path, dist):
+        Lazily generates the swap moves of a path, each one with its delta computed in O(1).
+    two_opt_moves(path, dist):
+        Lazily generates the 2-opt moves of a path (the same ones of two_opt_neighborhood), each one with its delta.
+    or_opt_moves(path, dist, max_length=3):
+        Lazily generates the Or-opt moves of a path: a segment of 1 to max_length nodes moved elsewhere, optionally reversed.
+    insertion_moves(path, dist):
+        Lazily generates the node insertion moves of a path: a node removed and inserted between two other adjacent nodes.
+    best_two_opt_move(path, dist, block_size=None):
+        Finds the best move of two_opt_moves with vectorized deltas, one block of rows at a time (dense backends only).
+    best_swap_move(path, dist, block_size=None):
+        Same as best_two_opt_move, for swap_moves.
+    best_insertion_move(path, dist, block_size=None):
+        Same as best_two_opt_move, for insertion_moves.
+    move_generator(neighborhood_function):
+        Returns the move generator equivalent to a neighborhood function, or None.
+Classes:
+    Move:
+        A lightweight move of a neighborhood: type, indices and delta, with apply(path) to perform it in place.
 Usage:
     The functions in this module can be used to explore the neighborhood of a given solution in the TSP.
     Example:
@@ -19,6 +38,8 @@ Usage:
 '''
 import random
 
+import numpy as np
+
 from ..utils.path_utils import print_in_square
 
 def swap_neighborhood(path, print_neighbors=False):
@@ -139,6 +160,340 @@ def swap_single_neighbor(path):
 
     return new_path
 
+class Move:
+    """
+    A lightweight move of a neighborhood of a closed path: instead of a copied path, it stores the type of the move,
+    its indices and its delta (the difference in cost), so a neighborhood can be explored with O(1) work
+    per neighbor and constant extra memory. apply(path) performs the move in place.
+    Attributes:
+        kind (str): The type of the move: "swap", "two_opt", "or_opt" or "insertion" (an Or-opt move of a single node).
+        i (int): The first index: the first swapped node, the first reversed node or the first node of the moved segment.
+        j (int): The second index: the second swapped node, the last reversed node, or the node after which
+                 the segment is inserted (index in the path before the move).
+        delta (float): The difference between the cost of the new path and the cost of the current one.
+        length (int): The number of nodes of the moved segment (Or-opt and insertion only).
+        reverse (bool): True if the segment is inserted reversed (Or-opt only).
+    """
+    __slots__ = ("kind", "i", "j", "delta", "length", "reverse")
+
+    def __init__(self, kind, i, j, delta, length=0, reverse=False):
+        self.kind = kind
+        self.i = i
+        self.j = j
+        self.delta = delta
+        self.length = length
+        self.reverse = reverse
+
+    def apply(self, path):
+        """
+        Performs the move in place on the given path (a list, as in the neighborhood functions).
+        """
+        i, j = self.i, self.j
+        if self.kind == "swap":
+            path[i], path[j] = path[j], path[i]
+        elif self.kind == "two_opt":
+            path[i:j+1] = path[i:j+1][::-1]
+        else:
+            end = i + self.length
+            segment = path[i:end][::-1] if self.reverse else path[i:end]
+            if j < i:
+                path[j+1:end] = segment + path[j+1:i]
+            else:
+                path[i:j+1] = path[end:j+1] + segment
+
+    def __repr__(self):
+        if self.kind in ("or_opt", "insertion"):
+            return f"Move({self.kind!r}, i={self.i}, j={self.j}, length={self.length}, reverse={self.reverse}, delta={self.delta})"
+        return f"Move({self.kind!r}, i={self.i}, j={self.j}, delta={self.delta})"
+
+def swap_moves(path, dist):
+    """
+    Lazily generates the moves of swap_neighborhood (the same pairs (i, j), in the same order), with the delta
+    computed in O(1) from the edges around the two nodes. When the nodes are adjacent (j = i + 1) the edge between
+    them is kept and only the two outer edges change.
+    Args:
+        path (list): The current path (closed).
+        dist (dict or dense backend): The distances between the nodes.
+    Yields:
+        Move: The swap moves.
+    """
+    n = len(path)
+    for i in range(1, n - 1):
+        a, x, b = path[i-1], path[i], path[i+1]
+        for j in range(i + 1, n - 1):
+            c, y, d = path[j-1], path[j], path[j+1]
+            if j == i + 1:
+                # Nodi adiacenti: a x y d diventa a y x d
+                delta = (dist[a,y] + dist[y,x] + dist[x,d]) - (dist[a,x] + dist[x,y] + dist[y,d])
+            else:
+                delta = (dist[a,y] + dist[y,b] + dist[c,x] + dist[x,d]) - (dist[a,x] + dist[x,b] + dist[c,y] + dist[y,d])
+            yield Move("swap", i, j, delta)
+
+def two_opt_moves(path, dist):
+    """
+    Lazily generates the moves of two_opt_neighborhood (the same pairs (i, j), with j >= i + 3, in the same order):
+    the reversal of path[i..j], with the delta computed in O(1) from the two replaced edges.
+    Args:
+        path (list): The current path (closed).
+        dist (dict or dense backend): The distances between the nodes.
+    Yields:
+        Move: The 2-opt moves.
+    """
+    n = len(path)
+    for i in range(1, n - 2):
+        a, b = path[i-1], path[i]
+        d_ab = dist[a,b]
+        for j in range(i + 3, n - 1):
+            c, d = path[j], path[j+1]
+            yield Move("two_opt", i, j, dist[a,c] + dist[b,d] - d_ab - dist[c,d])
+
+def or_opt_moves(path, dist, max_length=3):
+    """
+    Lazily generates the Or-opt moves of a path: the segment path[i..i+length-1] (1 <= length <= max_length,
+    the start node is never moved) is inserted between path[j] and path[j+1], in the cheapest orientation.
+    The delta is computed in O(1) from the three removed and the three added edges.
+    Args:
+        path (list): The current path (closed).
+        dist (dict or dense backend): The distances between the nodes.
+        max_length (int, optional): The maximum length of the moved segments. Default is 3.
+    Yields:
+        Move: The Or-opt moves.
+    """
+    n = len(path)
+    for length in range(1, max_length + 1):
+        for i in range(1, n - length):
+            end = i + length - 1
+            p, s1, s2, nx = path[i-1], path[i], path[end], path[end+1]
+            removal_gain = dist[p,s1] + dist[s2,nx] - dist[p,nx]
+            for j in range(n - 1):
+                if i - 1 <= j <= end:
+                    continue  # Inserimento nella posizione attuale o dentro il segmento
+                e, f = path[j], path[j+1]
+                forward = dist[e,s1] + dist[s2,f]
+                backward = dist[e,s2] + dist[s1,f]
+                reverse = length > 1 and backward < forward
+                added = backward if reverse else forward
+                yield Move("or_opt", i, j, added - dist[e,f] - removal_gain, length, reverse)
+
+def insertion_moves(path, dist):
+    """
+    Lazily generates the node insertion moves of a path: the node path[i] (never the start node) is removed and
+    inserted between path[j] and path[j+1]. The delta is computed in O(1): the gain of removing the node
+    (its two edges replaced by the edge between its neighbors) against the cost of the new position; the formula
+    holds also when the new position is next to the old one (j = i - 2 or j = i + 1).
+    Args:
+        path (list): The current path (closed).
+        dist (dict or dense backend): The distances between the nodes.
+    Yields:
+        Move: The insertion moves.
+    """
+    n = len(path)
+    for i in range(1, n - 1):
+        p, x, nx = path[i-1], path[i], path[i+1]
+        removal_gain = dist[p,x] + dist[x,nx] - dist[p,nx]
+        for j in range(n - 1):
+            if j == i - 1 or j == i:
+                continue  # Stessa posizione
+            e, f = path[j], path[j+1]
+            yield Move("insertion", i, j, dist[e,x] + dist[x,f] - dist[e,f] - removal_gain, 1)
+
+# Numero di elementi di un blocco di delta calcolato in una volta da best_two_opt_move
+DEFAULT_TILE_SIZE = 1 << 20
+
+def _block_rows(n, block_size):
+    """
+    Returns the number of rows of a block of an n-column tile: block_size, or about DEFAULT_TILE_SIZE elements.
+    """
+    return block_size or max(1, DEFAULT_TILE_SIZE // max(n, 1))
+
+def best_two_opt_move(path, dist, block_size=None):
+    """
+    Finds the best move of two_opt_moves (the same neighborhood and the same choice among equal deltas) without
+    a Python loop over the pairs (i, j). The nodes are taken in tour order, and for a block of rows i the deltas
+        dist[path[i-1], path[j]] + dist[path[i], path[j+1]] - dist[path[i-1], path[i]] - dist[path[j], path[j+1]]
+    of all the j are computed at once with fancy indexing on the distances, then the argmin is taken.
+    Only a block of about DEFAULT_TILE_SIZE deltas is in memory at a time, so it works on every dense backend.
+    Args:
+        path (list): The current path (closed).
+        dist (dense backend): The distances between the nodes (matrix, memmap, oracle or triangular).
+        block_size (int, optional): The number of rows i of a block. If None, it is chosen from DEFAULT_TILE_SIZE.
+    Returns:
+        Move: The best improving 2-opt move, or None if the path is 2-optimal.
+    """
+    nodes = np.asarray(path, dtype=np.intp)
+    m = len(nodes)
+    if m < 6:
+        return None
+    # edges[k] = dist[path[k], path[k+1]]: i lati del percorso nell'ordine del giro
+    edges = np.asarray(dist[nodes[:-1], nodes[1:]], dtype=np.float64)
+    columns = np.arange(m - 1)
+    rows = _block_rows(m, block_size)
+    best_delta, best_i, best_j = 0.0, -1, -1
+
+    for start in range(1, m - 4, rows):
+        i = np.arange(start, min(start + rows, m - 4))
+        # Riquadro dei delta: righe i, colonne j in 0..m-2 (quelle con j < i + 3 vengono escluse)
+        tile = np.asarray(dist[nodes[i - 1, np.newaxis], nodes[np.newaxis, :-1]], dtype=np.float64)
+        tile += np.asarray(dist[nodes[i, np.newaxis], nodes[np.newaxis, 1:]], dtype=np.float64)
+        tile -= edges[i - 1, np.newaxis]
+        tile -= edges[np.newaxis, :]
+        tile[columns[np.newaxis, :] < i[:, np.newaxis] + 3] = np.inf
+        k = int(np.argmin(tile))  # La prima posizione minima: stesso ordine (i, j) di two_opt_moves
+        r, j = divmod(k, m - 1)
+        if tile[r, j] < best_delta:
+            best_delta, best_i, best_j = tile[r, j], int(i[r]), j
+
+    if best_i < 0:
+        return None
+    # Il delta della mossa scelta è ricalcolato esattamente sugli elementi originali (interi per TSPLIB)
+    a, b, c, d = path[best_i - 1], path[best_i], path[best_j], path[best_j + 1]
+    delta = dist[a,c] + dist[b,d] - dist[a,b] - dist[c,d]
+    if isinstance(delta, np.generic):
+        delta = delta.item()
+    return Move("two_opt", best_i, best_j, delta)
+
+# Vicinati materializzati e generatori di mosse equivalenti (stessi vicini, nello stesso ordine)
+NEIGHBORHOOD_MOVES = {
+    swap_neighborhood: swap_moves,
+    two_opt_neighborhood: two_opt_moves,
+}
+# Generatori di mosse accettati direttamente da local_search; i nuovi operatori vanno aggiunti qui
+MOVE_GENERATORS = (swap_moves, two_opt_moves, or_opt_moves, insertion_moves)
+
+def _gather(dist, rows, columns):
+    """
+    Returns the block dist[rows[r], columns[c]] as a float64 array, on any dense backend.
+    """
+    return np.asarray(dist[rows[:, np.newaxis], columns[np.newaxis, :]], dtype=np.float64)
+
+def _best_in_tiles(tiles):
+    """
+    Returns (delta, i, j) of the first minimal negative delta over the blocks (i_values, j_values, tile)
+    given in the order of the moves, or None.
+    """
+    best = None
+    for i_values, j_values, tile in tiles:
+        k = int(np.argmin(tile))
+        r, c = divmod(k, tile.shape[1])
+        if tile[r, c] < 0 and (best is None or tile[r, c] < best[0]):
+            best = (tile[r, c], int(i_values[r]), int(j_values[c]))
+    return best
+
+def best_swap_move(path, dist, block_size=None):
+    """
+    Finds the best move of swap_moves (the same neighborhood and the same choice among equal deltas) with the
+    deltas of a block of rows i computed at once, like best_two_opt_move. The deltas of the adjacent pairs
+    (j = i + 1), where the edge between the two nodes is kept, are computed separately.
+    Args:
+        path (list): The current path (closed).
+        dist (dense backend): The distances between the nodes.
+        block_size (int, optional): The number of rows i of a block. If None, it is chosen from DEFAULT_TILE_SIZE.
+    Returns:
+        Move: The best improving swap move, or None if no swap improves the path.
+    """
+    nodes = np.asarray(path, dtype=np.intp)
+    m = len(nodes)
+    if m < 4:
+        return None
+    edges = np.asarray(dist[nodes[:-1], nodes[1:]], dtype=np.float64)
+    j_values = np.arange(1, m - 1)
+    rows = _block_rows(m, block_size)
+
+    def tiles():
+        for start in range(1, m - 2, rows):
+            i = np.arange(start, min(start + rows, m - 2))
+            x, a, b = nodes[i], nodes[i - 1], nodes[i + 1]
+            y, c, d = nodes[j_values], nodes[j_values - 1], nodes[j_values + 1]
+            # Scambio di nodi non adiacenti: a x b ... c y d diventa a y b ... c x d
+            tile = _gather(dist, a, y) + _gather(dist, b, y) + _gather(dist, x, c) + _gather(dist, x, d)
+            tile -= (edges[i - 1] + edges[i])[:, np.newaxis]
+            tile -= (edges[j_values - 1] + edges[j_values])[np.newaxis, :]
+            # Nodi adiacenti (j = i + 1): a x y d diventa a y x d
+            adjacent = i + 1 < m - 1
+            ia = i[adjacent]
+            if len(ia):
+                a2, x2, y2, d2 = nodes[ia - 1], nodes[ia], nodes[ia + 1], nodes[ia + 2]
+                exact = (np.asarray(dist[a2, y2], dtype=np.float64) + np.asarray(dist[y2, x2], dtype=np.float64)
+                         + np.asarray(dist[x2, d2], dtype=np.float64) - edges[ia - 1] - edges[ia] - edges[ia + 1])
+                tile[np.flatnonzero(adjacent), ia] = exact  # colonna di j = i + 1 è j - 1 = i
+            tile[j_values[np.newaxis, :] <= i[:, np.newaxis]] = np.inf
+            yield i, j_values, tile
+
+    best = _best_in_tiles(tiles())
+    if best is None:
+        return None
+    i, j = best[1], best[2]
+    q = path[:]
+    q[i], q[j] = q[j], q[i]
+    return Move("swap", i, j, _path_delta(dist, path, q, i - 1, j + 1))
+
+def best_insertion_move(path, dist, block_size=None):
+    """
+    Finds the best move of insertion_moves (the same neighborhood and the same choice among equal deltas) with the
+    deltas of a block of rows i computed at once, like best_two_opt_move.
+    Args:
+        path (list): The current path (closed).
+        dist (dense backend): The distances between the nodes.
+        block_size (int, optional): The number of rows i of a block. If None, it is chosen from DEFAULT_TILE_SIZE.
+    Returns:
+        Move: The best improving insertion move, or None if no insertion improves the path.
+    """
+    nodes = np.asarray(path, dtype=np.intp)
+    m = len(nodes)
+    if m < 5:
+        return None
+    edges = np.asarray(dist[nodes[:-1], nodes[1:]], dtype=np.float64)
+    j_values = np.arange(m - 1)
+    rows = _block_rows(m, block_size)
+
+    def tiles():
+        for start in range(1, m - 1, rows):
+            i = np.arange(start, min(start + rows, m - 1))
+            x, p, nx = nodes[i], nodes[i - 1], nodes[i + 1]
+            removal_gain = edges[i - 1] + edges[i] - np.asarray(dist[p, nx], dtype=np.float64)
+            tile = _gather(dist, x, nodes[:-1]) + _gather(dist, x, nodes[1:])
+            tile -= edges[np.newaxis, :]
+            tile -= removal_gain[:, np.newaxis]
+            same = (j_values[np.newaxis, :] == i[:, np.newaxis] - 1) | (j_values[np.newaxis, :] == i[:, np.newaxis])
+            tile[same] = np.inf
+            yield i, j_values, tile
+
+    best = _best_in_tiles(tiles())
+    if best is None:
+        return None
+    move = Move("insertion", best[1], best[2], 0, 1)
+    q = path[:]
+    move.apply(q)
+    move.delta = _path_delta(dist, path, q, min(best[1], best[2]) - 1, max(best[1], best[2]) + 2)
+    return move
+
+def _path_delta(dist, path, new_path, start, end):
+    """
+    Returns the exact difference of cost between new_path and path, which differ only between the positions
+    start and end (the scores of the kernels are float64, the returned delta keeps the type of the distances).
+    """
+    start, end = max(start, 0), min(end, len(path) - 1)
+    delta = 0
+    for k in range(start, end):
+        delta += dist[new_path[k], new_path[k+1]] - dist[path[k], path[k+1]]
+    return delta.item() if isinstance(delta, np.generic) else delta
+
+# Ricerche esaustive vettorizzate della mossa migliore, usate da local_search sui backend densi
+BEST_MOVE_KERNELS = {
+    two_opt_moves: best_two_opt_move,
+    swap_moves: best_swap_move,
+    insertion_moves: best_insertion_move,
+}
+
+def move_generator(neighborhood_function):
+    """
+    Returns the move generator equivalent to the given neighborhood function (or the function itself,
+    if it is already a move generator), or None if the neighborhood can only be materialized.
+    """
+    if neighborhood_function in MOVE_GENERATORS:
+        return neighborhood_function
+    return NEIGHBORHOOD_MOVES.get(neighborhood_function)
+
 if __name__ == "__main__":
     path = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 0]
     # print_in_square("Path", path)
@@ -1,21 +1,43 @@
 '''
-This module provides various perturbation functions for the Traveling Salesman Problem (TSP). 
+This module provides various perturbation functions for the Traveling Salesman Problem (TSP).
 Each function applies a different type of perturbation to a given TSP solution to explore the solution space.
+Every perturbation builds a valid permutation by construction, so no validity check and no retry loop are needed.
+Every function accepts an optional rng (a numpy.random.Generator or a seed, see make_rng in utils/path_utils.py):
+all the random indices of a perturbation are drawn from it in a single batch, and a seeded rng makes it reproducible.
 Functions:
-    perturbation(solution, phase, points, n, DEBUG=False):
+    perturbation(solution, phase, points, n, DEBUG=False, rng=None):
         Applies a perturbation to the current path based on the current phase.
-    two_opt_randomized(solution, n, points, DEBUG=False):
+    two_opt_randomized(solution, n, points, DEBUG=False, rng=None):
         Performs a randomized 2-opt perturbation by selecting a random segment and reversing its order.
-    multi_swap(solution, k, points, DEBUG=False):
-        Executes k random swaps between pairs of nodes with validity checks.
-    shuffle_partial(solution, n, points, DEBUG=False):
+    multi_swap(solution, k, points, DEBUG=False, rng=None):
+        Executes k random swaps between pairs of nodes.
+    shuffle_partial(solution, n, points, DEBUG=False, rng=None):
         Randomly selects a subsequence of nodes in the path and shuffles them.
-    three_opt_randomized(solution, points, DEBUG=False):
+    three_opt_randomized(solution, points, DEBUG=False, rng=None):
         Applies a randomized 3-opt perturbation by dividing the path into three random segments and reconnecting them.
-    double_bridge_move(solution, points, DEBUG=False):
+    double_bridge_move(solution, points, DEBUG=False, rng=None):
         Cuts the path into four distinct segments and recombines them by swapping the positions of two central segments.
-    perturbation_swap_segments(solution, points, DEBUG=False):
+    perturbation_swap_segments(solution, points, DEBUG=False, rng=None):
         Selects two random segments in the path, ensuring they do not overlap, and swaps their positions.
+In-place perturbations:
+    The functions with the _tour suffix apply the same perturbations in place to a tour object (Tour or TwoLevelTour,
+    see tour.py), using only reversals of segments and swaps of nodes: they cost O(k) or O(segment) instead of
+    rebuilding the whole list. Each one returns the list of the "dirty" nodes, the endpoints of the edges it
+    changed, so the following local search can start from them instead of scanning the whole tour.
+    perturbation_tour(tour, phase, DEBUG=False, rng=None):
+        Applies the perturbation of the given phase to a tour.
+    segment_reversal_tour(tour, length, rng=None):
+        Reverses a random segment of the given length.
+    multi_swap_tour(tour, k, rng=None):
+        Executes k random swaps between pairs of nodes.
+    shuffle_partial_tour(tour, length, rng=None):
+        Shuffles a random segment of the given length.
+    three_opt_tour(tour, segment_length=None, rng=None):
+        Reconnects three random segments with one of the 3-opt reconnections.
+    double_bridge_tour(tour, segment_length=None, rng=None):
+        Double bridge move, optionally restricted to a window of 3 * segment_length nodes.
+    swap_segments_tour(tour, segment_length=None, rng=None):
+        Swaps two random non-overlapping segments.
 Usage:
     The perturbation functions can be used to explore the solution space of the TSP by applying different types of perturbations to a given solution.
     Example:
@@ -23,18 +45,24 @@ Usage:
     This will test the perturbation functions by applying each perturbation type to a sample TSP solution.
 '''
 import numpy as np
-import random
 
-from ..utils.algorithm_metrics import check_path
+from .tour import reverse_segment
+from ..utils.path_utils import make_rng
 
-def perturbation(solution, phase, points,n, DEBUG=False):
+def _distinct(rng, start, stop, k):
+    """
+    Estrae in un solo blocco k interi distinti in [start, stop) e li restituisce ordinati.
+    """
+    return (np.sort(rng.choice(stop - start, size=k, replace=False)) + start).tolist()
+
+def perturbation(solution, phase, points,n, DEBUG=False, rng=None):
     """
     Applica una perturbazione al percorso attuale in base alla fase corrente.
     La perturbazione può essere di diverso tipo a seconda della fase:
     - "aggressive": double bridge move
     - "medium": multi-swap
     - "soft": 2-opt randomizzata
-    The number of multi-swap operations is set to n//50, and the number of nodes to shuffle is set to n//10, 
+    The number of multi-swap operations is set to n//50, and the number of nodes to shuffle is set to n//10,
     so that the perturbation is proportional to the size of the problem.
     Args:
         solution (list): Il percorso attuale.
@@ -42,199 +70,378 @@ def perturbation(solution, phase, points,n, DEBUG=False):
         points (list): Lista di punti (coordinate o dati relativi al problema TSP).
         n (int): Numero di nodi del problema TSP.
         DEBUG (bool): Se True, stampa informazioni aggiuntive.
+        rng (numpy.random.Generator, int or None): Il generatore casuale o il suo seme (vedi make_rng).
     Returns:
         list: Il percorso perturbato valido.
     """
-    
+
     if phase == "aggressive":
-        return double_bridge_move(solution, points, DEBUG=DEBUG)
+        return double_bridge_move(solution, points, DEBUG=DEBUG, rng=rng)
     elif phase == "medium":
-        return multi_swap(solution, k=n//50 , points=points, DEBUG=DEBUG)
+        return multi_swap(solution, k=n//50 , points=points, DEBUG=DEBUG, rng=rng)
     elif phase == "soft":
-        return shuffle_partial(solution, n=n//10, points=points, DEBUG=DEBUG)
+        return shuffle_partial(solution, n=n//10, points=points, DEBUG=DEBUG, rng=rng)
     else:
         raise ValueError("Fase non valida.")
-    
-    
-def two_opt_randomized(solution, n, points, DEBUG=False):
+
+
+def two_opt_randomized(solution, n, points, DEBUG=False, rng=None):
     """
     Effettua una perturbazione sul percorso attuale selezionando un segmento casuale e invertendone l'ordine.
-    È una variante del classico algoritmo 2-opt, ma il segmento da invertire viene scelto in modo casuale
-    Viene effettuato anche un controllo di validità.
+    È una variante del classico algoritmo 2-opt, ma il segmento da invertire viene scelto in modo casuale.
+    Il risultato è sempre una permutazione valida: non serve alcun controllo.
     Args:
         solution (list): Il percorso attuale.
         n (int): Lunghezza del segmento da invertire.
-        points (list): Lista di punti (coordinate o dati relativi al problema TSP).
+        points (list): Lista di punti (non più necessaria, mantenuta per compatibilità).
         DEBUG (bool): Se True, stampa informazioni aggiuntive.
+        rng (numpy.random.Generator, int or None): Il generatore casuale o il suo seme (vedi make_rng).
     Returns:
         list: Il percorso perturbato valido.
     """
     size = len(solution) - 1  # Escludi l'ultimo nodo
-    while True:
-        i = random.randint(1, size - n - 1)  # Evita il primo e l'ultimo nodo
-        j = i + n
-        new_solution = solution[:i] + solution[i:j][::-1] + solution[j:]
-        if check_path(points, new_solution):
-            if DEBUG:
-                print(f"2-opt valido trovato: i={i}, j={j}")
-            return new_solution
-        elif DEBUG:
-            print(f"2-opt non valido: i={i}, j={j}. Rigenero...")
-
-def multi_swap(solution, k, points, DEBUG=False):
-    """
-    Esegue k scambi casuali tra coppie di nodi con controllo di validità.
+    i = int(make_rng(rng).integers(1, size - n))  # Evita il primo e l'ultimo nodo
+    j = i + n
+    if DEBUG:
+        print(f"2-opt: i={i}, j={j}")
+    return solution[:i] + solution[i:j][::-1] + solution[j:]
+
+def multi_swap(solution, k, points, DEBUG=False, rng=None):
+    """
+    Esegue k scambi casuali tra coppie di nodi.
     Args:
         solution (list): Il percorso attuale.
         k (int): Numero di scambi casuali da effettuare.
-        points (list): Lista di punti (coordinate o dati relativi al problema TSP).
+        points (list): Lista di punti (non più necessaria, mantenuta per compatibilità).
         DEBUG (bool): Se True, stampa informazioni aggiuntive.
+        rng (numpy.random.Generator, int or None): Il generatore casuale o il suo seme (vedi make_rng).
     Returns:
         list: Il percorso perturbato valido.
     """
     size = len(solution) - 1  # Escludi l'ultimo nodo
-    while True:
-        new_solution = solution[:]
-        for _ in range(k):
-            i, j = random.sample(range(1, size), 2)  # Evita il primo e l'ultimo nodo
-            new_solution[i], new_solution[j] = new_solution[j], new_solution[i]
-        if check_path(points, new_solution, DEBUG):
-            if DEBUG:
-                print(f"Multi-swap valido con {k} scambi.")
-            return new_solution
-        elif DEBUG:
-            print(f"Multi-swap non valido. Rigenero...")
-
-def shuffle_partial(solution, n, points, DEBUG=False):
+    new_solution = solution[:]
+    for i, j in _swap_pairs(make_rng(rng), 1, size, k):  # Evita il primo e l'ultimo nodo
+        new_solution[i], new_solution[j] = new_solution[j], new_solution[i]
+    if DEBUG:
+        print(f"Multi-swap con {k} scambi.")
+    return new_solution
+
+def shuffle_partial(solution, n, points, DEBUG=False, rng=None):
     """
     Seleziona casualmente una sottosequenza di nodi nel percorso e la mescola in modo casuale.
-    Viene effettuato anche un controllo di validità.
     Args:
         solution (list): Il percorso attuale.
         n (int): Lunghezza della sottosequenza da mescolare.
-        points (list): Lista di punti (coordinate o dati relativi al problema TSP).
+        points (list): Lista di punti (non più necessaria, mantenuta per compatibilità).
         DEBUG (bool): Se True, stampa informazioni aggiuntive.
+        rng (numpy.random.Generator, int or None): Il generatore casuale o il suo seme (vedi make_rng).
     Returns:
         list: Il percorso perturbato valido.
     """
     size = len(solution) - 1  # Escludi l'ultimo nodo
-    while True:
-        i = random.randint(1, size - n - 1)  # Evita il primo e l'ultimo nodo
-        j = i + n
-        segment = solution[i:j]
-        random.shuffle(segment)
-        new_solution = solution[:i] + segment + solution[j:]
-        if check_path(points, new_solution, DEBUG):
-            if DEBUG:
-                print(f"Shuffle valido: segmento [{i}:{j}] mescolato.")
-            return new_solution
-        elif DEBUG:
-            print(f"Shuffle non valido: segmento [{i}:{j}]. Rigenero...")
-
-def three_opt_randomized(solution, points, DEBUG=False):
-    """
-    Applica una perturbazione 3-opt randomizzata con controllo di validità.
+    rng = make_rng(rng)
+    i = int(rng.integers(1, size - n))  # Evita il primo e l'ultimo nodo
+    j = i + n
+    segment = [solution[index] for index in (rng.permutation(n) + i).tolist()]
+    if DEBUG:
+        print(f"Shuffle: segmento [{i}:{j}] mescolato.")
+    return solution[:i] + segment + solution[j:]
+
+def three_opt_randomized(solution, points, DEBUG=False, rng=None):
+    """
+    Applica una perturbazione 3-opt randomizzata.
     Introduce una perturbazione più complessa dividendo il percorso in tre segmenti casuali
-    e riconnettendoli in uno dei diversi modi possibili (incluso il loro ordine originale o inversioni).
+    e riconnettendoli in uno dei diversi modi possibili (scambi e inversioni dei due segmenti centrali).
+    Tutte le configurazioni sono permutazioni dello stesso percorso, quindi sempre valide.
     Args:
         solution (list): Il percorso attuale.
-        points (list): Lista di punti (coordinate o dati relativi al problema TSP).
+        points (list): Lista di punti (non più necessaria, mantenuta per compatibilità).
         DEBUG (bool): Se True, stampa informazioni aggiuntive.
+        rng (numpy.random.Generator, int or None): Il generatore casuale o il suo seme (vedi make_rng).
     Returns:
         list: Il percorso perturbato valido.
     """
     size = len(solution) - 1  # Escludi l'ultimo nodo
-    while True:
-        a, b, c = sorted(random.sample(range(1, size), 3))  # Evita il primo e l'ultimo nodo
-        configurations = [
-            solution[:a] + solution[a:b] + solution[b:c] + solution[c:],  # Originale
-            solution[:a] + solution[b:c] + solution[a:b] + solution[c:],  # Swap 1
-            solution[:a] + solution[a:b][::-1] + solution[b:c] + solution[c:],  # Reverse 1
-            solution[:a] + solution[b:c] + solution[a:b][::-1] + solution[c:],  # Reverse 2
-            solution[:a] + solution[a:b][::-1] + solution[b:c][::-1] + solution[c:],  # Reverse 3
-            solution[:a] + solution[c:b:-1] + solution[a:b] + solution[c:],  # Complex swap 1
-            solution[:a] + solution[b:c] + solution[c:a:-1] + solution[:c]  # Complex swap 2
-        ]
-        new_solution = random.choice(configurations)
-        if check_path(points, new_solution):
-            if DEBUG:
-                print(f"3-opt valido trovato: a={a}, b={b}, c={c}.")
-            return new_solution
-        elif DEBUG:
-            print(f"3-opt non valido: a={a}, b={b}, c={c}. Rigenero...")
-
-def double_bridge_move(solution, points, DEBUG=False):
-    """
-    Taglia il percorso in quattro segmenti distinti e li ricombina scambiando la posizione di due segmenti centrali
-    Viene effettuato anche un controllo di validità.
+    rng = make_rng(rng)
+    a, b, c = _distinct(rng, 1, size, 3)  # Evita il primo e l'ultimo nodo
+    first, second = solution[a:b], solution[b:c]
+    configurations = [
+        first[::-1] + second,  # Reverse 1
+        first + second[::-1],  # Reverse 2
+        first[::-1] + second[::-1],  # Reverse 3
+        second + first,  # Swap
+        second + first[::-1],  # Swap e reverse 1
+        second[::-1] + first,  # Swap e reverse 2
+        second[::-1] + first[::-1],  # Swap e reverse di entrambi
+    ]
+    if DEBUG:
+        print(f"3-opt: a={a}, b={b}, c={c}.")
+    return solution[:a] + configurations[int(rng.integers(len(configurations)))] + solution[c:]
+
+def double_bridge_move(solution, points, DEBUG=False, rng=None):
+    """
+    Taglia il percorso in quattro segmenti distinti e li ricombina scambiando la posizione di due segmenti centrali.
     Args:
         solution (list): Il percorso attuale.
-        points (list): Lista di punti (coordinate o dati relativi al problema TSP).
+        points (list): Lista di punti (non più necessaria, mantenuta per compatibilità).
         DEBUG (bool): Se True, stampa informazioni aggiuntive.
+        rng (numpy.random.Generator, int or None): Il generatore casuale o il suo seme (vedi make_rng).
     Returns:
         list: Il percorso perturbato valido.
     """
     size = len(solution) - 1  # Escludi l'ultimo nodo
     if size < 8:
         raise ValueError("La soluzione deve contenere almeno 8 nodi per il Double Bridge Move.")
-    while True:
-        a, b, c, d = sorted(random.sample(range(1, size), 4))  # Evita il primo e l'ultimo nodo
-        new_solution = (
-            solution[:a] +
-            solution[c:d] +
-            solution[b:c] +
-            solution[a:b] +
-            solution[d:]
-        )
-        if check_path(points, new_solution, DEBUG):
-            if DEBUG:
-                print(f"Double Bridge Move valido trovato: a={a}, b={b}, c={c}, d={d}.")
-            return new_solution
-        elif DEBUG:
-            print(f"Double Bridge Move non valido: a={a}, b={b}, c={c}, d={d}. Rigenero...")
-
-
-def perturbation_swap_segments(solution, points, DEBUG=False):
+    a, b, c, d = _distinct(make_rng(rng), 1, size, 4)  # Evita il primo e l'ultimo nodo
+    if DEBUG:
+        print(f"Double Bridge Move: a={a}, b={b}, c={c}, d={d}.")
+    return (
+        solution[:a] +
+        solution[c:d] +
+        solution[b:c] +
+        solution[a:b] +
+        solution[d:]
+    )
+
+
+def perturbation_swap_segments(solution, points, DEBUG=False, rng=None):
     """
     Seleziona due segmenti casuali nel percorso, assicurandosi che non si sovrappongano,
-    e li scambia di posizione
-    Viene effettuato anche un controllo di validità.
+    e li scambia di posizione.
     Args:
         solution: Lista rappresentante il percorso attuale.
-        points: Lista di punti (coordinate o dati relativi al problema TSP).
+        points: Lista di punti (non più necessaria, mantenuta per compatibilità).
         DEBUG: Se True, stampa informazioni aggiuntive.
+        rng: Il generatore casuale o il suo seme (vedi make_rng).
 
     Returns:
         Lista rappresentante il percorso perturbato valido.
     """
     size = len(solution) - 1  # Escludi l'ultimo nodo
-    while True:
-        # Genera due segmenti casuali
-        i1, j1 = sorted(random.sample(range(1, size), 2))  # Evita il primo e l'ultimo nodo
-        i2, j2 = sorted(random.sample(range(1, size), 2))  # Evita il primo e l'ultimo nodo
-
-        # Assicura che i segmenti non si sovrappongano
-        while i1 <= j2 and i2 <= j1:
-            i1, j1 = sorted(random.sample(range(1, size), 2))
-            i2, j2 = sorted(random.sample(range(1, size), 2))
-
-        if DEBUG:
-            print(f"Swap segments: scelti segmenti [i1={i1}, j1={j1}] e [i2={i2}, j2={j2}]")
-
-        # Scambia i segmenti
-        new_solution = solution.copy()
-        segment1 = new_solution[i1:j1+1]
-        segment2 = new_solution[i2:j2+1]
-        new_solution[i1:j1+1] = segment2
-        new_solution[i2:j2+1] = segment1
-
-        # Verifica la validità della soluzione
-        if check_path(points, new_solution):
-            if DEBUG:
-                print("Soluzione valida trovata.")
-            return new_solution
-        elif DEBUG:
-            print("Soluzione non valida, rigenero...")
+    # Quattro estremi distinti e ordinati definiscono due segmenti disgiunti: [i1, j1] e [i2, j2]
+    i1, j1, i2, j2 = _distinct(make_rng(rng), 1, size, 4)  # Evita il primo e l'ultimo nodo
+
+    if DEBUG:
+        print(f"Swap segments: scelti segmenti [i1={i1}, j1={j1}] e [i2={i2}, j2={j2}]")
+
+    # Scambia i segmenti ricostruendo il percorso nell'ordine corretto
+    return (
+        solution[:i1] +
+        solution[i2:j2+1] +
+        solution[j1+1:i2] +
+        solution[i1:j1+1] +
+        solution[j2+1:]
+    )
+
+# Perturbazioni sul posto su un Tour ______________________________________________
+
+def _ordered(tour, nodes):
+    """
+    Ordina dei nodi distinti nell'ordine in cui il giro li visita partendo dal primo, in O(k²) con between.
+    """
+    first, ordered = nodes[0], [nodes[0]]
+    for node in nodes[1:]:
+        index = 1
+        while index < len(ordered) and tour.between(first, ordered[index], node):
+            index += 1
+        ordered.insert(index, node)
+    return ordered
+
+def _swap_pairs(rng, start, stop, k):
+    """
+    Estrae in un solo blocco k coppie di interi distinti in [start, stop): il secondo elemento
+    è spostato rispetto al primo di una quantità tra 1 e stop - start - 1 (modulo la lunghezza dell'intervallo).
+    """
+    size = stop - start
+    first = rng.integers(0, size, k)
+    second = (first + rng.integers(1, size, k)) % size
+    return zip((first + start).tolist(), (second + start).tolist())
+
+def _random_cuts(tour, k, segment_length=None, rng=None):
+    """
+    Sceglie k nodi distinti nell'ordine del giro: tra tutti i nodi, oppure in una finestra di
+    k * segment_length nodi consecutivi a partire da un nodo casuale (costo O(k * segment_length)).
+    """
+    n = len(tour)
+    rng = make_rng(rng)
+    if segment_length is None or k * segment_length >= n:
+        return _ordered(tour, rng.choice(n, size=k, replace=False).tolist())
+    window = [int(rng.integers(n))]
+    for _ in range(k * segment_length - 1):
+        window.append(tour.next(window[-1]))
+    return [window[index] for index in _distinct(rng, 0, len(window), k)]
+
+def _reverse_segment(tour, outside, first, last, dirty):
+    """
+    Inverte il segmento da first a last (outside è il nodo adiacente a first fuori dal segmento)
+    e aggiunge a dirty gli estremi degli archi modificati.
+    """
+    if first == last:
+        return
+    after = reverse_segment(tour, outside, first, last)
+    dirty.update((outside, first, last, after))
+
+def perturbation_tour(tour, phase, DEBUG=False, rng=None):
+    """
+    Applica sul posto al giro la perturbazione della fase corrente, come perturbation:
+    - "aggressive": double bridge move
+    - "medium": multi-swap con n//50 scambi
+    - "soft": shuffle di un segmento di n//10 nodi
+    Args:
+        tour (Tour or TwoLevelTour): Il giro, modificato sul posto.
+        phase (str): La fase corrente ("aggressive", "medium", "soft").
+        DEBUG (bool): Se True, stampa informazioni aggiuntive.
+        rng (numpy.random.Generator, int or None): Il generatore casuale o il suo seme (vedi make_rng).
+    Returns:
+        list: I nodi estremi degli archi modificati.
+    """
+    n = len(tour)
+    if DEBUG:
+        print(f"Perturbazione sul posto, fase {phase}")
+    if phase == "aggressive":
+        return double_bridge_tour(tour, rng=rng)
+    elif phase == "medium":
+        return multi_swap_tour(tour, n // 50, rng=rng)
+    elif phase == "soft":
+        return shuffle_partial_tour(tour, n // 10, rng=rng)
+    else:
+        raise ValueError("Fase non valida.")
+
+def segment_reversal_tour(tour, length, rng=None):
+    """
+    Inverte sul posto un segmento casuale di length nodi (2-opt randomizzata), in O(length).
+    Args:
+        tour (Tour or TwoLevelTour): Il giro, modificato sul posto.
+        length (int): Lunghezza del segmento da invertire.
+        rng (numpy.random.Generator, int or None): Il generatore casuale o il suo seme (vedi make_rng).
+    Returns:
+        list: I nodi estremi degli archi modificati.
+    """
+    dirty = set()
+    first = int(make_rng(rng).integers(len(tour)))
+    last = first
+    for _ in range(min(length, len(tour) - 2) - 1):
+        last = tour.next(last)
+    _reverse_segment(tour, tour.prev(first), first, last, dirty)
+    return list(dirty)
+
+def multi_swap_tour(tour, k, rng=None):
+    """
+    Esegue sul posto k scambi casuali tra coppie di nodi, in O(k).
+    Args:
+        tour (Tour or TwoLevelTour): Il giro, modificato sul posto.
+        k (int): Numero di scambi casuali da effettuare.
+        rng (numpy.random.Generator, int or None): Il generatore casuale o il suo seme (vedi make_rng).
+    Returns:
+        list: I nodi scambiati e i loro vicini (gli estremi degli archi modificati).
+    """
+    dirty = set()
+    for a, b in _swap_pairs(make_rng(rng), 0, len(tour), k):
+        dirty.update((tour.prev(a), a, tour.next(a), tour.prev(b), b, tour.next(b)))
+        tour.swap_nodes(a, b)
+    return list(dirty)
+
+def shuffle_partial_tour(tour, length, rng=None):
+    """
+    Mescola sul posto un segmento casuale di length nodi (Fisher-Yates con scambi di nodi), in O(length).
+    Args:
+        tour (Tour or TwoLevelTour): Il giro, modificato sul posto.
+        length (int): Lunghezza del segmento da mescolare.
+        rng (numpy.random.Generator, int or None): Il generatore casuale o il suo seme (vedi make_rng).
+    Returns:
+        list: I nodi del segmento e i due nodi adiacenti.
+    """
+    rng = make_rng(rng)
+    segment = [int(rng.integers(len(tour)))]
+    for _ in range(min(length, len(tour)) - 1):
+        segment.append(tour.next(segment[-1]))
+    dirty = set(segment)
+    dirty.update((tour.prev(segment[0]), tour.next(segment[-1])))
+    # Il segmento è mescolato scambiando i nodi nelle sue posizioni
+    slots = segment[:]
+    indices = np.arange(len(slots) - 1, 0, -1)
+    # Tutte le posizioni di Fisher-Yates in un solo blocco: other è uniforme in [0, index]
+    for index, other in zip(indices.tolist(), rng.integers(0, indices + 1).tolist()):
+        if other != index:
+            tour.swap_nodes(slots[index], slots[other])
+            slots[index], slots[other] = slots[other], slots[index]
+    return list(dirty)
+
+def three_opt_tour(tour, segment_length=None, rng=None):
+    """
+    Divide il giro con tre tagli casuali e riconnette i due segmenti centrali B e C in uno dei modi possibili
+    (inversione di B, di C o di entrambi, scambio di B e C con o senza inversioni), usando solo inversioni.
+    Args:
+        tour (Tour or TwoLevelTour): Il giro, modificato sul posto.
+        segment_length (int, optional): Se indicato, i tagli sono scelti in una finestra di 3 * segment_length nodi.
+        rng (numpy.random.Generator, int or None): Il generatore casuale o il suo seme (vedi make_rng).
+    Returns:
+        list: I nodi estremi degli archi modificati.
+    """
+    dirty = set()
+    rng = make_rng(rng)
+    p1, p2, p3 = _random_cuts(tour, 3, segment_length, rng)
+    b1, c1 = tour.next(p1), tour.next(p2)  # B = b1..p2, C = c1..p3
+    move = int(rng.integers(7))
+    if move == 0:  # Reverse B
+        _reverse_segment(tour, p1, b1, p2, dirty)
+    elif move == 1:  # Reverse C
+        _reverse_segment(tour, p2, c1, p3, dirty)
+    elif move == 2:  # Reverse B e C
+        _reverse_segment(tour, p1, b1, p2, dirty)
+        _reverse_segment(tour, b1, c1, p3, dirty)
+    else:
+        # Dopo l'inversione di B C il giro è p1 C^r B^r: le varianti di scambio si ottengono invertendo i pezzi
+        _reverse_segment(tour, p1, b1, p3, dirty)
+        if move in (3, 5):  # Ripristina l'orientamento di C
+            _reverse_segment(tour, p1, p3, c1, dirty)
+        if move in (3, 4):  # Ripristina l'orientamento di B
+            _reverse_segment(tour, p3 if move == 3 else c1, p2, b1, dirty)
+    return list(dirty)
+
+def double_bridge_tour(tour, segment_length=None, rng=None):
+    """
+    Double bridge move sul posto: con i segmenti consecutivi B e C il giro A B C diventa A C B,
+    ottenuto con tre inversioni (B C -> C^r B^r -> C B^r -> C B).
+    Args:
+        tour (Tour or TwoLevelTour): Il giro, modificato sul posto.
+        segment_length (int, optional): Se indicato, i tagli sono scelti in una finestra di 3 * segment_length nodi
+                                        e la mossa costa O(segment_length); altrimenti i tagli sono su tutto il giro.
+        rng (numpy.random.Generator, int or None): Il generatore casuale o il suo seme (vedi make_rng).
+    Returns:
+        list: I nodi estremi degli archi modificati.
+    Raises:
+        ValueError: If the tour has less than 8 nodes.
+    """
+    if len(tour) < 8:
+        raise ValueError("La soluzione deve contenere almeno 8 nodi per il Double Bridge Move.")
+    dirty = set()
+    p1, p2, p3 = _random_cuts(tour, 3, segment_length, rng)
+    b1, c1 = tour.next(p1), tour.next(p2)  # B = b1..p2, C = c1..p3
+    _reverse_segment(tour, p1, b1, p3, dirty)   # p1 C^r B^r
+    _reverse_segment(tour, p1, p3, c1, dirty)   # p1 C B^r
+    _reverse_segment(tour, p3, p2, b1, dirty)   # p1 C B
+    return list(dirty)
+
+def swap_segments_tour(tour, segment_length=None, rng=None):
+    """
+    Scambia sul posto due segmenti casuali disgiunti: X B Y C diventa X C Y B, con quattro inversioni
+    (B Y C -> C^r Y^r B^r, poi ogni pezzo viene invertito di nuovo).
+    Args:
+        tour (Tour or TwoLevelTour): Il giro, modificato sul posto.
+        segment_length (int, optional): Se indicato, i tagli sono scelti in una finestra di 4 * segment_length nodi.
+        rng (numpy.random.Generator, int or None): Il generatore casuale o il suo seme (vedi make_rng).
+    Returns:
+        list: I nodi estremi degli archi modificati.
+    """
+    dirty = set()
+    p1, p2, p3, p4 = _random_cuts(tour, 4, segment_length, rng)
+    b1, y1, c1 = tour.next(p1), tour.next(p2), tour.next(p3)  # B = b1..p2, Y = y1..p3, C = c1..p4
+    _reverse_segment(tour, p1, b1, p4, dirty)   # p1 C^r Y^r B^r
+    _reverse_segment(tour, p1, p4, c1, dirty)   # p1 C Y^r B^r
+    _reverse_segment(tour, p4, p3, y1, dirty)   # p1 C Y B^r
+    _reverse_segment(tour, p3, p2, b1, dirty)   # p1 C Y B
+    return list(dirty)
 
 if __name__ == "__main__":
     current_solution = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9,0]
@@ -243,7 +450,7 @@ if __name__ == "__main__":
 
     # Perturbazioni
     perturbed_solution = perturbation_swap_segments(current_solution, points, DEBUG=True)
-    print("Perturbazione Swap Segments:", perturbed_solution) 
+    print("Perturbazione Swap Segments:", perturbed_solution)
 
     # 2-opt randomizzato
     perturbed_solution = two_opt_randomized(current_solution, n=3, points=points, DEBUG=True)
@@ -0,0 +1,440 @@
+'''
+This module provides Tour, an array-backed representation of a TSP tour.
+The algorithms represent a tour as a closed Python list (the start node is repeated at the end), and every 2-opt
+move rebuilds the list with path[:i] + path[i:j+1][::-1] + path[j+1:], allocating O(n) new objects per move.
+A Tour keeps the order of the nodes in an int32 numpy array plus the inverse array of their positions, so:
+    - the position of a node, its successor and its predecessor are O(1) lookups;
+    - a segment is reversed in place with a numpy slice, always on the shorter of the two sides of the cycle.
+The closed lists are still the format of the public API: a Tour is built with Tour.from_path at the beginning of
+an algorithm and converted back with to_path at the end.
+Classes:
+    Tour(order, start=None):
+        Cyclic tour with in-place segment reversal and O(1) next, prev, between and position queries.
+    TwoLevelTour(order, start=None, group_size=None):
+        Cyclic tour stored as a list of segments with a reversal bit, with O(sqrt(n)) reversals.
+Functions:
+    reverse_segment(tour, outside, first, last):
+        Reverses a segment identified by its endpoints, whatever the orientation of the tour.
+    make_tour(path, backend="array"):
+        Builds the tour of the given backend from a closed path.
+Tour backends:
+    - "array" (Tour): a reversal costs O(n), but it's a single numpy slice: it's the fastest choice up to
+      some tens of thousands of nodes.
+    - "two_level" (TwoLevelTour): the two-level doubly-linked list of LKH. The tour is split in about sqrt(n)
+      segments, each with a reversal bit; a reversal splits the segments at its two ends and then reverses the
+      order of the whole segments between them and flips their bits, so it costs O(sqrt(n)) whatever the length
+      of the reversed path. next, prev and between stay O(1). The splits are balanced by rebuilding the segments
+      when their number doubles (O(n) every O(sqrt(n)) reversals, O(sqrt(n)) amortized).
+Note:
+    Reversing the shorter side of the cycle may change the orientation of the tour: on the symmetric instances
+    (the only ones supported by the algorithms) the cost doesn't change.
+Usage:
+    tour = Tour.from_path(path)
+    tour.reverse_path(tour.next(a), c)   # 2-opt move that adds the edges (a, c) and (next(a), next(c))
+    path = tour.to_path()
+'''
+import math
+import numpy as np
+
+TOUR_BACKENDS = ("array", "two_level")
+
+class Tour:
+    """
+    Cyclic tour stored as an int32 array of nodes (order) and the inverse array of their positions (position),
+    so that order[position[node]] == node for every node.
+    Attributes:
+        order (numpy.ndarray): The nodes in the order they are visited (the start node is not repeated).
+        position (numpy.ndarray): The position of each node in order.
+        start (int): The node the closed path returned by to_path starts from.
+    """
+    __slots__ = ("order", "position", "start")
+
+    def __init__(self, order, start=None):
+        """
+        Args:
+            order (array-like): The n distinct nodes 0..n-1 in the order they are visited.
+            start (int, optional): The start node of the closed path returned by to_path. Default is order[0].
+        Raises:
+            ValueError: If order is not a permutation of the nodes 0..n-1.
+        """
+        self.order = np.array(order, dtype=np.int32)
+        n = self.order.shape[0]
+        self.position = np.full(n, -1, dtype=np.int32)
+        if n and (self.order.min() < 0 or self.order.max() >= n):
+            raise ValueError("Tour non valido: i nodi devono essere una permutazione di 0..n-1")
+        self.position[self.order] = np.arange(n, dtype=np.int32)
+        if (self.position < 0).any():
+            raise ValueError("Tour non valido: i nodi devono essere una permutazione di 0..n-1")
+        self.start = int(self.order[0]) if start is None else int(start)
+
+    @classmethod
+    def from_path(cls, path):
+        """
+        Builds a Tour from a closed path (the start node repeated at the end) or from an open one.
+        Args:
+            path (list): The path.
+        Returns:
+            Tour: The tour, with the first node of the path as start.
+        """
+        if len(path) > 1 and path[0] == path[-1]:
+            path = path[:-1]
+        return cls(path)
+
+    def to_path(self):
+        """
+        Returns the tour as a closed list of Python ints that starts and ends with the start node.
+        """
+        index = int(self.position[self.start])
+        path = np.concatenate((self.order[index:], self.order[:index + 1]))
+        return path.tolist()
+
+    def copy(self):
+        """
+        Returns an independent copy of the tour.
+        """
+        tour = Tour.__new__(Tour)
+        tour.order = self.order.copy()
+        tour.position = self.position.copy()
+        tour.start = self.start
+        return tour
+
+    def __len__(self):
+        return self.order.shape[0]
+
+    def __iter__(self):
+        return iter(self.order.tolist())
+
+    def tolist(self):
+        """
+        Returns the nodes in the order they are visited, as an open list of Python ints.
+        """
+        return self.order.tolist()
+
+    def __repr__(self):
+        return f"Tour(n={len(self)}, start={self.start})"
+
+    def index(self, node):
+        """
+        Returns the position of a node in the tour.
+        """
+        return int(self.position[node])
+
+    def node_at(self, index):
+        """
+        Returns the node at the given position (taken modulo n).
+        """
+        return int(self.order[index % self.order.shape[0]])
+
+    def next(self, node):
+        """
+        Returns the successor of a node.
+        """
+        index = self.position[node] + 1
+        return int(self.order[index if index < self.order.shape[0] else 0])
+
+    def prev(self, node):
+        """
+        Returns the predecessor of a node.
+        """
+        return int(self.order[self.position[node] - 1])
+
+    def between(self, a, b, c):
+        """
+        Returns True if b is met going forward from a to c (a and c included).
+        """
+        pa, pb, pc = self.position[a], self.position[b], self.position[c]
+        if pa <= pc:
+            return bool(pa <= pb <= pc)
+        return bool(pb >= pa or pb <= pc)
+
+    def reverse(self, i, j):
+        """
+        Reverses in place the segment that goes forward from position i to position j (it may wrap around the end).
+        If the segment is longer than half of the tour, the other side of the cycle is reversed instead:
+        the resulting cycle is the same, visited in the opposite direction.
+        Args:
+            i (int): The position of the first node of the segment.
+            j (int): The position of the last node of the segment.
+        Returns:
+            None
+        """
+        n = self.order.shape[0]
+        i, j = i % n, j % n
+        length = (j - i) % n + 1
+        if 2 * length > n:
+            # Invertire il complemento è equivalente e costa meno
+            i, j = (j + 1) % n, (i - 1) % n
+            length = n - length
+        if length < 2:
+            return
+        if i <= j:
+            segment = self.order[i:j + 1][::-1].copy()
+            self.order[i:j + 1] = segment
+            self.position[segment] = np.arange(i, j + 1, dtype=np.int32)
+        else:
+            indices = (i + np.arange(length)) % n
+            segment = self.order[indices[::-1]]
+            self.order[indices] = segment
+            self.position[segment] = indices
+
+    def reverse_path(self, a, b):
+        """
+        Reverses in place the path that goes forward from node a to node b.
+        After the move the tour contains the edges (prev(a), b) and (a, next(b)) of the original tour.
+        """
+        self.reverse(self.position[a], self.position[b])
+
+    def swap_nodes(self, a, b):
+        """
+        Exchanges in place the positions of two nodes, in O(1).
+        """
+        pa, pb = self.position[a], self.position[b]
+        self.order[pa], self.order[pb] = b, a
+        self.position[a], self.position[b] = pb, pa
+
+
+class TwoLevelTour:
+    """
+    Cyclic tour stored as a sequence of segments (two-level doubly-linked list), see the module docstring.
+    Every segment keeps its nodes in a Python list and a reversal bit: when the bit is set, the segment is
+    visited from the last node of its list to the first one.
+    The interface is the same as Tour (except the positional methods index, node_at and reverse).
+    """
+    __slots__ = ("n", "start", "group_size", "segments", "reversed", "sequence", "rank", "segment", "offset")
+
+    def __init__(self, order, start=None, group_size=None):
+        """
+        Args:
+            order (array-like): The n distinct nodes 0..n-1 in the order they are visited.
+            start (int, optional): The start node of the closed path returned by to_path. Default is order[0].
+            group_size (int, optional): The initial size of the segments. Default is about sqrt(n).
+        Raises:
+            ValueError: If order is not a permutation of the nodes 0..n-1.
+        """
+        order = [int(node) for node in order]
+        self.n = len(order)
+        if sorted(order) != list(range(self.n)):
+            raise ValueError("Tour non valido: i nodi devono essere una permutazione di 0..n-1")
+        self.start = order[0] if start is None else int(start)
+        self.group_size = group_size or max(8, int(math.sqrt(self.n)))
+        self.segment = [0] * self.n  # Segmento di ogni nodo
+        self.offset = [0] * self.n   # Indice di ogni nodo nella lista del suo segmento
+        self._build(order)
+
+    def _build(self, order):
+        """
+        Splits the order in segments of group_size nodes, all with the reversal bit unset.
+        """
+        self.segments = [order[i:i + self.group_size] for i in range(0, self.n, self.group_size)]
+        self.reversed = [False] * len(self.segments)
+        self.sequence = list(range(len(self.segments)))  # Ordine dei segmenti nel giro
+        self.rank = list(range(len(self.segments)))      # Posizione di ogni segmento in sequence
+        for s, nodes in enumerate(self.segments):
+            for index, node in enumerate(nodes):
+                self.segment[node] = s
+                self.offset[node] = index
+
+    @classmethod
+    def from_path(cls, path, group_size=None):
+        """
+        Builds a TwoLevelTour from a closed path (the start node repeated at the end) or from an open one.
+        """
+        if len(path) > 1 and path[0] == path[-1]:
+            path = path[:-1]
+        return cls(path, group_size=group_size)
+
+    def tolist(self):
+        """
+        Returns the nodes in the order they are visited, as an open list of Python ints.
+        """
+        order = []
+        for s in self.sequence:
+            order.extend(reversed(self.segments[s]) if self.reversed[s] else self.segments[s])
+        return order
+
+    def to_path(self):
+        """
+        Returns the tour as a closed list of Python ints that starts and ends with the start node.
+        """
+        order = self.tolist()
+        index = order.index(self.start)
+        return order[index:] + order[:index + 1]
+
+    def copy(self):
+        """
+        Returns an independent copy of the tour.
+        """
+        tour = TwoLevelTour.__new__(TwoLevelTour)
+        tour.n, tour.start, tour.group_size = self.n, self.start, self.group_size
+        tour.segments = [nodes[:] for nodes in self.segments]
+        tour.reversed = self.reversed[:]
+        tour.sequence = self.sequence[:]
+        tour.rank = self.rank[:]
+        tour.segment = self.segment[:]
+        tour.offset = self.offset[:]
+        return tour
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __repr__(self):
+        return f"TwoLevelTour(n={self.n}, start={self.start}, segments={len(self.sequence)})"
+
+    def _first(self, s):
+        nodes = self.segments[s]
+        return nodes[-1] if self.reversed[s] else nodes[0]
+
+    def _last(self, s):
+        nodes = self.segments[s]
+        return nodes[0] if self.reversed[s] else nodes[-1]
+
+    def next(self, node):
+        """
+        Returns the successor of a node.
+        """
+        s = self.segment[node]
+        nodes = self.segments[s]
+        index = self.offset[node] + (-1 if self.reversed[s] else 1)
+        if 0 <= index < len(nodes):
+            return nodes[index]
+        return self._first(self.sequence[(self.rank[s] + 1) % len(self.sequence)])
+
+    def prev(self, node):
+        """
+        Returns the predecessor of a node.
+        """
+        s = self.segment[node]
+        nodes = self.segments[s]
+        index = self.offset[node] + (1 if self.reversed[s] else -1)
+        if 0 <= index < len(nodes):
+            return nodes[index]
+        return self._last(self.sequence[self.rank[s] - 1])
+
+    def _key(self, node):
+        """
+        Returns a key that orders the nodes as they are visited (rank of the segment, position in the segment).
+        """
+        s = self.segment[node]
+        offset = self.offset[node]
+        return self.rank[s], (len(self.segments[s]) - 1 - offset if self.reversed[s] else offset)
+
+    def between(self, a, b, c):
+        """
+        Returns True if b is met going forward from a to c (a and c included).
+        """
+        ka, kb, kc = self._key(a), self._key(b), self._key(c)
+        if ka <= kc:
+            return ka <= kb <= kc
+        return kb >= ka or kb <= kc
+
+    def _split_before(self, node):
+        """
+        Splits the segment of node so that node becomes the first node of a segment (in the direction of the tour).
+        Returns the segment that starts with node.
+        """
+        s = self.segment[node]
+        nodes = self.segments[s]
+        k = self.offset[node]
+        if self.reversed[s]:
+            if k == len(nodes) - 1:
+                return s
+            # Visitato al contrario: la parte che segue node nel giro è nodes[:k+1]
+            head, tail = nodes[k + 1:], nodes[:k + 1]
+        else:
+            if k == 0:
+                return s
+            head, tail = nodes[:k], nodes[k:]
+        self.segments[s] = head
+        t = len(self.segments)
+        self.segments.append(tail)
+        self.reversed.append(self.reversed[s])
+        for index, moved in enumerate(head):
+            self.offset[moved] = index
+        for index, moved in enumerate(tail):
+            self.segment[moved] = t
+            self.offset[moved] = index
+        self.sequence.insert(self.rank[s] + 1, t)
+        self.rank.append(0)
+        self._renumber(self.rank[s] + 1)
+        return t
+
+    def _renumber(self, first=0):
+        """
+        Updates the rank of the segments from the given position of the sequence onwards.
+        """
+        for index in range(first, len(self.sequence)):
+            self.rank[self.sequence[index]] = index
+
+    def reverse_path(self, a, b):
+        """
+        Reverses in place the path that goes forward from node a to node b.
+        After the move the tour contains the edges (prev(a), b) and (a, next(b)) of the original tour.
+        """
+        if a == b or self.next(b) == a:
+            return  # Un solo nodo, oppure l'intero ciclo: il giro non cambia
+        first = self._split_before(a)
+        after = self._split_before(self.next(b))
+        last = self.sequence[self.rank[after] - 1]
+        i, j = self.rank[first], self.rank[last]
+        if i > j:
+            # Il cammino attraversa la fine della sequenza: si inverte il complemento, che è equivalente
+            i, j = j + 1, i - 1
+        run = self.sequence[i:j + 1]
+        run.reverse()
+        self.sequence[i:j + 1] = run
+        for s in run:
+            self.reversed[s] = not self.reversed[s]
+        self._renumber(i)
+        if len(self.sequence) > 2 * math.ceil(self.n / self.group_size):
+            self._build(self.tolist())  # Troppi segmenti dopo le divisioni: si ricostruiscono
+
+    def swap_nodes(self, a, b):
+        """
+        Exchanges in place the positions of two nodes, in O(1).
+        """
+        sa, oa, sb, ob = self.segment[a], self.offset[a], self.segment[b], self.offset[b]
+        self.segments[sa][oa], self.segments[sb][ob] = b, a
+        self.segment[a], self.offset[a], self.segment[b], self.offset[b] = sb, ob, sa, oa
+
+def reverse_segment(tour, outside, first, last):
+    """
+    Reverses the segment of the tour that goes from first to last, moving away from outside
+    (the node adjacent to first outside the segment). Unlike reverse_path it doesn't depend on the orientation
+    of the tour, which the previous reversals may have changed.
+    Args:
+        tour (Tour or TwoLevelTour): The tour.
+        outside (int): The node adjacent to first, outside the segment.
+        first (int): The first node of the segment.
+        last (int): The last node of the segment.
+    Returns:
+        int: The node that was adjacent to last outside the segment.
+    """
+    if tour.prev(first) == outside:
+        after = tour.next(last)
+        if first != last:
+            tour.reverse_path(first, last)
+    else:
+        after = tour.prev(last)
+        if first != last:
+            tour.reverse_path(last, first)
+    return after
+
+def make_tour(path, backend="array"):
+    """
+    Builds the tour of the given backend from a closed path.
+    Args:
+        path (list): The closed path (the start node repeated at the end).
+        backend (str, optional): "array" for Tour, "two_level" for TwoLevelTour. Default is "array".
+    Returns:
+        Tour or TwoLevelTour: The tour.
+    Raises:
+        ValueError: If the backend is not supported.
+    """
+    if backend == "array":
+        return Tour.from_path(path)
+    if backend == "two_level":
+        return TwoLevelTour.from_path(path)
+    raise ValueError(f"Backend del tour non valido: {backend}. Valori ammessi: {TOUR_BACKENDS}")
@@ -13,7 +13,8 @@ from ..algorithms.local_search_algorithms import multistart_local_search
 from ..algorithms.neighborhood_generators import swap_neighborhood, two_opt_neighborhood
 from ..utils.algorithm_metrics import path_length
 from ..utils.path_utils import nearest_neighbor_random, nearest_neighbor_second
-from ..utils.tsp_utils import readTSPLIB, read_optimal_tour
+from ..utils.tsp_utils import read_optimal_tour
+from ..utils.tsp_instance import TSPInstance
 
 def store_performance_data(performance_data, output_filepath="TSP/outputs/analysis_results/performances.json"):
     """
@@ -185,7 +186,7 @@ def print_performance_breakdown(nested_results):
                 print(f"    {method.capitalize()}: {value}")
         print()
 
-def analyze_tsp_instance(tsp_instance_filepath, optimal_path_filepath, init_path_strategies=[], neighborhood_search_strategies=[], num_starts=[5, 10, 20]):
+def analyze_tsp_instance(tsp_instance_filepath, optimal_path_filepath, init_path_strategies=[], neighborhood_search_strategies=[], num_starts=[5, 10, 20], backend="matrix"):
     """
     Analyze the performances of the multistart local search algorithm on a single dataset file.
     Args:
@@ -193,6 +194,8 @@ def analyze_tsp_instance(tsp_instance_filepath, optimal_path_filepath, init_path
         path_functions (list): List of path initialization functions.
         neighborhood_functions (list): List of neighborhood functions.
         num_starts (list): List of random start values.
+        backend (str): The distance backend of the instance. With a dense backend ("matrix") the best-improvement
+                       2-opt passes of local_search are vectorized. Default is "matrix".
     Returns:
         dict: A dictionary containing the results for this dataset.
     """
@@ -200,9 +203,11 @@ def analyze_tsp_instance(tsp_instance_filepath, optimal_path_filepath, init_path
     results = defaultdict(lambda: defaultdict(dict))
     
     # Leggi il grafo e calcola le distanze dai dati .tsp
-    n, points, dist = readTSPLIB(tsp_instance_filepath)
-    # Esempio n: 280 (numero di nodi)
-    # Esempio points: [(x1, y1), (x2, y2), ...] (coordinate dei punti)
+    # L'istanza è immutabile: tutte le esecuzioni del multistart la condividono senza reset dei punti
+    instance = TSPInstance.from_tsplib(tsp_instance_filepath, backend=backend)
+    dist = instance.dist
+    # Esempio instance.n: 280 (numero di nodi)
+    # Esempio instance.coords: [[x1, y1], [x2, y2], ...] (coordinate dei punti)
     # Esempio dist: [[0, d1, d2, ...], [d1, 0, d3, ...], ...] (matrice delle distanze)
     
     # Leggi il cammino ottimo e calcola la lunghezza
@@ -223,7 +228,7 @@ def analyze_tsp_instance(tsp_instance_filepath, optimal_path_filepath, init_path
                 print(f"Multistart per il file {tsp_instance_filepath} con {n_starts} partenze, {neighborhood_function_name} e {path_function.__name__}")
                 # Esegui il multistart e ottieni la lunghezza del miglior percorso trovato
                 best_path, best_path_length = multistart_local_search(
-                    points, dist, path_function, neighborhood_function, n_starts
+                    instance, dist, path_function, neighborhood_function, n_starts
                 )
                 path_function_name = path_function.__name__
                 
@@ -20,7 +20,7 @@ from tqdm import tqdm
 
 from .dataset_generator import *
 
-from ..utils.path_utils import nearest_neighbor_second as nearest_neighbor, reset_points, nearest_neighbor_random
+from ..utils.path_utils import nearest_neighbor_second as nearest_neighbor, nearest_neighbor_random
 from ..utils.algorithm_metrics import *
 from ..utils.tsp_utils import *
 
@@ -123,11 +123,9 @@ def generate_statistics(num_vertices_list, max_coords_list, num_instances, input
                                 path= function(points, dist)  
                                 # Compute the metrics
                                 path_distance = path_length(dist, path)
-                                reset_points(points)
                                 execution_time = research_path_time(points, dist, function, print_time=False, make_readable=False)
                                 # If average_time is True, calculate the average execution time
                                 if average_time:
-                                    reset_points(points)        
                                     average_execution_time = average_research_path_time(points, dist, function, num_runs=100, print_time=False, make_readable=False)
                                     insert_result(results, num_vertices, max_coord, path_distance, execution_time, average_execution_time)    
                                 # Otherwise, set the average execution time to 0
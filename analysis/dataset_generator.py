@@ -5,7 +5,7 @@ Functions:
 - generate_all_dataset: Generates datasets for different types of graphs and saves them in respective directories.
 - generate_dataset: Generates random Euclidean graphs and saves them in structured folders.
 - clean_directory: Empties the specified directory.
-- load_graph_data: Loads graph data from a CSV file and returns the coordinates of points and distances.
+- load_graph_data: Loads graph data from a CSV file and returns the coordinates of points and distances (as a dictionary or a dense matrix).
 Usage:
 - To generate all datasets, run the script directly.
 - To clean the data directory, uncomment the clean_directory function call in the main block.
@@ -114,6 +114,7 @@ import shutil
 from tqdm import tqdm
 
 from ..utils import tsp_utils
+from ..utils.distances import to_backend
 def generate_all_dataset():
     """
     Generates benchmark datasets for different types of graphs and saves them to specified directories.
@@ -210,16 +211,17 @@ def clean_directory(dir_path):
     else:
         print(f"The directory {dir_path} does not exist.")
         
-def load_graph_data(file_path):
+def load_graph_data(file_path, backend="dict"):
     """
     Carica i dati del grafo da un file CSV e restituisce le coordinate dei punti e le distanze.
 
     Args:
         file_path (str): Il percorso del file CSV da cui caricare i dati.
+        backend (str, optional): "dict" (default) oppure "matrix" per ottenere una numpy.ndarray densa.
 
     Returns:
         points (list): Lista delle coordinate dei punti.
-        dist (dict): Dizionario delle distanze tra i punti.
+        dist (dict or numpy.ndarray): Dizionario (o matrice) delle distanze tra i punti.
     """
     points = []
     dist = {}
@@ -254,7 +256,7 @@ def load_graph_data(file_path):
                     value = float(key_value[1])  # Distanza come float
                     dist[key] = value
 
-    return points, dist
+    return points, to_backend(dist, backend, len(points))
 
 
 if __name__ == "__main__":
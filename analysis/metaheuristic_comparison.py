@@ -143,9 +143,10 @@ def process_instances(instances_folder, optimal_solutions, output_file=None):
         # n, points, dist = readTSPLIB(file_path)
         
         # Calcola i risultati per ILS, SA e ILSSA
-        ils_sa_result, ils_sa_cost = ils_sa_tsp(file_path, 100)
-        sa_result, sa_cost = complete_simulated_annealing(file_path, T_0=1000, alpha=0.95, max_iterations=10000, number_of_iterations_with_same_temperature=50, DEBUG=False)
-        ils_result, ils_cost= iterated_local_search(file_path, max_iterations=100)
+        # L'istanza viene letta dal file una sola volta, poi gli algoritmi la caricano dalla cache binaria
+        ils_sa_result, ils_sa_cost = ils_sa_tsp(file_path, 100, use_cache=True)
+        sa_result, sa_cost = complete_simulated_annealing(file_path, T_0=1000, alpha=0.95, max_iterations=10000, number_of_iterations_with_same_temperature=50, DEBUG=False, use_cache=True)
+        ils_result, ils_cost= iterated_local_search(file_path, max_iterations=100, use_cache=True)
         
         # Ottieni la soluzione ottima per l'istanza
         optimal_value = optimal_solutions.get(file.replace(".tsp", ""), None)
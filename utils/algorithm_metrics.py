@@ -3,29 +3,52 @@ This module provides utility functions for validating paths, calculating path le
 measuring execution times, and converting time durations to human-readable formats.
 Functions:
     check_path(points, path, DEBUG=False):
-        Validates a given path in a graph.
+        Validates a given path in a graph, in O(n).
+    set_validation_policy(mode, every=100, rate=0.01, seed=None):
+        Sets the global validation policy ("off", "sampled", "every_k" or "always") used by validate_path.
+    get_validation_policy():
+        Returns the current validation policy.
+    validate_path(points, path, DEBUG=False):
+        Validates a path according to the validation policy; used in the loops of the algorithms.
+    tour_cost(dist, path):
+        Computes the exact cost of a given path in a graph, without rounding.
     path_length(dist, path, print_length=False):
-        Computes the length of a given path in a graph.
+        Computes the length of a given path in a graph, rounded to 2 decimals for reporting.
     make_readable_time(time):
         Converts a time duration in seconds to a human-readable string format.
     research_path_time(points, dist, function, print_time=False, make_readable=True):
         Measures the execution time of a given function on a set of parameters.
     average_research_path_time(points, dist, function, num_runs=1000, print_time=False, make_readable=True):
         Measures the execution time of a given function on a set of parameters over multiple runs and prints the average time.
+Validation policy:
+    The algorithms validate their intermediate solutions with validate_path. The default policy ("always") checks
+    every call, as in the debug runs; production runs can skip the checks in the hot loops with
+    set_validation_policy("off"), or keep a cheap safety net with "sampled" or "every_k".
 Usage:
     To use the functions in this module, import the module and call the desired function.
     There are a lot of examples in the main part of the module.
 '''
+import random
 import timeit
+import numpy as np
+
+from .distances import is_matrix
+
+VALIDATION_MODES = ("off", "sampled", "every_k", "always")
+
+# Politica di validazione globale, usata da validate_path nei cicli degli algoritmi
+_validation_policy = {"mode": "always", "every": 100, "rate": 0.01, "calls": 0}
+_validation_random = random.Random()
 
 def check_path(points, path, DEBUG=False):
     """
     Validates a given path in a graph.
     It checks if the path is closed, contains all the nodes, contains only the nodes in the graph, 
     and contains the nodes only once, except for the first and the last.
+    The check is O(n): the nodes of the path are marked in a bitmap instead of being searched in the path.
 
     Parameters:
-        points (list): A list of nodes in the graph.
+        points (list or TSPInstance): A list of nodes in the graph, or a TSPInstance.
         path (list): A list representing the path to be checked.
         DEBUG (bool): Whether to print debug messages.
 
@@ -38,49 +61,139 @@ def check_path(points, path, DEBUG=False):
             print("The path is not closed")
         return False
 
+    # Conta le occorrenze di ogni nodo (il nodo finale è la ripetizione di quello iniziale)
+    n = len(points)
+    seen = bytearray(n)
+    outside = False
+    repeated = False
+    for node in path[:-1]:
+        if not 0 <= node < n:
+            outside = True
+        elif seen[node]:
+            repeated = True
+        else:
+            seen[node] = 1
+
     # Check if the path contains all the nodes
-    for i in range(len(points)):
-        if i not in path:
-            if DEBUG:
-                print("The path doesn't contain all the nodes")
-                # Find the missing node
-                for j in range(len(points)):
-                    if j not in path:
-                        print(f"Missing node: {j}")
-            return False
+    if seen.count(0):
+        if DEBUG:
+            print("The path doesn't contain all the nodes")
+            # Find the missing node
+            for j in range(n):
+                if not seen[j]:
+                    print(f"Missing node: {j}")
+        return False
 
     # Check if the path contains only the nodes in the graph
-    for i in path:
-        if i >= len(points):
-            if DEBUG:
-                print("The path contains nodes not in the graph")
-            return False
+    if outside:
+        if DEBUG:
+            print("The path contains nodes not in the graph")
+        return False
 
     # Check if the path contains the nodes only once, except for the first and the last
-    for i in range(1, len(path) - 1):
-        if path.count(path[i]) != 1:
-            if DEBUG:
-                print("The path contains nodes more than once")
-            return False
+    if repeated:
+        if DEBUG:
+            print("The path contains nodes more than once")
+        return False
 
     return True
 
+def set_validation_policy(mode, every=100, rate=0.01, seed=None):
+    """
+    Sets the global validation policy used by validate_path in the loops of the algorithms.
+    Args:
+        mode (str): "off" (never validate), "sampled" (validate a random fraction of the calls),
+                    "every_k" (validate one call every `every`) or "always" (validate every call, the default).
+        every (int, optional): The period of the "every_k" mode. Default is 100.
+        rate (float, optional): The fraction of the calls validated in the "sampled" mode. Default is 0.01.
+        seed (int, optional): The seed of the sampling of the "sampled" mode. Default is None.
+    Returns:
+        None
+    Raises:
+        ValueError: If the mode or its parameters are not valid.
+    """
+    if mode not in VALIDATION_MODES:
+        raise ValueError(f"Politica di validazione non valida: {mode}. Valori ammessi: {VALIDATION_MODES}")
+    if every < 1 or not 0 <= rate <= 1:
+        raise ValueError(f"Parametri di validazione non validi: every={every}, rate={rate}")
+    _validation_policy.update(mode=mode, every=every, rate=rate, calls=0)
+    if seed is not None:
+        _validation_random.seed(seed)
+
+def get_validation_policy():
+    """
+    Returns a copy of the global validation policy (mode, every, rate and number of calls).
+    """
+    return dict(_validation_policy)
+
+def validate_path(points, path, DEBUG=False):
+    """
+    Validates a path with check_path according to the global validation policy (see set_validation_policy).
+    The calls that the policy skips are considered valid.
+    Args:
+        points (list or TSPInstance): A list of nodes in the graph, or a TSPInstance.
+        path (list): A list representing the path to be checked.
+        DEBUG (bool): Whether to print debug messages.
+    Returns:
+        bool: False if the path was checked and is not valid, True otherwise.
+    """
+    policy = _validation_policy
+    policy["calls"] += 1
+    mode = policy["mode"]
+    if mode == "off":
+        return True
+    if mode == "every_k" and policy["calls"] % policy["every"]:
+        return True
+    if mode == "sampled" and _validation_random.random() >= policy["rate"]:
+        return True
+    return check_path(points, path, DEBUG)
+
+def tour_cost(dist, path):
+    """
+    Computes the exact cost of a given path in a graph.
+
+    For the TSPLIB instances the weights are integers, so the cost is accumulated in int64 and returned as an int:
+    the costs of two paths can be compared exactly and the incremental deltas of the algorithms
+    (current_cost + delta) never drift from the true value. No rounding is applied: this is the function
+    to use inside the loops of the algorithms, while path_length is meant for reporting the results.
+
+    Parameters:
+        dist (dict or numpy.ndarray): The distances between nodes in the graph, as a dictionary keyed by (i, j)
+                                      or as a dense backend.
+        path (list): A list representing the path for which the cost is to be calculated.
+
+    Returns:
+        int or float: The total cost of the path (int if all the weights are integers).
+    """
+    if is_matrix(dist):
+        # Un solo accesso vettoriale alla matrice al posto di n lookup nel dizionario
+        nodes = np.asarray(path, dtype=np.intp)
+        weights = dist[nodes[:-1], nodes[1:]]
+        # Accumulo in int64 anche per le matrici compatte int32
+        accumulator = np.int64 if np.issubdtype(weights.dtype, np.integer) else np.float64
+        return weights.sum(dtype=accumulator).item()
+    cost = 0
+    for i in range(len(path) - 1):
+        cost += dist[path[i], path[i + 1]]
+    return cost
+
 def path_length(dist, path, print_length=False):
     """
     Computes the length of a given path in a graph.
 
     This function calculates the total length of the given path by summing the distances between consecutive nodes.
+    The result is rounded to 2 decimals, so it should be used only to report the results: the algorithms compare
+    and update their costs with tour_cost, which is exact.
 
     Parameters:
-        dist (list): A 2D list representing the distances between nodes in the graph.
+        dist (dict or numpy.ndarray): The distances between nodes in the graph, as a dictionary keyed by (i, j)
+                                      or as a dense matrix.
         path (list): A list representing the path for which the length is to be calculated.
 
     Returns:
         float: The total length of the path.
     """
-    length = 0
-    for i in range(len(path) - 1):
-        length += dist[path[i],path[i + 1]]
+    length = tour_cost(dist, path)
     if print_length:
         print("Path length:", round(length,2))
         return round(length,2)
@@ -151,9 +264,8 @@ def average_research_path_time(points, dist, function, num_runs=1000, print_time
     """
 
     def wrapper():
-        from .path_utils import reset_points
+        # Le euristiche non modificano più i punti: non serve reset_points tra un'esecuzione e l'altra
         function(points, dist)
-        reset_points(points)
     # Misura il tempo totale su num_runs esecuzioni e calcola la media
     total_time = timeit.timeit(wrapper, number=num_runs)
     avg_time = total_time / num_runs
@@ -0,0 +1,414 @@
+'''
+This module provides the candidate lists of an instance: for each node, its k nearest neighbors sorted by distance.
+Most of the good edges of a tour connect a node to one of its nearest neighbors, so the construction heuristics,
+the local searches and the moves of the simulated annealing can be restricted to the candidate edges instead of
+considering all the O(n²) pairs of nodes.
+Functions:
+    nearest_candidates(dist, k=DEFAULT_K, block_size=None):
+        Computes the k nearest neighbors of every node from any dense distance backend.
+    grid_candidates(coords, edge_weight_type, k=DEFAULT_K):
+        Computes the k nearest neighbors of every node from its coordinates, with a uniform grid.
+    minimum_one_tree(dist, penalties=None, special=0):
+        Computes the minimum 1-tree of the distances transformed by the node penalties.
+    subgradient_penalties(dist, max_iterations=DEFAULT_SUBGRADIENT_ITERATIONS, upper_bound=None, special=0):
+        Optimizes the node penalties with the subgradient method, maximizing the 1-tree lower bound.
+    alpha_nearness(dist, penalties=None, special=0):
+        Computes the alpha-nearness of every pair of nodes.
+    alpha_candidates(dist, k=DEFAULT_ALPHA_K, subgradient=True, max_iterations=DEFAULT_SUBGRADIENT_ITERATIONS):
+        Computes for every node the k nodes with the smallest alpha-nearness.
+    candidate_lists(instance, k=DEFAULT_K, method="nearest"):
+        Returns the candidate lists of a TSPInstance, computed once and cached in the instance.
+Alpha-nearness:
+    The k nearest neighbors miss many edges of the optimal tours of clustered instances (e.g. the pr* and fl417
+    files), where the tour must jump between clusters with edges that are long but necessary.
+    The alpha-nearness of an edge (i, j) is the increase of the cost of the minimum 1-tree (a spanning tree of the
+    nodes except a special one, plus two edges of the special node) when the tree is forced to contain (i, j):
+    alpha(i, j) = c(i, j) - beta(i, j), where beta(i, j) is the longest edge on the path between i and j in the tree.
+    The costs can be transformed with node penalties, c(i, j) + pi(i) + pi(j), optimized with the subgradient method
+    so that the 1-tree is as close as possible to a tour (all degrees equal to 2); the alpha values computed on the
+    transformed costs select the edges of the optimal tour with far fewer candidates (k = 5 is usually enough).
+    The computation needs the whole (n, n) matrix, so it is available for the dense backends only.
+Computation:
+    - Dense backends (matrix, memmap, triangular): argpartition on blocks of rows of the matrix, O(n²) time
+      but only O(block_size * n) temporary memory.
+    - Coordinate instances with a DistanceOracle: uniform grid over the coordinates, each node is compared only
+      with the nodes of the cells around it (about O(n * k) distance evaluations instead of O(n²)).
+    The neighbors of each node are sorted by distance, ties broken by the smaller index.
+Usage:
+    instance = TSPInstance.from_tsplib("TSP/data/EUC_2D/500_nodes/rat783.tsp", backend="matrix")
+    candidates = candidate_lists(instance, k=10)   # numpy.ndarray of shape (n, 10)
+    candidates = candidate_lists(instance, k=5, method="alpha")
+    path = nearest_neighbor_second(instance)       # uses the candidate lists of the instance
+'''
+import math
+import numpy as np
+
+from .distances import is_matrix, dict_to_matrix, prepare_coordinates, pairwise_distances, DistanceOracle, BLOCK_ELEMENTS
+
+DEFAULT_K = 10
+DEFAULT_ALPHA_K = 5
+DEFAULT_SUBGRADIENT_ITERATIONS = 100
+
+# Metriche per cui la distanza è almeno scale * (massima differenza tra le coordinate):
+# i nodi fuori dall'area di celle esplorata sono certamente più lontani del limite calcolato
+GRID_METRICS = {
+    "EUC_2D": 1.0,
+    "CEIL_2D": 1.0,
+    "MAN_2D": 1.0,
+    "MAX_2D": 1.0,
+    "EUCLIDEAN": 1.0,
+    "ATT": 1 / math.sqrt(10),
+}
+
+def _sorted_candidates(rows, nodes, k):
+    """
+    Returns the indices of the k smallest values of each row, sorted by value and then by index.
+    The entries of the nodes themselves must already be set to infinity.
+    The argpartition keeps an arbitrary subset of the values tied with the k-th one: the rows with such ties
+    are sorted completely by value and index, so the k smallest indices among the tied nodes are kept.
+    """
+    part = np.argpartition(rows, k - 1, axis=1)[:, :k]
+    values = np.take_along_axis(rows, part, axis=1)
+    tied = np.count_nonzero(rows <= values.max(axis=1)[:, np.newaxis], axis=1) > k
+    if tied.any():
+        # Righe con pareggi sul k-esimo valore: ordinamento completo per distanza e indice del nodo
+        keys = np.broadcast_to(nodes if nodes is not None else np.arange(rows.shape[1]), rows[tied].shape)
+        part[tied] = np.lexsort((keys, rows[tied]), axis=1)[:, :k]
+        values = np.take_along_axis(rows, part, axis=1)
+    # Ordina per distanza e, a parità di distanza, per indice
+    order = np.lexsort((nodes[part] if nodes is not None else part, values), axis=1)
+    return np.take_along_axis(nodes[part] if nodes is not None else part, order, axis=1)
+
+def nearest_candidates(dist, k=DEFAULT_K, block_size=None):
+    """
+    Computes the k nearest neighbors of every node from a distance backend, with a vectorized argpartition
+    on blocks of rows (the whole matrix is never materialized if the backend computes its rows on demand).
+    Args:
+        dist (dict or dense backend): The distances between the nodes.
+        k (int, optional): The number of neighbors of each node. Default is 10.
+        block_size (int, optional): The number of rows processed at once. If None, it is chosen from n.
+    Returns:
+        numpy.ndarray: An int32 array of shape (n, k), where row i contains the neighbors of i sorted by distance.
+    Raises:
+        ValueError: If k is not between 1 and n - 1.
+    """
+    if not is_matrix(dist):
+        dist = dict_to_matrix(dist)
+    n = dist.shape[0]
+    if not 1 <= k <= n - 1:
+        raise ValueError(f"Numero di candidati non valido: {k} (deve essere tra 1 e {n - 1})")
+    if block_size is None:
+        block_size = max(1, BLOCK_ELEMENTS // max(n, 1))
+
+    candidates = np.empty((n, k), dtype=np.int32)
+    columns = np.arange(n)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        block = np.arange(start, stop)
+        if isinstance(dist, np.ndarray):
+            rows = np.array(dist[start:stop], dtype=float)
+        else:
+            rows = np.asarray(dist[block[:, np.newaxis], columns[np.newaxis, :]], dtype=float)
+        rows[block - start, block] = np.inf  # Un nodo non è candidato di se stesso
+        candidates[start:stop] = _sorted_candidates(rows, None, k)
+    return candidates
+
+def grid_candidates(coords, edge_weight_type, k=DEFAULT_K):
+    """
+    Computes the k nearest neighbors of every node from its coordinates, using a uniform grid with about
+    two nodes per cell. The nodes of a cell are compared with the nodes of the square of cells around it,
+    which is enlarged until the k-th neighbor found is certainly closer than every node outside the square.
+    The result is exact, with the ties broken by the smaller index as in nearest_candidates.
+    Args:
+        coords (array-like): The coordinates of the nodes, shape (n, 2).
+        edge_weight_type (str): The metric of the instance, one of GRID_METRICS.
+        k (int, optional): The number of neighbors of each node. Default is 10.
+    Returns:
+        numpy.ndarray: An int32 array of shape (n, k), where row i contains the neighbors of i sorted by distance.
+    Raises:
+        ValueError: If the metric is not supported or k is not between 1 and n - 1.
+    """
+    if edge_weight_type not in GRID_METRICS:
+        raise ValueError(f"EDGE_WEIGHT_TYPE non supportato dalla griglia: {edge_weight_type}. Valori ammessi: {tuple(GRID_METRICS)}")
+    coords = np.asarray(coords, dtype=float)[:, :2]
+    n = coords.shape[0]
+    if not 1 <= k <= n - 1:
+        raise ValueError(f"Numero di candidati non valido: {k} (deve essere tra 1 e {n - 1})")
+    prepared = prepare_coordinates(coords, edge_weight_type)
+    scale = GRID_METRICS[edge_weight_type]
+
+    # Griglia quadrata con circa due nodi per cella
+    side = max(1, int(math.sqrt(n / 2)))
+    low = coords.min(axis=0)
+    cell = max(float((coords.max(axis=0) - low).max()) / side, 1e-12)
+    cells = np.minimum(((coords - low) / cell).astype(np.int64), side - 1)
+    cell_ids = cells[:, 0] * side + cells[:, 1]
+    order = np.argsort(cell_ids, kind="stable")
+    # starts[c]:starts[c + 1] sono le posizioni in order dei nodi della cella c
+    starts = np.searchsorted(cell_ids[order], np.arange(side * side + 1))
+
+    candidates = np.empty((n, k), dtype=np.int32)
+    for cell_id in np.unique(cell_ids):
+        cx, cy = divmod(int(cell_id), side)
+        members = order[starts[cell_id]:starts[cell_id + 1]]
+        radius = 1
+        while True:
+            x0, x1 = max(cx - radius, 0), min(cx + radius, side - 1)
+            y0, y1 = max(cy - radius, 0), min(cy + radius, side - 1)
+            # Le celle con la stessa x e y consecutive sono contigue in order
+            nodes = np.concatenate([order[starts[x * side + y0]:starts[x * side + y1 + 1]] for x in range(x0, x1 + 1)])
+            covers_all = x0 == 0 and y0 == 0 and x1 == side - 1 and y1 == side - 1
+            if len(nodes) > k or covers_all:
+                rows = pairwise_distances(prepared[members][:, np.newaxis, :], prepared[nodes][np.newaxis, :, :],
+                                          edge_weight_type).astype(float)
+                rows[members[:, np.newaxis] == nodes[np.newaxis, :]] = np.inf
+                if len(nodes) > k:
+                    kth = np.partition(rows, k - 1, axis=1)[:, k - 1]
+                    # Distanza minima (lungo x o y) di un nodo esterno al quadrato esplorato
+                    gaps = np.full(len(members), np.inf)
+                    point = coords[members] - low
+                    if x0 > 0:
+                        gaps = np.minimum(gaps, point[:, 0] - x0 * cell)
+                    if x1 < side - 1:
+                        gaps = np.minimum(gaps, (x1 + 1) * cell - point[:, 0])
+                    if y0 > 0:
+                        gaps = np.minimum(gaps, point[:, 1] - y0 * cell)
+                    if y1 < side - 1:
+                        gaps = np.minimum(gaps, (y1 + 1) * cell - point[:, 1])
+                    # Stretto: un nodo esterno alla stessa distanza del k-esimo potrebbe avere un indice minore
+                    if covers_all or np.all(kth < gaps * scale):
+                        candidates[members] = _sorted_candidates(rows, nodes, k)
+                        break
+                elif covers_all:
+                    raise ValueError(f"Numero di candidati non valido: {k} (deve essere tra 1 e {n - 1})")
+            radius += 1
+    return candidates
+
+def _full_matrix(dist):
+    """
+    Returns the distances as a float (n, n) numpy array, for any backend.
+    """
+    if not is_matrix(dist):
+        return dict_to_matrix(dist)
+    if isinstance(dist, np.ndarray):
+        return np.asarray(dist, dtype=float)
+    nodes = np.arange(dist.shape[0])
+    return np.asarray(dist[nodes[:, np.newaxis], nodes[np.newaxis, :]], dtype=float)
+
+def minimum_one_tree(dist, penalties=None, special=0):
+    """
+    Computes the minimum 1-tree of the transformed costs c(i, j) + pi(i) + pi(j): a minimum spanning tree of the
+    nodes except the special one (Prim's algorithm, O(n²)), plus the two shortest edges of the special node.
+    Args:
+        dist (numpy.ndarray): The (n, n) distance matrix.
+        penalties (numpy.ndarray, optional): The node penalties pi. If None, they are all 0.
+        special (int, optional): The special node of the 1-tree. Default is 0.
+    Returns:
+        tuple: A tuple containing:
+            - parent (numpy.ndarray): The parent of each node in the spanning tree (-1 for the root and the special node).
+            - order (numpy.ndarray): The nodes of the spanning tree in the order they were added (parents before children).
+            - special_edges (tuple): The two nodes connected to the special node.
+            - cost (float): The cost of the 1-tree with the transformed costs.
+            - degrees (numpy.ndarray): The degree of each node in the 1-tree.
+    """
+    n = dist.shape[0]
+    pi = np.zeros(n) if penalties is None else penalties
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[special] = True
+    key = np.full(n, np.inf)
+    parent = np.full(n, -1, dtype=np.int64)
+    key[1 if special == 0 else 0] = 0
+    order = np.empty(n - 1, dtype=np.int64)
+
+    for index in range(n - 1):
+        u = int(np.argmin(np.where(in_tree, np.inf, key)))
+        in_tree[u] = True
+        order[index] = u
+        row = dist[u] + pi[u] + pi
+        better = ~in_tree & (row < key)
+        key[better] = row[better]
+        parent[better] = u
+
+    # Il nodo speciale è collegato ai due nodi più vicini (con i costi trasformati)
+    row = dist[special] + pi[special] + pi
+    row[special] = np.inf
+    first, second = np.argpartition(row, 1)[:2]
+    if row[second] < row[first]:
+        first, second = second, first
+    cost = key[order].sum() + row[first] + row[second]
+
+    degrees = np.bincount(parent[order[1:]], minlength=n) + 1
+    degrees[order[0]] -= 1  # La radice non ha un padre
+    degrees[special] = 2
+    degrees[first] += 1
+    degrees[second] += 1
+    return parent, order, (int(first), int(second)), float(cost), degrees
+
+def _greedy_tour_cost(dist):
+    """
+    Returns the cost of a nearest neighbor tour starting from node 0, used as upper bound by the subgradient method.
+    """
+    n = dist.shape[0]
+    unvisited = np.ones(n, dtype=bool)
+    unvisited[0] = False
+    current, cost = 0, 0.0
+    for _ in range(n - 1):
+        row = np.where(unvisited, dist[current], np.inf)
+        nearest = int(np.argmin(row))
+        cost += row[nearest]
+        unvisited[nearest] = False
+        current = nearest
+    return cost + dist[current, 0]
+
+def subgradient_penalties(dist, max_iterations=DEFAULT_SUBGRADIENT_ITERATIONS, upper_bound=None, special=0):
+    """
+    Optimizes the node penalties with the subgradient method (Held and Karp): at each iteration the penalty of
+    every node is moved along the direction degree - 2 of the current 1-tree, with the step
+    t = step_factor * (upper_bound - w(pi)) / ||degree - 2||², and step_factor is halved when the lower bound
+    w(pi) = cost of the 1-tree - 2 * sum(pi) doesn't improve for a while.
+    Args:
+        dist (numpy.ndarray): The (n, n) distance matrix.
+        max_iterations (int, optional): The maximum number of iterations. Default is 100.
+        upper_bound (float, optional): The cost of a known tour. If None, a nearest neighbor tour is used.
+        special (int, optional): The special node of the 1-trees. Default is 0.
+    Returns:
+        tuple: The best penalties found (numpy.ndarray) and the corresponding lower bound on the cost of the tours.
+    """
+    n = dist.shape[0]
+    if upper_bound is None:
+        upper_bound = _greedy_tour_cost(dist)
+    pi = np.zeros(n)
+    best_pi, best_bound = pi.copy(), -np.inf
+    step_factor = 2.0
+    period = max(n // 10, 5)  # Iterazioni senza miglioramento prima di dimezzare il passo
+    without_improvement = 0
+
+    for _ in range(max_iterations):
+        _, _, _, cost, degrees = minimum_one_tree(dist, pi, special)
+        bound = cost - 2 * pi.sum()
+        if bound > best_bound + 1e-9:
+            best_pi, best_bound = pi.copy(), bound
+            without_improvement = 0
+        else:
+            without_improvement += 1
+            if without_improvement >= period:
+                step_factor /= 2
+                without_improvement = 0
+        direction = degrees - 2
+        norm = float(direction @ direction)
+        if norm == 0:
+            break  # Il 1-albero è un tour: è ottimo
+        pi = pi + step_factor * (upper_bound - bound) / norm * direction
+        if step_factor < 1e-6:
+            break
+    return best_pi, best_bound
+
+def alpha_nearness(dist, penalties=None, special=0):
+    """
+    Computes the alpha-nearness of every pair of nodes with respect to the minimum 1-tree of the transformed costs.
+    beta(i, j) is computed for all the pairs in O(n²): the nodes are visited in the order they entered the tree,
+    so the path from an already visited node i to a new node j always passes through the parent of j and
+    beta(i, j) = max(beta(i, parent(j)), c(j, parent(j))).
+    Args:
+        dist (dict or dense backend): The distances between the nodes.
+        penalties (numpy.ndarray, optional): The node penalties pi. If None, they are all 0.
+        special (int, optional): The special node of the 1-tree. Default is 0.
+    Returns:
+        numpy.ndarray: The (n, n) alpha values (0 for the edges of the 1-tree, infinity on the diagonal).
+    """
+    matrix = _full_matrix(dist)
+    n = matrix.shape[0]
+    pi = np.zeros(n) if penalties is None else np.asarray(penalties, dtype=float)
+    parent, order, (first, second), _, _ = minimum_one_tree(matrix, pi, special)
+
+    # beta diventa alpha riga per riga, senza una seconda matrice (n, n)
+    beta = np.zeros((n, n))
+    for index in range(1, n - 1):
+        j = order[index]
+        previous = order[:index]
+        weight = matrix[j, parent[j]] + pi[j] + pi[parent[j]]
+        values = np.maximum(beta[previous, parent[j]], weight)
+        beta[previous, j] = values
+        beta[j, previous] = values
+    # Per il nodo speciale beta è il secondo arco più corto: solo gli archi più corti di esso sono nel 1-albero
+    special_row = matrix[special] + pi[special] + pi
+    beta[special, :] = special_row[second]
+    beta[:, special] = special_row[second]
+
+    for start in range(0, n, max(1, BLOCK_ELEMENTS // max(n, 1))):
+        stop = min(start + max(1, BLOCK_ELEMENTS // max(n, 1)), n)
+        rows = matrix[start:stop] + pi[start:stop, np.newaxis] + pi[np.newaxis, :]
+        beta[start:stop] = np.maximum(rows - beta[start:stop], 0)
+    np.fill_diagonal(beta, np.inf)
+    return beta
+
+def alpha_candidates(dist, k=DEFAULT_ALPHA_K, subgradient=True, max_iterations=DEFAULT_SUBGRADIENT_ITERATIONS):
+    """
+    Computes for every node the k nodes with the smallest alpha-nearness, ties broken by the distance.
+    Args:
+        dist (dict or dense backend): The distances between the nodes.
+        k (int, optional): The number of candidates of each node. Default is 5.
+        subgradient (bool, optional): If True, the node penalties are optimized with subgradient_penalties
+                                      before computing the alpha values. Default is True.
+        max_iterations (int, optional): The maximum number of iterations of the subgradient method. Default is 100.
+    Returns:
+        numpy.ndarray: An int32 array of shape (n, k), where row i contains the candidates of i sorted by alpha.
+    Raises:
+        ValueError: If k is not between 1 and n - 1.
+    """
+    matrix = _full_matrix(dist)
+    n = matrix.shape[0]
+    if not 1 <= k <= n - 1:
+        raise ValueError(f"Numero di candidati non valido: {k} (deve essere tra 1 e {n - 1})")
+    penalties = subgradient_penalties(matrix, max_iterations)[0] if subgradient else None
+    alpha = alpha_nearness(matrix, penalties)
+
+    part = np.argpartition(alpha, k - 1, axis=1)[:, :k]
+    alphas = np.take_along_axis(alpha, part, axis=1)
+    distances = np.take_along_axis(matrix, part, axis=1)
+    order = np.lexsort((part, distances, alphas), axis=1)
+    return np.take_along_axis(part, order, axis=1).astype(np.int32)
+
+def candidate_lists(instance, k=DEFAULT_K, method="nearest"):
+    """
+    Returns the candidate lists of a TSPInstance, computed on the first request and cached in the instance.
+    With method="nearest" the grid is used for the coordinate instances with a DistanceOracle (the matrix
+    doesn't exist), the argpartition on the rows of the matrix otherwise.
+    Args:
+        instance (TSPInstance): The instance.
+        k (int, optional): The number of candidates of each node (at most n - 1). Default is 10.
+        method (str, optional): "nearest" for the k nearest neighbors, "alpha" for the k nodes with the smallest
+                                alpha-nearness (with subgradient-optimized penalties). Default is "nearest".
+    Returns:
+        numpy.ndarray: An int32 array of shape (n, k), where row i contains the candidates of i, best first.
+    Raises:
+        ValueError: If the method is not supported.
+    """
+    k = min(k, instance.n - 1)
+    if method not in ("nearest", "alpha"):
+        raise ValueError(f"Metodo non valido: {method}. Valori ammessi: ('nearest', 'alpha')")
+
+    def compute(instance):
+        dist = instance.dist
+        if method == "alpha":
+            return alpha_candidates(dist, k)
+        if isinstance(dist, DistanceOracle) and dist.edge_weight_type in GRID_METRICS:
+            return grid_candidates(instance.coords, dist.edge_weight_type, k)
+        return nearest_candidates(dist, k)
+
+    return instance.get_index(("candidates", method, k), compute)
+
+if __name__ == "__main__":
+    # Test dei pareggi: brg180 ha molte distanze uguali, i candidati devono essere quelli dell'ordinamento stabile
+    # e il nearest neighbor deve dare lo stesso percorso con il dizionario e con la matrice
+    from .tsp_instance import TSPInstance
+    from .path_utils import nearest_neighbor_second, make_rng
+    file_path = "TSP/data/TSP_instances/brg180.tsp"
+    matrix_instance = TSPInstance.from_tsplib(file_path, backend="matrix")
+    dict_instance = TSPInstance.from_tsplib(file_path, backend="dict")
+    rows = np.array(matrix_instance.dist, dtype=float)
+    np.fill_diagonal(rows, np.inf)
+    stable = np.argsort(rows, axis=1, kind="stable")[:, :DEFAULT_K]
+    print(np.array_equal(nearest_candidates(matrix_instance.dist), stable))  # True
+    print(all(nearest_neighbor_second(dict_instance, rng=make_rng(seed)) ==
+              nearest_neighbor_second(matrix_instance, rng=make_rng(seed)) for seed in range(20)))  # True
@@ -0,0 +1,564 @@
+'''
+This module provides the distance backends that can be used by the algorithms of the project.
+Historically the distances are stored in a dictionary keyed by (i, j) tuples; this module adds
+a dense backend based on a numpy.ndarray of shape (n, n), where dist[i, j] is a single index into
+a contiguous buffer instead of a tuple hash lookup.
+Both backends are indexed in the same way (dist[i, j]), so the algorithms can accept either of them.
+The dense backend also supports rows (dist[i]) and fancy indexing (dist[I, J]), which are used to
+vectorize the hot loops.
+Functions:
+    is_matrix(dist):
+        Checks whether the distances are stored in a dense (matrix-like) backend.
+    dict_to_matrix(dist, n=None, dtype=float):
+        Converts a dictionary of distances into a dense numpy matrix.
+    matrix_to_dict(matrix):
+        Converts a dense numpy matrix into a dictionary of distances.
+    edge_weight(dist, i, j, default=float('inf')):
+        Returns the weight of the edge (i, j) for any backend, or a default value if the edge is missing.
+    to_backend(dist, backend, n=None):
+        Converts a dictionary of distances into the requested backend.
+    prepare_coordinates(coords, edge_weight_type):
+        Converts the coordinates once into the form used by the distance kernels (radians for GEO).
+    pairwise_distances(a, b, edge_weight_type):
+        Computes element-wise the distances between two broadcastable arrays of prepared coordinates.
+    distance_matrix(coords, edge_weight_type, block_size=None):
+        Computes the full (n, n) distance matrix of a set of coordinates.
+    distance_row(coords, i, edge_weight_type):
+        Computes the distances between node i and every node.
+    distance_batch(coords, I, J, edge_weight_type):
+        Computes the distances of an arbitrary batch of pairs (I[k], J[k]).
+    compact_dtype(matrix):
+        Returns the smallest data type (int32 or float32) that stores a distance matrix without changing its values.
+    compact_matrix(matrix, dtype=None):
+        Returns a copy of a distance matrix stored with a compact data type.
+    tri_index(i, j, n):
+        Returns the position of the pair (i, j) in a packed upper-triangular array.
+Classes:
+    DistanceOracle(coords, edge_weight_type, cache_size=DEFAULT_ORACLE_CACHE_SIZE):
+        Lazy backend that keeps only the coordinates and computes the distances on demand.
+    TriangularDistances(data, n):
+        Compact backend that stores only the upper triangle of a symmetric matrix in a packed array.
+The distance kernels follow the TSPLIB rounding rules exactly (the same ones implemented by tsplib95):
+    - EUC_2D / EUC_3D: nint of the Euclidean distance.
+    - CEIL_2D: ceil of the Euclidean distance.
+    - MAN_2D / MAN_3D, MAX_2D / MAX_3D: nint of the Manhattan and maximum distances.
+    - ATT: pseudo-Euclidean distance, r = sqrt((dx² + dy²) / 10), rounded up to the next integer if nint(r) < r.
+    - GEO: coordinates in DDD.MM format converted to radians (degrees truncated, minutes * 5 / 3),
+           distance int(6378.388 * acos(...) + 1).
+    - EUCLIDEAN: plain Euclidean distance without rounding (used by EuclDist).
+Usage:
+    Every function that builds distances (readTSPLIB, EuclDist, randomEuclGraph, load_graph_data)
+    accepts a `backend` parameter ("dict" or "matrix").
+    readTSPLIB also accepts backend="oracle" for the instances too large for an (n, n) matrix,
+    backend="triangular" for the packed symmetric storage and compact=True for int32/float32 matrices.
+    Example:
+        n, points, dist = readTSPLIB("TSP/data/EUC_2D/100_nodes/kroA100.tsp", backend="matrix")
+'''
+from collections import OrderedDict
+import numpy as np
+
+BACKENDS = ("dict", "matrix")
+
+# Raggio terrestre usato dalla TSPLIB per le istanze GEO
+GEO_RADIUS = 6378.388
+
+# Numero massimo di elementi di un blocco temporaneo durante il calcolo della matrice
+BLOCK_ELEMENTS = 1 << 22
+
+# Numero massimo di coppie memorizzate nella cache LRU di un DistanceOracle
+DEFAULT_ORACLE_CACHE_SIZE = 1 << 16
+
+def is_matrix(dist):
+    """
+    Checks whether the distances are stored in a dense (matrix-like) backend.
+    A dense backend supports dist[i, j] for every pair of nodes, rows (dist[i]) and fancy indexing (dist[I, J]).
+    Args:
+        dist (dict or numpy.ndarray): The distances between the nodes.
+    Returns:
+        bool: True if the backend is dense, False if it is the dictionary keyed by (i, j).
+    """
+    return not isinstance(dist, dict)
+
+def dict_to_matrix(dist, n=None, dtype=float):
+    """
+    Converts a dictionary of distances into a dense numpy matrix.
+    Missing pairs (for example the loops (i, i), which readTSPLIB doesn't store) are set to 0 on the
+    diagonal and to infinity elsewhere, so that they are never chosen by the algorithms.
+    Args:
+        dist (dict): A dictionary where keys are tuples (i, j) and values are the distances.
+        n (int, optional): The number of nodes. If None, it is inferred from the keys.
+        dtype (numpy.dtype, optional): The data type of the matrix. Default is float.
+    Returns:
+        numpy.ndarray: A matrix of shape (n, n).
+    """
+    if n is None:
+        n = max(max(i, j) for (i, j) in dist) + 1 if dist else 0
+    if len(dist) >= n * (n - 1):
+        # Il dizionario è completo: basta riempire la matrice in un colpo solo
+        matrix = np.zeros((n, n), dtype=dtype)
+    else:
+        matrix = np.full((n, n), np.inf, dtype=dtype)
+        np.fill_diagonal(matrix, 0)
+    keys = np.fromiter((k for key in dist for k in key), dtype=np.int64, count=2 * len(dist)).reshape(-1, 2)
+    values = np.fromiter(dist.values(), dtype=dtype, count=len(dist))
+    matrix[keys[:, 0], keys[:, 1]] = values
+    return matrix
+
+def matrix_to_dict(matrix):
+    """
+    Converts a dense numpy matrix into a dictionary of distances, skipping the loops (i, i)
+    and the missing edges (infinite values).
+    Args:
+        matrix (numpy.ndarray): A matrix of shape (n, n).
+    Returns:
+        dict: A dictionary where keys are tuples (i, j) and values are the distances.
+    """
+    n = matrix.shape[0]
+    return {(i, j): matrix[i, j].item() for i in range(n) for j in range(n)
+            if i != j and np.isfinite(matrix[i, j])}
+
+def edge_weight(dist, i, j, default=float('inf')):
+    """
+    Returns the weight of the edge (i, j) for any backend.
+    Args:
+        dist (dict or numpy.ndarray): The distances between the nodes.
+        i (int): The first node.
+        j (int): The second node.
+        default (float, optional): The value returned if the edge doesn't exist. Default is infinity.
+    Returns:
+        float: The weight of the edge.
+    """
+    if is_matrix(dist):
+        return dist[i, j]
+    return dist.get((i, j), default)
+
+def to_backend(dist, backend, n=None):
+    """
+    Converts a dictionary of distances into the requested backend.
+    Args:
+        dist (dict): A dictionary where keys are tuples (i, j) and values are the distances.
+        backend (str): The name of the backend ("dict" or "matrix").
+        n (int, optional): The number of nodes. If None, it is inferred from the keys.
+    Returns:
+        dict or numpy.ndarray: The distances in the requested backend.
+    Raises:
+        ValueError: If the backend is not supported.
+    """
+    if backend == "dict":
+        return dist
+    elif backend == "matrix":
+        return dict_to_matrix(dist, n)
+    else:
+        raise ValueError(f"Backend non valido: {backend}. Valori ammessi: {BACKENDS}")
+
+def nint(x):
+    """
+    Rounds to the nearest integer as defined by the TSPLIB, i.e. int(x + 0.5) for non-negative values.
+    Args:
+        x (numpy.ndarray): The values to round.
+    Returns:
+        numpy.ndarray: The rounded values as int64.
+    """
+    return np.floor(x + 0.5).astype(np.int64)
+
+def _squared(a, b):
+    # Somma dei quadrati coordinata per coordinata: evita il temporaneo (..., dimensions)
+    total = (a[..., 0] - b[..., 0]) ** 2
+    for k in range(1, a.shape[-1]):
+        total += (a[..., k] - b[..., k]) ** 2
+    return total
+
+def _euclidean(a, b):
+    return np.sqrt(_squared(a, b))
+
+def _euc(a, b):
+    return nint(_euclidean(a, b))
+
+def _ceil(a, b):
+    return np.ceil(_euclidean(a, b)).astype(np.int64)
+
+def _man(a, b):
+    return nint(np.abs(a - b).sum(axis=-1))
+
+def _max(a, b):
+    return nint(np.abs(a - b).max(axis=-1))
+
+def _att(a, b):
+    r = np.sqrt(_squared(a, b) / 10)
+    t = nint(r)
+    # Se l'arrotondamento è per difetto si passa all'intero successivo
+    return t + (t < r)
+
+def _geo(a, b):
+    # Le coordinate sono già state convertite in radianti da prepare_coordinates
+    q1 = np.cos(a[..., 1] - b[..., 1])
+    q2 = np.cos(a[..., 0] - b[..., 0])
+    q3 = np.cos(a[..., 0] + b[..., 0])
+    value = np.clip(0.5 * ((1 + q1) * q2 - (1 - q1) * q3), -1, 1)
+    return (GEO_RADIUS * np.arccos(value) + 1).astype(np.int64)
+
+KERNELS = {
+    "EUC_2D": _euc,
+    "EUC_3D": _euc,
+    "CEIL_2D": _ceil,
+    "MAN_2D": _man,
+    "MAN_3D": _man,
+    "MAX_2D": _max,
+    "MAX_3D": _max,
+    "ATT": _att,
+    "GEO": _geo,
+    "EUCLIDEAN": _euclidean,
+}
+
+def _kernel(edge_weight_type):
+    try:
+        return KERNELS[edge_weight_type]
+    except KeyError:
+        raise ValueError(f"EDGE_WEIGHT_TYPE non supportato: {edge_weight_type}. Valori ammessi: {tuple(KERNELS)}")
+
+def prepare_coordinates(coords, edge_weight_type):
+    """
+    Converts the coordinates once into the form used by the distance kernels.
+    For GEO instances the DDD.MM coordinates are converted to radians (degrees truncated, minutes * 5 / 3),
+    for every other metric the coordinates are only converted to a float array.
+    Args:
+        coords (array-like): The coordinates of the nodes, shape (n, 2) or (n, 3).
+        edge_weight_type (str): The metric of the instance.
+    Returns:
+        numpy.ndarray: The prepared coordinates.
+    """
+    coords = np.asarray(coords, dtype=float)
+    if edge_weight_type == "GEO":
+        degrees = np.trunc(coords)
+        minutes = coords - degrees
+        return np.radians(degrees + minutes * 5 / 3)
+    return coords
+
+def pairwise_distances(a, b, edge_weight_type):
+    """
+    Computes element-wise the distances between two broadcastable arrays of prepared coordinates.
+    Args:
+        a (numpy.ndarray): Prepared coordinates, shape (..., dimensions).
+        b (numpy.ndarray): Prepared coordinates, shape (..., dimensions).
+        edge_weight_type (str): The metric of the instance.
+    Returns:
+        numpy.ndarray: The distances, int64 for the TSPLIB metrics and float64 for EUCLIDEAN.
+    """
+    return _kernel(edge_weight_type)(a, b)
+
+def distance_matrix(coords, edge_weight_type, block_size=None):
+    """
+    Computes the full (n, n) distance matrix of a set of coordinates with numpy broadcasting.
+    The matrix is computed in blocks of rows, so that the temporary arrays stay small for thousands of nodes.
+    The diagonal is set to 0.
+    Args:
+        coords (array-like): The coordinates of the nodes, shape (n, 2) or (n, 3).
+        edge_weight_type (str): The metric of the instance.
+        block_size (int, optional): The number of rows of each block. If None, it is chosen from n.
+    Returns:
+        numpy.ndarray: The distance matrix of shape (n, n).
+    """
+    kernel = _kernel(edge_weight_type)
+    prepared = prepare_coordinates(coords, edge_weight_type)
+    n = prepared.shape[0]
+    if block_size is None:
+        block_size = max(1, BLOCK_ELEMENTS // max(n, 1))
+    dtype = np.float64 if edge_weight_type == "EUCLIDEAN" else np.int64
+    matrix = np.empty((n, n), dtype=dtype)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        matrix[start:stop] = kernel(prepared[start:stop, np.newaxis, :], prepared[np.newaxis, :, :])
+    np.fill_diagonal(matrix, 0)
+    return matrix
+
+def distance_row(coords, i, edge_weight_type):
+    """
+    Computes the distances between node i and every node (the distance of i from itself is 0).
+    Args:
+        coords (array-like): The coordinates of the nodes, shape (n, 2) or (n, 3).
+        i (int): The index of the node.
+        edge_weight_type (str): The metric of the instance.
+    Returns:
+        numpy.ndarray: The row i of the distance matrix.
+    """
+    prepared = prepare_coordinates(coords, edge_weight_type)
+    row = pairwise_distances(prepared[i], prepared, edge_weight_type)
+    row[i] = 0
+    return row
+
+def distance_batch(coords, I, J, edge_weight_type):
+    """
+    Computes the distances of an arbitrary batch of pairs (I[k], J[k]).
+    Args:
+        coords (array-like): The coordinates of the nodes, shape (n, 2) or (n, 3).
+        I (array-like): The first node of each pair.
+        J (array-like): The second node of each pair (broadcastable with I).
+        edge_weight_type (str): The metric of the instance.
+    Returns:
+        numpy.ndarray: The distances of the pairs; pairs (i, i) have distance 0.
+    """
+    prepared = prepare_coordinates(coords, edge_weight_type)
+    I, J = np.broadcast_arrays(np.asarray(I, dtype=np.intp), np.asarray(J, dtype=np.intp))
+    distances = pairwise_distances(prepared[I], prepared[J], edge_weight_type)
+    return np.where(I == J, 0, distances)
+
+class DistanceOracle:
+    """
+    Lazy distance backend: it keeps only the coordinates of the nodes and the metric, and computes
+    d(i, j) on demand with the same kernels used by distance_matrix, so the memory is O(n) instead of O(n²).
+    It is indexed like the dense backend, so every algorithm that accepts a matrix accepts an oracle too:
+        - dist[i, j] returns the distance of a single pair (the hot pairs are kept in a bounded LRU cache);
+        - dist[i] returns the row i as a numpy array;
+        - dist[I, J] returns the distances of a batch of pairs as a numpy array.
+    The TSPLIB metrics are symmetric, so (i, j) and (j, i) share the same cache slot.
+    Attributes:
+        edge_weight_type (str): The metric of the instance.
+        shape (tuple): The shape of the equivalent matrix, (n, n).
+        dtype (numpy.dtype): int64 for the TSPLIB metrics, float64 for EUCLIDEAN.
+        cache_size (int): The maximum number of pairs kept in the cache.
+        hits, misses (int): The statistics of the cache.
+    """
+
+    def __init__(self, coords, edge_weight_type, cache_size=DEFAULT_ORACLE_CACHE_SIZE):
+        """
+        Args:
+            coords (array-like): The coordinates of the nodes, shape (n, 2) or (n, 3).
+            edge_weight_type (str): The metric of the instance (EUC_2D, GEO, ATT, ..., or EUCLIDEAN).
+            cache_size (int, optional): The maximum number of pairs kept in the LRU cache. Default is 65536.
+        Raises:
+            ValueError: If the metric has no vectorized kernel.
+        """
+        self._kernel = _kernel(edge_weight_type)
+        self.edge_weight_type = edge_weight_type
+        self._coords = prepare_coordinates(coords, edge_weight_type)
+        n = self._coords.shape[0]
+        self.shape = (n, n)
+        self.dtype = np.dtype(np.float64 if edge_weight_type == "EUCLIDEAN" else np.int64)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return f"DistanceOracle(n={self.shape[0]}, edge_weight_type={self.edge_weight_type!r})"
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            i, j = key
+            if isinstance(i, (int, np.integer)) and isinstance(j, (int, np.integer)):
+                return self.distance(i, j)
+            return self.batch(i, j)
+        return self.row(key)
+
+    def distance(self, i, j):
+        """
+        Returns the distance between the nodes i and j, using the LRU cache.
+        Args:
+            i (int): The first node.
+            j (int): The second node.
+        Returns:
+            int or float: The distance (0 if i == j).
+        """
+        i, j = int(i), int(j)
+        if i == j:
+            return 0
+        # Chiave simmetrica: (i, j) e (j, i) occupano lo stesso posto nella cache
+        key = i * self.shape[0] + j if i < j else j * self.shape[0] + i
+        cache = self._cache
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = self._kernel(self._coords[i], self._coords[j]).item()
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)  # Elimina la coppia usata meno di recente
+        return value
+
+    def row(self, i):
+        """
+        Returns the distances between node i and every node (the row i of the equivalent matrix).
+        The rows are not cached: computing one costs O(n) and caching it would cost O(n) memory.
+        Args:
+            i (int): The node.
+        Returns:
+            numpy.ndarray: The row i, with 0 in position i.
+        """
+        row = self._kernel(self._coords[i], self._coords)
+        row[i] = 0
+        return row
+
+    def batch(self, I, J):
+        """
+        Returns the distances of a batch of pairs (I[k], J[k]), computed in a single vectorized call.
+        Args:
+            I (array-like): The first node of each pair.
+            J (array-like): The second node of each pair (broadcastable with I).
+        Returns:
+            numpy.ndarray: The distances of the pairs; pairs (i, i) have distance 0.
+        """
+        I, J = np.broadcast_arrays(np.asarray(I, dtype=np.intp), np.asarray(J, dtype=np.intp))
+        distances = self._kernel(self._coords[I], self._coords[J])
+        return np.where(I == J, 0, distances)
+
+    def clear_cache(self):
+        """
+        Empties the LRU cache and resets its statistics.
+        """
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def compact_dtype(matrix):
+    """
+    Returns the smallest data type that can store a distance matrix without changing the results of the algorithms.
+    The integral matrices (EUC_2D, ATT, GEO, CEIL_2D, EXPLICIT, ...) are stored as int32 if their values are small
+    enough that the sum of four of them (a 2-opt delta) can't overflow; the lengths of the paths are unaffected,
+    numpy accumulates the sums of int32 arrays in int64.
+    The non-integral matrices (EUCLIDEAN, the random graphs with decimal weights) are stored as float32 only if
+    every value is exactly representable in float32, otherwise they keep their type: rounding the weights would
+    change the deltas and therefore the moves chosen. float32 can still be requested explicitly with the dtype
+    argument of compact_matrix and TriangularDistances.from_matrix.
+    Args:
+        matrix (numpy.ndarray): The distance matrix.
+    Returns:
+        numpy.dtype: int32, float32 or the original data type if neither of them is adequate.
+    """
+    if np.issubdtype(matrix.dtype, np.integer):
+        limit = np.iinfo(np.int32).max // 4
+        if matrix.size == 0 or (matrix.min() >= -limit and matrix.max() <= limit):
+            return np.dtype(np.int32)
+        return matrix.dtype
+    if np.issubdtype(matrix.dtype, np.floating):
+        if np.array_equal(matrix.astype(np.float32), matrix):
+            return np.dtype(np.float32)
+        return matrix.dtype  # float32 arrotonderebbe i pesi
+    return matrix.dtype
+
+def compact_matrix(matrix, dtype=None):
+    """
+    Returns a copy of a distance matrix stored with a compact data type (4 bytes per value instead of 8).
+    Args:
+        matrix (numpy.ndarray): The distance matrix.
+        dtype (numpy.dtype, optional): The data type to use. If None, it is chosen with compact_dtype.
+    Returns:
+        numpy.ndarray: The compact matrix.
+    """
+    matrix = np.asarray(matrix)
+    return matrix.astype(compact_dtype(matrix) if dtype is None else dtype)
+
+def tri_index(i, j, n):
+    """
+    Returns the position of the pair (i, j), with i != j, in a packed upper-triangular array that stores
+    the rows (0, 1), (0, 2), ..., (0, n-1), (1, 2), ... one after the other. The pair is symmetric.
+    Works both on integers and on numpy arrays of indices.
+    Args:
+        i (int or numpy.ndarray): The first node.
+        j (int or numpy.ndarray): The second node.
+        n (int): The number of nodes.
+    Returns:
+        int or numpy.ndarray: The position of the pair in the packed array.
+    """
+    a = np.minimum(i, j)
+    b = np.maximum(i, j)
+    return a * (2 * n - a - 1) // 2 + b - a - 1
+
+class TriangularDistances:
+    """
+    Compact distance backend for symmetric instances: only the n(n-1)/2 values above the diagonal are stored,
+    in a single packed array, and the position of a pair is computed in O(1) by tri_index.
+    With int32 values it takes 1/4 of the memory of an int64 matrix (and far less than the dictionary),
+    so the distances of larger instances stay in the CPU caches.
+    It is indexed like the dense backend, so every algorithm that accepts a matrix accepts it too:
+        - dist[i, j] returns the distance of a single pair (0 if i == j);
+        - dist[i] returns the row i as a numpy array;
+        - dist[I, J] returns the distances of a batch of pairs as a numpy array.
+    Attributes:
+        data (numpy.ndarray): The packed upper triangle.
+        shape (tuple): The shape of the equivalent matrix, (n, n).
+        dtype (numpy.dtype): The data type of the values.
+    """
+
+    def __init__(self, data, n):
+        """
+        Args:
+            data (numpy.ndarray): The packed upper triangle, of length n(n-1)/2.
+            n (int): The number of nodes.
+        Raises:
+            ValueError: If the length of data doesn't match n.
+        """
+        data = np.asarray(data)
+        if data.shape != (n * (n - 1) // 2,):
+            raise ValueError(f"Dimensione del triangolo non valida: attesi {n * (n - 1) // 2} valori, trovati {data.size}")
+        self.data = data
+        self.shape = (n, n)
+        self.dtype = data.dtype
+
+    @classmethod
+    def from_matrix(cls, matrix, dtype=None):
+        """
+        Packs the upper triangle of a symmetric distance matrix.
+        Args:
+            matrix (numpy.ndarray): The symmetric (n, n) distance matrix.
+            dtype (numpy.dtype, optional): The data type of the packed values. If None, it is chosen with compact_dtype.
+        Returns:
+            TriangularDistances: The packed distances.
+        """
+        matrix = np.asarray(matrix)
+        n = matrix.shape[0]
+        data = np.empty(n * (n - 1) // 2, dtype=compact_dtype(matrix) if dtype is None else dtype)
+        start = 0
+        # Riga per riga, senza allocare gli indici di tutto il triangolo
+        for i in range(n - 1):
+            stop = start + n - i - 1
+            data[start:stop] = matrix[i, i + 1:]
+            start = stop
+        return cls(data, n)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return f"TriangularDistances(n={self.shape[0]}, dtype={self.dtype})"
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def __getitem__(self, key):
+        n = self.shape[0]
+        if isinstance(key, tuple):
+            i, j = key
+            if isinstance(i, (int, np.integer)) and isinstance(j, (int, np.integer)):
+                if i == j:
+                    return self.dtype.type(0)
+                if i > j:
+                    i, j = j, i
+                return self.data[i * (2 * n - i - 1) // 2 + j - i - 1]
+            return self._batch(i, j)
+        return self._batch(key, np.arange(n))
+
+    def _batch(self, I, J):
+        I, J = np.broadcast_arrays(np.asarray(I, dtype=np.intp), np.asarray(J, dtype=np.intp))
+        same = I == J
+        # Per le coppie (i, i) si legge una posizione qualsiasi, poi si azzera
+        values = self.data[np.where(same, 0, tri_index(I, J, self.shape[0]))]
+        values[same] = 0
+        return values
+
+    def to_matrix(self):
+        """
+        Returns the equivalent full (n, n) matrix.
+        """
+        n = self.shape[0]
+        matrix = np.zeros((n, n), dtype=self.dtype)
+        rows, cols = np.triu_indices(n, 1)
+        matrix[rows, cols] = self.data
+        matrix[cols, rows] = self.data
+        return matrix
@@ -0,0 +1,295 @@
+'''
+This module provides a persistent binary cache for the TSPLIB instances.
+Every entry point of the project re-parses the same .tsp files (the metaheuristic comparison even reads each file
+once per algorithm), so the parsed coordinates, the distance matrix and the metadata of each instance are stored
+in a .npz file under outputs/cache, keyed by a hash of the content of the .tsp file.
+Loading an instance from the cache takes a few milliseconds.
+Functions:
+    file_hash(file_path):
+        Computes the hash of the content of a file.
+    load_cached_instance(file_path, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        Loads a parsed instance from the cache, parsing and storing it if it's missing.
+    store_instance(file_path, problem, matrix, digest, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        Stores a parsed instance in the cache.
+    load_memmap_instance(file_path, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        Loads an instance from the cache with its distance matrix as a read-only memory-mapped array.
+    evict_lru(cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_MAX_SIZE_MB, keep=None):
+        Removes the least recently used files (.npz entries and .npy matrices) until the cache fits in the size cap.
+    clear_cache(cache_dir=DEFAULT_CACHE_DIR):
+        Removes every entry of the cache.
+Invalidation:
+    - An entry is keyed by the content of the file, so a modified file never hits an old entry.
+    - When a new entry is stored, the entries previously created for the same file are removed (they are stale).
+    - Entries written by a different version of the cache format, or that can't be read, are removed and rebuilt.
+    - The total size of the cache is capped: the least recently used entries are evicted first.
+Memory-mapped matrices:
+    The distance matrix can also be materialized once as a raw .npy file next to the .npz entry and opened as a
+    read-only np.memmap. Several processes working on the same instance (for example parallel runs of
+    multistart_local_search or of the metaheuristics) then share the same pages through the OS page cache,
+    instead of each one holding its own copy of the matrix.
+Usage:
+    n, points, dist = readTSPLIB("TSP/data/EUC_2D/100_nodes/kroA100.tsp", use_cache=True)
+    n, points, dist = readTSPLIB("TSP/data/EXPLICIT/1000_nodes/pa561.tsp", backend="memmap")
+'''
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+
+from .tsplib_parser import parse_tsplib, weight_matrix
+
+DEFAULT_CACHE_DIR = "TSP/outputs/cache"
+DEFAULT_MAX_SIZE_MB = 512
+CACHE_VERSION = 2  # 2: coordinate intere salvate come int64
+CACHE_EXTENSION = ".npz"
+MEMMAP_EXTENSION = ".npy"
+
+def file_hash(file_path):
+    """
+    Computes the hash (SHA-1) of the content of a file.
+    Args:
+        file_path (str): The path to the file.
+    Returns:
+        str: The hexadecimal digest of the content.
+    """
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _entry_prefix(file_path):
+    """
+    Returns the prefix shared by all the cache entries of a file (its name without extension).
+    """
+    return os.path.splitext(os.path.basename(str(file_path)))[0] + "-"
+
+def _entry_path(file_path, digest, cache_dir, extension=CACHE_EXTENSION):
+    """
+    Returns the path of the cache entry of a file with the given content hash.
+    """
+    return os.path.join(cache_dir, f"{_entry_prefix(file_path)}{digest[:16]}{extension}")
+
+def _read_metadata(entry_path):
+    """
+    Reads only the metadata of a cache entry.
+    """
+    with np.load(entry_path, allow_pickle=False) as data:
+        return json.loads(data["meta"].item())
+
+def _read_entry(entry_path, digest, with_matrix=True):
+    """
+    Reads a cache entry. The arrays of the .npz are loaded lazily, so with with_matrix=False the matrix is
+    never read. Returns (problem, matrix) (matrix is None without with_matrix), or None if the entry is stale.
+    """
+    with np.load(entry_path, allow_pickle=False) as data:
+        meta = json.loads(data["meta"].item())
+        if meta["version"] != CACHE_VERSION or meta["hash"] != digest:
+            return None
+        problem = dict(meta["problem"])
+        problem["hash"] = digest
+        problem["node_coords"] = data["node_coords"] if data["node_coords"].size else None
+        problem["display_data"] = data["display_data"] if data["display_data"].size else None
+        problem["edge_weights"] = None
+        return problem, data["matrix"] if with_matrix else None
+
+def load_cached_instance(file_path, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_MAX_SIZE_MB):
+    """
+    Loads a parsed instance from the cache. If the instance is missing (or the entry is stale or unreadable),
+    the file is parsed with the native parser and the result is stored in the cache.
+    Args:
+        file_path (str): The path to the TSPLIB file.
+        cache_dir (str, optional): The directory of the cache. Default is "TSP/outputs/cache".
+        max_size_mb (float, optional): The maximum size of the cache in megabytes. Default is 512.
+    Returns:
+        tuple: A tuple containing:
+            - problem (dict): The specification of the instance, as returned by parse_tsplib
+                              (without the raw EDGE_WEIGHT_SECTION values), plus the "hash" of the file.
+            - matrix (numpy.ndarray): The (n, n) weight matrix.
+    """
+    digest = file_hash(file_path)
+    entry_path = _entry_path(file_path, digest, cache_dir)
+
+    if os.path.exists(entry_path):
+        try:
+            entry = _read_entry(entry_path, digest)
+            if entry is not None:
+                # Aggiorna la data di modifica: è il criterio usato per l'eviction LRU
+                os.utime(entry_path)
+                return entry
+        except (OSError, ValueError, KeyError):
+            pass
+        # Voce obsoleta o corrotta: viene rimossa e ricostruita
+        _remove(entry_path)
+        _remove(_entry_path(file_path, digest, cache_dir, MEMMAP_EXTENSION))
+
+    problem = parse_tsplib(file_path)
+    matrix = weight_matrix(problem)
+    problem["edge_weights"] = None
+    store_instance(file_path, problem, matrix, digest, cache_dir, max_size_mb)
+    problem["hash"] = digest
+    return problem, matrix
+
+def load_memmap_instance(file_path, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_MAX_SIZE_MB):
+    """
+    Loads an instance from the cache with its distance matrix as a read-only memory-mapped array.
+    The first call materializes the matrix in a .npy file next to the .npz entry; every following call,
+    from any process, maps the same file, so the pages of the matrix are shared through the OS page cache.
+    When the .npy file already exists, only the metadata and the coordinates are read from the .npz entry:
+    the process never holds a private copy of the matrix.
+    Args:
+        file_path (str): The path to the TSPLIB file.
+        cache_dir (str, optional): The directory of the cache. Default is "TSP/outputs/cache".
+        max_size_mb (float, optional): The maximum size of the cache in megabytes. Default is 512.
+    Returns:
+        tuple: A tuple containing:
+            - problem (dict): The specification of the instance, as returned by load_cached_instance.
+            - matrix (numpy.memmap): The (n, n) weight matrix, mapped read-only.
+    """
+    digest = file_hash(file_path)
+    entry_path = _entry_path(file_path, digest, cache_dir)
+    memmap_path = _entry_path(file_path, digest, cache_dir, MEMMAP_EXTENSION)
+
+    if os.path.exists(entry_path) and os.path.exists(memmap_path):
+        # Caso comune: la matrice è già materializzata, dal .npz si leggono solo metadati e coordinate
+        try:
+            entry = _read_entry(entry_path, digest, with_matrix=False)
+            if entry is not None:
+                matrix = np.load(memmap_path, mmap_mode="r")
+                os.utime(entry_path)
+                os.utime(memmap_path)
+                return entry[0], matrix
+        except (OSError, ValueError, KeyError):
+            pass
+
+    # Prima chiamata (o voce da ricostruire): la matrice viene letta una sola volta per scrivere il .npy
+    problem, matrix = load_cached_instance(file_path, cache_dir, max_size_mb)
+    # Scrittura atomica: gli altri processi vedono il file solo quando è completo
+    descriptor, temporary_path = tempfile.mkstemp(dir=cache_dir, suffix=MEMMAP_EXTENSION + ".tmp")
+    with os.fdopen(descriptor, "wb") as file:
+        np.save(file, np.ascontiguousarray(matrix))
+    os.replace(temporary_path, memmap_path)
+    evict_lru(cache_dir, max_size_mb, keep=(entry_path, memmap_path))
+    del matrix
+
+    return problem, np.load(memmap_path, mmap_mode="r")
+
+def store_instance(file_path, problem, matrix, digest, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_MAX_SIZE_MB):
+    """
+    Stores a parsed instance in the cache, removing the stale entries of the same file and
+    evicting the least recently used entries if the cache exceeds its size cap.
+    The entry is written to a temporary file and then renamed, so concurrent readers never see a partial file.
+    Args:
+        file_path (str): The path to the TSPLIB file.
+        problem (dict): The specification of the instance, as returned by parse_tsplib.
+        matrix (numpy.ndarray): The (n, n) weight matrix.
+        digest (str): The hash of the content of the file.
+        cache_dir (str, optional): The directory of the cache. Default is "TSP/outputs/cache".
+        max_size_mb (float, optional): The maximum size of the cache in megabytes. Default is 512.
+    Returns:
+        str: The path of the new entry.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    source = os.path.abspath(str(file_path))
+    _remove_stale_entries(file_path, source, digest, cache_dir)
+
+    meta = {
+        "version": CACHE_VERSION,
+        "hash": digest,
+        "source": source,
+        "problem": {key: value for key, value in problem.items()
+                    if key not in ("node_coords", "display_data", "edge_weights", "hash")},
+    }
+    empty = np.empty((0, 2))
+    entry_path = _entry_path(file_path, digest, cache_dir)
+    descriptor, temporary_path = tempfile.mkstemp(dir=cache_dir, suffix=CACHE_EXTENSION + ".tmp")
+    with os.fdopen(descriptor, "wb") as file:
+        np.savez(file,
+                 meta=np.array(json.dumps(meta)),
+                 node_coords=problem["node_coords"] if problem["node_coords"] is not None else empty,
+                 display_data=problem["display_data"] if problem["display_data"] is not None else empty,
+                 matrix=matrix)
+    os.replace(temporary_path, entry_path)
+
+    evict_lru(cache_dir, max_size_mb, keep=(entry_path,))
+    return entry_path
+
+def _remove_stale_entries(file_path, source, digest, cache_dir):
+    """
+    Removes the entries created for the same file with a different content (they can't be hit anymore).
+    """
+    prefix = _entry_prefix(file_path)
+    for name in os.listdir(cache_dir):
+        if not (name.startswith(prefix) and name.endswith(CACHE_EXTENSION)):
+            continue
+        entry_path = os.path.join(cache_dir, name)
+        try:
+            meta = _read_metadata(entry_path)
+            stale = meta["source"] == source and meta["hash"] != digest
+        except (OSError, ValueError, KeyError):
+            stale = True
+        if stale:
+            _remove(entry_path)
+            # Insieme alla voce viene rimossa anche la sua matrice mappata in memoria
+            _remove(entry_path[:-len(CACHE_EXTENSION)] + MEMMAP_EXTENSION)
+
+def _cache_entries(cache_dir):
+    """
+    Returns the files of the cache as a list of (last_use, size, path), sorted from the least recently used.
+    Temporary files still being written are ignored.
+    """
+    entries = []
+    if not os.path.isdir(cache_dir):
+        return entries
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue  # Rimosso nel frattempo da un altro processo
+        if os.path.isfile(path) and not name.endswith(".tmp"):
+            entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+    return entries
+
+def evict_lru(cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_MAX_SIZE_MB, keep=None):
+    """
+    Removes the least recently used entries until the total size of the cache fits in the size cap.
+    Args:
+        cache_dir (str, optional): The directory of the cache. Default is "TSP/outputs/cache".
+        max_size_mb (float, optional): The maximum size of the cache in megabytes. Default is 512.
+        keep (tuple, optional): Paths that must not be removed (for example the entry just written).
+    Returns:
+        int: The number of removed files.
+    """
+    entries = _cache_entries(cache_dir)
+    total = sum(size for _, size, _ in entries)
+    limit = max_size_mb * 1024 * 1024
+    removed = 0
+    for _, size, path in entries:
+        if total <= limit:
+            break
+        if keep and path in keep:
+            continue
+        _remove(path)
+        total -= size
+        removed += 1
+    return removed
+
+def clear_cache(cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Removes every entry of the cache.
+    Args:
+        cache_dir (str, optional): The directory of the cache. Default is "TSP/outputs/cache".
+    Returns:
+        None
+    """
+    for _, _, path in _cache_entries(cache_dir):
+        _remove(path)
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,15 +1,17 @@
 '''
 This module provides utility functions for solving the Traveling Salesman Problem (TSP) using various algorithms.
 Functions:
-- brute_force_tsp(points, dist):
+- brute_force_tsp(points, dist=None):
     Solves the TSP using brute force by exploring all permutations of points. It takes too long for large instances. (n>15)
-- nearest_neighbor_first(points, dist, debug=False):
+- nearest_neighbor_first(points, dist=None, debug=False):
     Implements the nearest neighbor heuristic for the TSP.
-- generate_random_path(num_points):
+- generate_random_path(num_points, rng=None):
     Generates a random path as a list of indices for a given number of points.
-- nearest_neighbor_second(points, dist, debug=False):
+- make_rng(seed=None):
+    Returns a seeded NumPy random Generator (used by the batched random draws of SA and of the perturbations).
+- nearest_neighbor_second(points, dist=None, debug=False, rng=None):
     Implements the nearest neighbor heuristic for the TSP.
-- nearest_neighbor_random(points, dist, debug=False, iterations=10):
+- nearest_neighbor_random(points, dist=None, debug=False, iterations=10):
     Generates a path using a nearest neighbor heuristic with a random element.
 - get_or_create_graph_data(n=0, maxcoord=0, function=None, file_name='graph_data.pkl', use_existing=True, debug=False):
     Generates or loads graph data for a TSP instance.
@@ -17,25 +19,32 @@ Functions:
     Prints the given title and content inside a square-like frame.
 - reset_points(points):
     Resets the visited flag for all points in the list.
+The heuristics accept either the legacy (points, dist) pair or a TSPInstance alone, and never modify their input.
+With a TSPInstance and a dense backend, the nearest neighbor heuristics use the candidate lists of the instance.
 '''
 import random
 import pickle
 from tqdm import tqdm
 import itertools
 import math
+import numpy as np
 from . import algorithm_metrics
+from .distances import is_matrix, edge_weight
+from .tsp_instance import TSPInstance, resolve_instance
+from .candidates import candidate_lists
 
-def brute_force_tsp(points, dist):
+def brute_force_tsp(points, dist=None):
     """
     Solves the TSP using brute force by exploring all permutations of points.
 
     Parameters
     ----------
-    points : list of tuples
-        Each tuple represents a point as (x, y, visited).
-    dist : dict
+    points : list of tuples or TSPInstance
+        Each tuple represents a point as (x, y, visited). A TSPInstance is also accepted.
+    dist : dict or numpy.ndarray, optional
         Dictionary of distances between points with keys as (i, j) representing 
-        the indices of the points and values as the distances between them.
+        the indices of the points and values as the distances between them,
+        or the equivalent dense matrix. If None, the distances of the TSPInstance are used.
 
     Returns
     -------
@@ -44,7 +53,7 @@ def brute_force_tsp(points, dist):
     min_distance : float
         The total distance of the shortest path.
     """
-    n = len(points)
+    n, dist = resolve_instance(points, dist)
     if n>10:
         print("The number of points is too high to calculate the brute force solution.")
         return None
@@ -63,10 +72,10 @@ def brute_force_tsp(points, dist):
         # Calculate the distance of this path
         current_distance = 0
         for i in range(n - 1):
-            current_distance += dist.get((perm[i], perm[i + 1]), float('inf'))
+            current_distance += edge_weight(dist, perm[i], perm[i + 1])
         
         # Add distance to return to the starting point (TSP is a cycle)
-        current_distance += dist.get((perm[-1], perm[0]), float('inf'))
+        current_distance += edge_weight(dist, perm[-1], perm[0])
 
         # Update the minimum distance and path if this one is shorter
         if current_distance < min_distance:
@@ -75,14 +84,16 @@ def brute_force_tsp(points, dist):
     
     return list(shortest_path) + [shortest_path[0]]
 
-def nearest_neighbor_first(points, dist, debug=False):
+def nearest_neighbor_first(points, dist=None, debug=False):
     """
     Implements the nearest neighbor heuristic for the Traveling Salesman Problem (TSP).
+    The visited points are tracked in a local mask, so the points (or the TSPInstance) are never modified.
     Args:
-        points (list of tuples): A list of points where each point is represented as a tuple (coordinate, visited_flag).
-                                 The visited_flag is initially set to False for all points.
-        dist (dict): A dictionary containing the distances between points. The keys are tuples (i, j) representing
+        points (list of tuples or TSPInstance): A list of points where each point is represented as a tuple (coordinate, visited_flag),
+                                 or a TSPInstance.
+        dist (dict or numpy.ndarray, optional): A dictionary containing the distances between points. The keys are tuples (i, j) representing
                      the indices of the points, and the values are the distances between those points.
+                     A dense matrix is also accepted. If None, the distances of the TSPInstance are used.
         debug (bool, optional): If set to True, enables debug mode with additional print statements for tracing
                                 the algorithm's execution. Default is False.
     Returns:
@@ -90,15 +101,22 @@ def nearest_neighbor_first(points, dist, debug=False):
               and ends at the initial point (point 0).
     """
 
-    n = len(points)
+    n, dist = resolve_instance(points, dist)
+    visited = [False] * n  # Flag di visita locali: i punti in input non vengono modificati
     path = []
     
     # Start from the first point (you can start from any point)
     current_point = random.randint(0, n - 1)
    # current_point = 0  # Forced to start at point 0
     last_point = current_point
-    points[current_point] = (points[current_point][0], True)  # Mark as visited
+    visited[current_point] = True  # Mark as visited
     path.append(current_point)
+
+    if is_matrix(dist) and not debug:
+        # Con la matrice densa il punto più vicino si trova con un argmin sulla riga
+        path.extend(_dense_nearest_neighbor_path(visited, dist, current_point, candidates=_instance_candidates(points, dist)))
+        path.append(last_point)
+        return path
     
     for _ in range(n - 1):
         # Find the nearest unvisited point
@@ -112,7 +130,7 @@ def nearest_neighbor_first(points, dist, debug=False):
                 print(f"Point: {i}, to be tested")
                 input("")  # This input is for debugging, you can remove it if not needed
             
-            if not points[i][1]:  # If the point is not visited
+            if not visited[i]:  # If the point is not visited
                 if debug:
                     print("Unvisited point")
                     print("Its distance is: ", dist[(i, current_point)])
@@ -132,7 +150,7 @@ def nearest_neighbor_first(points, dist, debug=False):
             break
         
         current_point = nearest
-        points[current_point] = (points[current_point][0], True)  # Mark as visited
+        visited[current_point] = True  # Mark as visited
         path.append(current_point)
         
         if debug:
@@ -144,12 +162,13 @@ def nearest_neighbor_first(points, dist, debug=False):
     path.append(last_point)
     return path
 
-def generate_random_path(num_points):
+def generate_random_path(num_points, rng=None):
     """
     Genera un percorso casuale come lista di indici per un dato numero di punti.
     
     Args:
         num_points (int): Il numero totale di punti nel grafo.
+        rng (numpy.random.Generator, optional): Il generatore da usare (vedi make_rng). Se None, si usa il modulo random.
     
     Returns:
         list: Una lista di indici rappresentante il percorso, iniziando e terminando al punto iniziale.
@@ -161,39 +180,68 @@ def generate_random_path(num_points):
     indices = list(range(num_points))
     
     # Mescola gli indici casualmente
-    random.shuffle(indices)
+    if rng is None:
+        random.shuffle(indices)
+    else:
+        indices = rng.permutation(num_points).tolist()
     
     # Aggiungi il primo indice alla fine per chiudere il ciclo
     random_path = indices + [indices[0]]
     
     return random_path
 
-def nearest_neighbor_second(points, dist, debug=False):
+def make_rng(seed=None):
+    """
+    Restituisce un generatore NumPy (numpy.random.Generator) con cui estrarre i numeri casuali a blocchi.
+    Args:
+        seed (int, numpy.random.Generator or None): Il seme, oppure un generatore già creato (restituito così com'è).
+            Se None il seme è estratto dal modulo random, quindi random.seed rende comunque ripetibili le esecuzioni.
+    Returns:
+        numpy.random.Generator: Il generatore.
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    if seed is None:
+        seed = random.getrandbits(64)
+    return np.random.default_rng(seed)
+
+def nearest_neighbor_second(points, dist=None, debug=False, rng=None):
     """
     Implements the nearest neighbor algorithm to find a path through a set of points.
+    The visited points are tracked in a local mask, so the points (or the TSPInstance) are never modified.
     Args:
-        points (list of tuples): A list of tuples where each tuple represents a point. 
+        points (list of tuples or TSPInstance): A list of tuples where each tuple represents a point. 
                                  The second element of each tuple is a boolean indicating 
-                                 whether the point has been visited.
-        dist (dict): A dictionary where keys are tuples representing pairs of points 
+                                 whether the point has been visited. A TSPInstance is also accepted.
+        dist (dict or numpy.ndarray, optional): A dictionary where keys are tuples representing pairs of points 
                      (point1, point2) and values are the distances between those points.
+                     A dense matrix is also accepted. If None, the distances of the TSPInstance are used.
         debug (bool, optional): If True, enables debug mode which prints intermediate 
                                 steps and waits for user input. Default is False.
+        rng (numpy.random.Generator, optional): The generator used to draw the starting point (see make_rng).
+                                                If None, the random module is used. Default is None.
     Returns:
         list: A list of indices representing the path through the points, starting and 
               ending at the initial point.
     """
     nearest_neighbor_second.__name__ = "deterministic" # Set the function name for the name of the file to save the data
 
-    n = len(points)
+    n, dist = resolve_instance(points, dist)
+    visited = [False] * n  # Flag di visita locali: i punti in input non vengono modificati
     path = []
     
     # Start from the first point (you can start from any point)
-    current_point = random.randint(0, n - 1)
+    current_point = random.randint(0, n - 1) if rng is None else int(rng.integers(n))
     #current_point = 0
     last_point = current_point
-    points[current_point] = (points[current_point][0], True)  # Mark as visited
+    visited[current_point] = True  # Mark as visited
     path.append(current_point)
+
+    if is_matrix(dist) and not debug:
+        # Con la matrice densa non serve costruire e ordinare la lista dei vicini ad ogni passo
+        path.extend(_dense_nearest_neighbor_path(visited, dist, current_point, candidates=_instance_candidates(points, dist)))
+        path.append(last_point)
+        return path
     
     for _ in range(n - 1): 
         if debug:
@@ -203,7 +251,7 @@ def nearest_neighbor_second(points, dist, debug=False):
             input("")  # This input is for debugging, you can remove it if not needed
             
         neighbors = [(i, dist[(current_point, i)]) for i in range(n)  # For each point insert into the tuple a pair index of the point, distance { i, dist[(current_point, i)]) }
-                     if not points[i][1] and (current_point, i) in dist]  # If the point has not been visited { points[i][1] } and if the current point and point i are connected to each other { (current_point, i) in dist }
+                     if not visited[i] and (current_point, i) in dist]  # If the point has not been visited { visited[i] } and if the current point and point i are connected to each other { (current_point, i) in dist }
         if debug:
             print("Neighbors: ", neighbors)
             input("")
@@ -218,7 +266,7 @@ def nearest_neighbor_second(points, dist, debug=False):
         
             # Visit the nearest point
             current_point = nearest
-            points[current_point] = (points[current_point][0], True)  # Mark as visited
+            visited[current_point] = True  # Mark as visited
             path.append(current_point)
             
         else:
@@ -233,23 +281,26 @@ def nearest_neighbor_second(points, dist, debug=False):
     path.append(last_point)
     return path
 
-def nearest_neighbor_random(points, dist, debug=False, itereations=10):
+def nearest_neighbor_random(points, dist=None, debug=False, itereations=10):
     """
     Generates a path using a nearest neighbor heuristic with a random element.
     Args:
-        points (list of tuples): A list of points where each point is a tuple (coordinate, visited_flag).
-        dist (dict): A dictionary with keys as tuples representing point pairs and values as distances between them.
+        points (list of tuples or TSPInstance): A list of points where each point is a tuple (coordinate, visited_flag),
+                                 or a TSPInstance.
+        dist (dict or numpy.ndarray, optional): A dictionary with keys as tuples representing point pairs and values as distances between them.
+                                      A dense matrix is also accepted. If None, the distances of the TSPInstance are used.
         debug (bool, optional): If True, enables debug mode with print statements. Default is False.
     Returns:
         list: A list representing the path of visited points.
     Notes:
         - The function starts from the first point and iteratively selects the nearest unvisited neighbor.
         - If there are multiple nearest neighbors, it randomly chooses between the first and second nearest.
-        - The function marks points as visited by setting the second element of the point tuple to True.
+        - The visited points are tracked in a local mask, so the points are never modified.
         - The path is returned as a list of point indices.
     """
     nearest_neighbor_random.__name__ = "randomic"
-    n = len(points)
+    n, dist = resolve_instance(points, dist)
+    candidates = _instance_candidates(points, dist)
 
     current_point = random.randint(0, n - 1)
     last_point = current_point
@@ -258,42 +309,46 @@ def nearest_neighbor_random(points, dist, debug=False, itereations=10):
     best_path = []
 
     for _ in range(itereations):
-        reset_points(points)  # Reset dei flag di visita all'inizio di ogni ciclo
+        visited = [False] * n  # Flag di visita locali, nuovi ad ogni ciclo
         path = [last_point]
         current_point = last_point
-        points[current_point] = (points[current_point][0], True)  # Marca come visitato
+        visited[current_point] = True  # Marca come visitato
 
-        for _ in range(n - 1):
-            if debug:
-                print("_________________________________________________________")
-                print("Current point: ", current_point)
-                print(f"Point: {_}, to be tested")
-                input("")  # This input is for debugging, you can remove it if not needed
+        if is_matrix(dist) and not debug:
+            # Con la matrice densa i due vicini più prossimi si trovano con due argmin sulla riga
+            path.extend(_dense_nearest_neighbor_path(visited, dist, current_point, randomized=True, candidates=candidates))
+        else:
+            for _ in range(n - 1):
+                if debug:
+                    print("_________________________________________________________")
+                    print("Current point: ", current_point)
+                    print(f"Point: {_}, to be tested")
+                    input("")  # This input is for debugging, you can remove it if not needed
             
-            neighbors = [(i, dist[(current_point, i)]) for i in range(n)
-                         if not points[i][1] and (current_point, i) in dist]
+                neighbors = [(i, dist[(current_point, i)]) for i in range(n)
+                             if not visited[i] and (current_point, i) in dist]
             
             
-            if neighbors:
-                neighbors.sort(key=lambda x: x[1])
-                if debug:
-                    print("Neighbors: ", neighbors)
-                    input("")
-                nearest = random.choice([neighbors[0][0], neighbors[1][0]]) if len(neighbors) > 1 else neighbors[0][0]
+                if neighbors:
+                    neighbors.sort(key=lambda x: x[1])
+                    if debug:
+                        print("Neighbors: ", neighbors)
+                        input("")
+                    nearest = random.choice([neighbors[0][0], neighbors[1][0]]) if len(neighbors) > 1 else neighbors[0][0]
 
-                current_point = nearest
-                points[current_point] = (points[current_point][0], True)
-                path.append(current_point)
-                if debug:
-                    print("*" * 50)
-                    print("New current point: ", current_point)
-                    print("*" * 50)
-            else:
-                print("Errore: Nessun punto non visitato trovato")
-                break
+                    current_point = nearest
+                    visited[current_point] = True
+                    path.append(current_point)
+                    if debug:
+                        print("*" * 50)
+                        print("New current point: ", current_point)
+                        print("*" * 50)
+                else:
+                    print("Errore: Nessun punto non visitato trovato")
+                    break
 
         # Valutazione del percorso attuale rispetto al migliore trovato
-        current_path_length = algorithm_metrics.path_length(dist, path)
+        current_path_length = algorithm_metrics.tour_cost(dist, path)
         if current_path_length < path_length:
             path_length = current_path_length
             best_path = path[:]
@@ -301,6 +356,63 @@ def nearest_neighbor_random(points, dist, debug=False, itereations=10):
     best_path.append(last_point)
     return best_path
 
+def _dense_nearest_neighbor_path(visited, dist, current_point, randomized=False, candidates=None):
+    """
+    Builds the rest of a nearest neighbor path on a dense distance matrix.
+    The unvisited points are kept in a boolean mask and the nearest one is found with an argmin
+    on the row of the current point, instead of building and sorting the list of the neighbors.
+    Ties are broken in favour of the smallest index, as the stable sort of the dictionary version does.
+    With the candidate lists, the nearest unvisited point is first looked for among the k nearest neighbors
+    of the current point (O(k)); the whole row is scanned only when all of them are already visited.
+    Args:
+        visited (list of bool): The visited flags of the points (current_point is already visited); updated in place.
+        dist (numpy.ndarray): The dense distance matrix.
+        current_point (int): The point the path starts from (already marked as visited).
+        randomized (bool, optional): If True, the next point is chosen randomly between the first and the second nearest.
+        candidates (numpy.ndarray, optional): The candidate lists of the instance, see candidates.py.
+    Returns:
+        list: The points visited after current_point, in order.
+    """
+    n = len(visited)
+    unvisited = ~np.array(visited, dtype=bool)
+    remaining = int(unvisited.sum())
+    neighbors = candidates.tolist() if candidates is not None else None
+    path = []
+
+    for _ in range(n - 1):
+        nearest = None
+        if neighbors is not None:
+            # Primi due candidati non visitati, già ordinati per distanza
+            found = [j for j in neighbors[current_point] if not visited[j]][:2]
+            if found and (not randomized or len(found) == 2 or remaining == 1):
+                nearest = found[0] if not randomized or len(found) == 1 else random.choice(found)
+        if nearest is None:
+            row = np.where(unvisited, dist[current_point], np.inf)
+            nearest = int(np.argmin(row))
+            if not np.isfinite(row[nearest]):
+                print("Error: No unvisited point found")
+                break
+            if randomized and remaining > 1:
+                row[nearest] = np.inf
+                second = int(np.argmin(row))
+                if np.isfinite(row[second]):
+                    nearest = random.choice([nearest, second])
+
+        current_point = nearest
+        unvisited[current_point] = False
+        visited[current_point] = True  # Mark as visited
+        remaining -= 1
+        path.append(current_point)
+
+    return path
+
+def _instance_candidates(points, dist):
+    """
+    Returns the candidate lists of a TSPInstance used with its own dense distances, None otherwise.
+    """
+    if isinstance(points, TSPInstance) and dist is points.dist and is_matrix(dist) and points.n > 2:
+        return candidate_lists(points)
+    return None
 
 def get_or_create_graph_data(n=0, maxcoord=0, function=None, file_name='graph_data.pkl', use_existing=True, debug=False):
     """
@@ -394,6 +506,8 @@ def print_in_square(title, content):
 def reset_points(points):
     """
     Resets the visited flag for all points in the list.
+    The construction heuristics keep their visited flags in a local mask and don't modify the points anymore,
+    so this function is needed only by code that marks the points itself.
     Args:
         points (list): A list of points where each point is represented as a tuple (coordinate, visited_flag).
     """
@@ -0,0 +1,154 @@
+'''
+This module provides TSPInstance, an immutable container for a TSP instance.
+Historically an instance is passed around as a list of ((x, y), visited) tuples plus the distances, and the
+construction heuristics mark the points as visited in place: the list must be reset with reset_points after
+every call, and the same instance can't be shared by concurrent runs.
+A TSPInstance keeps the coordinates in a read-only numpy array and never carries a visited flag, so the
+algorithms can't modify it; the heuristics keep their visited flags in a local mask.
+Classes:
+    TSPInstance(coords, dist, name=None, edge_weight_type=None):
+        Immutable TSP instance: coordinates, distance backend, number of nodes, name and metric.
+Functions:
+    load_instance(source, backend="dict", use_cache=False, cache_dir=DEFAULT_CACHE_DIR, compact=False):
+        Returns a TSPInstance from a TSPInstance (unchanged) or from the path of a TSPLIB file.
+    resolve_instance(points, dist=None):
+        Returns the number of nodes and the distances from a TSPInstance or from the legacy (points, dist) pair.
+Usage:
+    instance = TSPInstance.from_tsplib("TSP/data/EUC_2D/100_nodes/kroA100.tsp", backend="matrix")
+    path = nearest_neighbor_second(instance)
+    best_solution, best_cost = iterated_local_search(instance, 100)
+    Every function that accepts (points, dist) also accepts (instance) alone; the legacy list of points
+    is still available as instance.points (a new list at every access).
+'''
+import os
+import numpy as np
+
+from .tsp_utils import read_tsplib_problem
+from .instance_cache import DEFAULT_CACHE_DIR
+
+class TSPInstance:
+    """
+    Immutable TSP instance, shareable between threads and between consecutive runs of the algorithms.
+    Attributes:
+        coords (numpy.ndarray): The read-only coordinates of the nodes, shape (n, 2) (int64 or float).
+        dist: The distances between the nodes, in any backend (dict, matrix, DistanceOracle, ...).
+        n (int): The number of nodes.
+        name (str or None): The name of the instance.
+        edge_weight_type (str or None): The metric of the instance (EUC_2D, GEO, EXPLICIT, ...).
+    The derived data structures (for example the candidate lists) are computed lazily with get_index
+    and stored in the instance, so they are computed only once per instance.
+    """
+    __slots__ = ("coords", "dist", "n", "name", "edge_weight_type", "_indexes")
+
+    def __init__(self, coords, dist, name=None, edge_weight_type=None):
+        """
+        Args:
+            coords (array-like): The coordinates of the nodes, shape (n, 2).
+            dist: The distances between the nodes (dictionary keyed by (i, j) or dense backend).
+            name (str, optional): The name of the instance.
+            edge_weight_type (str, optional): The metric of the instance.
+        """
+        coords = np.array(coords)
+        if not np.issubdtype(coords.dtype, np.integer):
+            coords = coords.astype(float)  # Le coordinate intere restano intere, come in readTSPLIB
+        coords.flags.writeable = False
+        object.__setattr__(self, "coords", coords)
+        object.__setattr__(self, "dist", dist)
+        object.__setattr__(self, "n", coords.shape[0])
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "edge_weight_type", edge_weight_type)
+        object.__setattr__(self, "_indexes", {})
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"TSPInstance è immutabile: impossibile modificare l'attributo {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"TSPInstance è immutabile: impossibile eliminare l'attributo {name}")
+
+    def __len__(self):
+        return self.n
+
+    def __repr__(self):
+        return f"TSPInstance(name={self.name!r}, n={self.n}, edge_weight_type={self.edge_weight_type!r})"
+
+    @classmethod
+    def from_tsplib(cls, file_path, backend="dict", use_cache=False, cache_dir=DEFAULT_CACHE_DIR, compact=False):
+        """
+        Reads a TSPLIB file into a TSPInstance.
+        Args:
+            file_path (str): The path to the TSPLIB file.
+            backend, use_cache, cache_dir, compact: See readTSPLIB.
+        Returns:
+            TSPInstance: The instance.
+        """
+        problem, points, dist = read_tsplib_problem(file_path, backend, use_cache, cache_dir, compact)
+        name = problem["name"] or os.path.splitext(os.path.basename(str(file_path)))[0]
+        return cls([point[0] for point in points], dist, name, problem["edge_weight_type"])
+
+    @classmethod
+    def from_points(cls, points, dist, name=None, edge_weight_type=None):
+        """
+        Builds a TSPInstance from the legacy list of ((x, y), visited) tuples (the visited flags are ignored).
+        Args:
+            points (list): A list of points where each point is a tuple (coordinate, visited_flag).
+            dist: The distances between the nodes.
+            name (str, optional): The name of the instance.
+            edge_weight_type (str, optional): The metric of the instance.
+        Returns:
+            TSPInstance: The instance.
+        """
+        return cls([point[0] for point in points], dist, name, edge_weight_type)
+
+    @property
+    def points(self):
+        """
+        The legacy list of ((x, y), False) tuples. A new list is built at every access, so the functions
+        that still mark the points as visited never modify the instance.
+        """
+        return [((x, y), False) for x, y in self.coords[:, :2].tolist()]
+
+    def get_index(self, key, factory):
+        """
+        Returns a derived data structure of the instance, computing it with factory(instance) on the first request.
+        If two threads request it at the same time both may compute it, but only one result is kept.
+        Args:
+            key (hashable): The name of the data structure (for example ("candidates", 10)).
+            factory (function): The function that computes it from the instance.
+        Returns:
+            The data structure.
+        """
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes.setdefault(key, factory(self))
+        return index
+
+def load_instance(source, backend="dict", use_cache=False, cache_dir=DEFAULT_CACHE_DIR, compact=False):
+    """
+    Returns a TSPInstance from a TSPInstance (returned unchanged) or from the path of a TSPLIB file.
+    It lets the solvers accept either of them.
+    Args:
+        source (TSPInstance or str): The instance or the path to the TSPLIB file.
+        backend, use_cache, cache_dir, compact: See readTSPLIB (ignored if source is already an instance).
+    Returns:
+        TSPInstance: The instance.
+    """
+    if isinstance(source, TSPInstance):
+        return source
+    return TSPInstance.from_tsplib(source, backend, use_cache, cache_dir, compact)
+
+def resolve_instance(points, dist=None):
+    """
+    Returns the number of nodes and the distances from a TSPInstance or from the legacy (points, dist) pair.
+    Args:
+        points (TSPInstance or list): The instance, or the list of points.
+        dist (optional): The distances; if None, the ones of the instance are used.
+    Returns:
+        tuple: The number of nodes and the distances.
+    Raises:
+        ValueError: If the distances are missing.
+    """
+    if isinstance(points, TSPInstance):
+        return points.n, points.dist if dist is None else dist
+    if dist is None:
+        raise ValueError("Distanze mancanti: passare dist oppure una TSPInstance")
+    return len(points), dist
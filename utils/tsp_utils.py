@@ -8,10 +8,15 @@ import math
 import random
 from csv import reader
 import matplotlib.pyplot as plt
+import numpy as np
 import tsplib95 
 import os
 import shutil
 
+from .distances import to_backend, distance_matrix, compact_matrix, DistanceOracle, TriangularDistances, BACKENDS
+from .tsplib_parser import parse_tsplib, weight_matrix
+from .instance_cache import load_cached_instance, load_memmap_instance, DEFAULT_CACHE_DIR
+
 
 
 def plot_selectedEdges2D(points, edges, selectededges=[], title="", figsize=(12, 12), save_fig=None):
@@ -77,40 +82,53 @@ def read_csv_points(file_path, sep=',', has_headers=True, dtype=float):
 
     return points
 
-def EuclDist(points):
+def EuclDist(points, backend="dict"):
     """
     generates a dictionary of Euclidean distances between pairs of points    
 
     Parameters
     ----------
     points : list of pair of coordinates
+    backend : "dict" (default) for a dictionary keyed by (i, j), 
+              "matrix" for a dense numpy.ndarray of shape (n, n)
 
     """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend non valido: {backend}. Valori ammessi: {BACKENDS}")
+    # Tutte le distanze in un colpo solo tramite broadcasting
+    coords = [point[:2] for point in points]
+    matrix = distance_matrix(coords, "EUCLIDEAN")
+    if backend == "matrix":
+        return matrix
     # Dictionary of Euclidean distance between each pair of points
-    dist = {(i, j):
-            math.sqrt(sum((points[i][k]-points[j][k])**2 for k in range(2)))
+    rows = matrix.tolist()
+    dist = {(i, j): rows[i][j]
             for i in range(len(points)) for j in range(len(points))}
             #for i in range(len(points)) for j in range(i)}
     return dist        
 
-def randomEuclGraph (n, maxcoord):
+def randomEuclGraph (n, maxcoord, backend="dict"):
     """
     generates an instance of an Euclidean graph
     Parameters
     ----------
     n number of vertices
     maxcoord maximum value of a coordinate of a vertex
+    backend "dict" (default) or "matrix", see EuclDist
     """
     points = [(random.randint(0, maxcoord), random.randint(0, maxcoord)) for i in range(n)]    
-    dist = EuclDist(points)
+    dist = EuclDist(points, backend=backend)
         
     # Adesso aggiungo che ogni punto ha un flag che indica se è stato visitato o meno
     for i in range(n):
         points[i] = (points[i], False)
     
     # Modifico le distanze in modo che abbiano al più due cifre decimali
-    for key in dist.keys():
-        dist[key] = round(dist[key], 2)
+    if backend == "matrix":
+        dist = np.round(dist, 2)
+    else:
+        for key in dist.keys():
+            dist[key] = round(dist[key], 2)
     
     
     return points, dist
@@ -208,40 +226,98 @@ def randomGraph2D (n, p):
     
 #     return n, points, dist
 
-def readTSPLIB(file_path):
+def readTSPLIB(file_path, backend="dict", use_cache=False, cache_dir=DEFAULT_CACHE_DIR, compact=False):
     """
     Reads a TSPLIB file and extracts the problem's dimension, node coordinates, and edge weights.
     
     Args:
         file_path (str): The path to the TSPLIB file.
+        backend (str, optional): "dict" (default) to obtain a dictionary keyed by (i, j),
+                                 "matrix" to obtain a dense numpy.ndarray of shape (n, n) with zeros on the diagonal,
+                                 "memmap" to obtain the same matrix as a read-only numpy.memmap stored in cache_dir
+                                 (it's materialized once and shared between processes through the OS page cache),
+                                 "oracle" to obtain a DistanceOracle, which keeps only the coordinates and computes
+                                 the distances on demand (for instances too large for an (n, n) matrix),
+                                 "triangular" to obtain a TriangularDistances, which stores only the upper triangle
+                                 of the (symmetric) matrix with the compact type of compact_dtype.
+        use_cache (bool, optional): If True, the parsed instance is loaded from (or stored in) the binary cache
+                                    in cache_dir, keyed by the hash of the file. Default is False.
+        cache_dir (str, optional): The directory of the cache. Default is "TSP/outputs/cache".
+        compact (bool, optional): If True, the "matrix" backend stores the distances as int32 instead of int64
+                                  (non-integral weights become float32 only if they are exactly representable,
+                                  see compact_dtype). Default is False.
     
     Returns:
         tuple: A tuple containing:
             - n (int): The number of nodes in the TSP problem.
             - points (list): A list of coordinates for each node (or generated ones if not available).
-            - dist (dict): A dictionary where keys are tuples representing edges (i, j)
-                           and values are the weights of those edges.
+            - dist (dict or numpy.ndarray): A dictionary where keys are tuples representing edges (i, j)
+                           and values are the weights of those edges, or the equivalent dense matrix.
+    Raises:
+        ValueError: If backend="oracle" is requested for an instance without coordinates (e.g. EXPLICIT),
+                    or backend="triangular" for an asymmetric instance.
     """
-    problem = tsplib95.load(file_path)
-    n = problem.dimension  # Numero di nodi
+    problem, points, dist = read_tsplib_problem(file_path, backend, use_cache, cache_dir, compact)
+    return problem["dimension"], points, dist
+
+def read_tsplib_problem(file_path, backend="dict", use_cache=False, cache_dir=DEFAULT_CACHE_DIR, compact=False):
+    """
+    Reads a TSPLIB file like readTSPLIB, but returns the specification of the problem instead of its dimension.
+    It is used to build a TSPInstance, which also keeps the name and the EDGE_WEIGHT_TYPE of the instance.
+    Args:
+        file_path (str): The path to the TSPLIB file.
+        backend, use_cache, cache_dir, compact: See readTSPLIB.
+    Returns:
+        tuple: A tuple containing:
+            - problem (dict): The specification of the problem, as returned by parse_tsplib.
+            - points (list): A list of coordinates for each node (or generated ones if not available).
+            - dist: The distances in the requested backend.
+    Raises:
+        ValueError: See readTSPLIB.
+    """
+    if backend == "oracle":
+        # Nessuna matrice: solo le coordinate e la metrica, le distanze si calcolano su richiesta
+        problem = parse_tsplib(file_path)
+        if problem["edge_weight_type"] == "EXPLICIT" or problem["node_coords"] is None:
+            raise ValueError(f"Il backend oracle richiede le coordinate dei nodi: {file_path} non valido")
+        points = [((x, y), False) for x, y in problem["node_coords"][:, :2].tolist()]
+        return problem, points, DistanceOracle(problem["node_coords"], problem["edge_weight_type"])
+
+    # Il parser nativo legge coordinate e pesi in un solo passaggio, senza chiamare get_weight n² volte
+    if backend == "memmap":
+        # La matrice mappata in memoria vive sempre nella cache, accanto alla voce dell'istanza
+        problem, matrix = load_memmap_instance(file_path, cache_dir)
+    elif use_cache:
+        problem, matrix = load_cached_instance(file_path, cache_dir)
+    else:
+        problem = parse_tsplib(file_path)
+        matrix = weight_matrix(problem)
+    n = problem["dimension"]  # Numero di nodi
     
     # Estrai le coordinate dei nodi (se disponibili)
-    if problem.node_coords:
-        points = [((x, y), False) for x, y in problem.node_coords.values()]
-    elif problem.display_data:
-        points = [((x, y), False) for x, y in problem.display_data.values()]
+    if problem["node_coords"] is not None:
+        points = [((x, y), False) for x, y in problem["node_coords"][:, :2].tolist()]
+    elif problem["display_data"] is not None:
+        points = [((x, y), False) for x, y in problem["display_data"][:, :2].tolist()]
     else:
         # Genera coordinate fittizie se non disponibili
         points = [((i, i), False) for i in range(n)]
     
-    # Estrai le distanze (usando tsplib95.get_weight)
-    dist = {}
-    for i in range(1, n + 1):  # TSPLIB usa nodi indicizzati da 1
-        for j in range(1, n + 1):
-            if i != j:  # Ignora i loop
-                dist[(i - 1, j - 1)] = problem.get_weight(i, j)
+    # Le distanze sono una matrice (n, n), con la diagonale a 0
+    if backend == "triangular":
+        # Per le istanze simmetriche basta il triangolo superiore
+        if not np.array_equal(matrix, matrix.T):
+            raise ValueError(f"Il backend triangular richiede un'istanza simmetrica: {file_path} non valido")
+        return problem, points, TriangularDistances.from_matrix(matrix)
+    if backend == "matrix" and compact:
+        return problem, points, compact_matrix(matrix)
+    if backend in ("matrix", "memmap"):
+        return problem, points, matrix
+
+    rows = matrix.tolist()
+    dist = {(i, j): rows[i][j] for i in range(n) for j in range(n) if i != j}  # Ignora i loop
     
-    return n, points, dist
+    return problem, points, to_backend(dist, backend, n)
 
 def read_optimal_tour(file_path):
     """
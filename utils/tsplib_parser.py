@@ -0,0 +1,239 @@
+'''
+This module provides a native parser for TSPLIB files, used by readTSPLIB instead of tsplib95.
+tsplib95 exposes the weights one pair at a time through problem.get_weight(i, j), so reading an instance costs n²
+Python calls before any solver runs. This parser reads the file in a single pass and stores the coordinates
+and the explicit weights directly into numpy arrays.
+Functions:
+    parse_tsplib(file_path):
+        Parses a TSPLIB file and returns its specification, coordinates and explicit weights.
+    explicit_weight_matrix(values, n, edge_weight_format):
+        Builds the full (n, n) weight matrix from the values of an EDGE_WEIGHT_SECTION.
+    weight_matrix(problem):
+        Returns the full (n, n) weight matrix of a parsed problem, for every EDGE_WEIGHT_TYPE.
+Supported sections:
+    - NODE_COORD_SECTION (2D and 3D coordinates)
+    - DISPLAY_DATA_SECTION
+    - EDGE_WEIGHT_SECTION with every EDGE_WEIGHT_FORMAT (FULL_MATRIX, UPPER_ROW, LOWER_ROW, UPPER_DIAG_ROW,
+      LOWER_DIAG_ROW, UPPER_COL, LOWER_COL, UPPER_DIAG_COL, LOWER_DIAG_COL)
+    Other sections (FIXED_EDGES_SECTION, TOUR_SECTION, ...) are skipped.
+Usage:
+    problem = parse_tsplib("TSP/data/EXPLICIT/1000_nodes/pa561.tsp")
+    dist = weight_matrix(problem)
+    The weights are the same ones returned by tsplib95 (the loops (i, i) are set to 0).
+    The coordinate metrics are computed with the vectorized kernels of distances.py.
+'''
+import numpy as np
+from tsplib95.distances import TYPES
+
+from .distances import KERNELS, distance_matrix
+
+# Formati triangolari: (includes_diagonal, upper). I formati "COL" di un triangolo
+# corrispondono ai formati "ROW" del triangolo opposto letti per colonne.
+TRIANGULAR_FORMATS = {
+    "UPPER_ROW": (False, True),
+    "LOWER_ROW": (False, False),
+    "UPPER_DIAG_ROW": (True, True),
+    "LOWER_DIAG_ROW": (True, False),
+    "UPPER_COL": (False, False),
+    "LOWER_COL": (False, True),
+    "UPPER_DIAG_COL": (True, False),
+    "LOWER_DIAG_COL": (True, True),
+}
+
+# Sezioni i cui dati sono terminati da -1 e che non servono al calcolo delle distanze
+SKIPPED_SECTIONS = {"FIXED_EDGES_SECTION", "TOUR_SECTION", "EDGE_DATA_SECTION", "DEPOT_SECTION", "DEMAND_SECTION"}
+
+def _read_numbers(lines, start, count):
+    """
+    Reads `count` numbers from the lines following `start`, regardless of how they are split across the lines.
+    Args:
+        lines (list): The lines of the file.
+        start (int): The index of the first line to read.
+        count (int): The number of values to read.
+    Returns:
+        tuple: The values as a numpy array of floats and the index of the first line not consumed.
+    """
+    tokens = []
+    index = start
+    while len(tokens) < count and index < len(lines):
+        line = lines[index].strip()
+        if line == "EOF":
+            break
+        tokens.extend(line.split())
+        index += 1
+    if len(tokens) < count:
+        raise ValueError(f"Sezione incompleta: attesi {count} valori, trovati {len(tokens)}")
+    return np.array(tokens[:count], dtype=float), index
+
+def _read_coordinates(lines, start, n):
+    """
+    Reads the n lines of a NODE_COORD_SECTION or DISPLAY_DATA_SECTION.
+    Each line contains the index of the node (starting from 1) followed by its coordinates.
+    Args:
+        lines (list): The lines of the file.
+        start (int): The index of the first line of the section.
+        n (int): The number of nodes.
+    Returns:
+        tuple: The coordinates as a numpy array of shape (n, dimensions), ordered by node index,
+               and the index of the first line not consumed. As in tsplib95, the coordinates are integers
+               (int64) when every value is written as an integer, floats otherwise.
+    """
+    rows = [line.split() for line in lines[start:start + n]]
+    if len(rows) < n or any(len(row) < 3 for row in rows):
+        raise ValueError("Sezione delle coordinate incompleta")
+    try:
+        values = np.array(rows, dtype=np.int64)
+    except ValueError:
+        values = np.array(rows, dtype=float)  # Almeno un valore non è scritto come intero (es. "565.0")
+    coords = np.empty((n, values.shape[1] - 1), dtype=values.dtype)
+    coords[values[:, 0].astype(np.int64) - 1] = values[:, 1:]  # TSPLIB usa nodi indicizzati da 1
+    return coords, start + n
+
+def parse_tsplib(file_path):
+    """
+    Parses a TSPLIB file in a single pass.
+    Args:
+        file_path (str): The path to the TSPLIB file.
+    Returns:
+        dict: A dictionary containing:
+            - name (str), type (str), comment (str): The descriptive fields of the file.
+            - dimension (int): The number of nodes.
+            - edge_weight_type (str): The metric of the instance (EUC_2D, GEO, ATT, EXPLICIT, ...).
+            - edge_weight_format (str or None): The format of the EDGE_WEIGHT_SECTION.
+            - node_coords (numpy.ndarray or None): The coordinates of the nodes, shape (n, 2) or (n, 3)
+                                                   (int64 if they are all written as integers, float otherwise).
+            - display_data (numpy.ndarray or None): The coordinates used only to display the nodes.
+            - edge_weights (numpy.ndarray or None): The raw values of the EDGE_WEIGHT_SECTION.
+    Raises:
+        ValueError: If the file is malformed.
+    """
+    with open(file_path, "r") as file:
+        lines = file.read().splitlines()
+
+    problem = {
+        "name": None,
+        "type": None,
+        "comment": "",
+        "dimension": None,
+        "edge_weight_type": None,
+        "edge_weight_format": None,
+        "node_coords": None,
+        "display_data": None,
+        "edge_weights": None,
+    }
+
+    index = 0
+    while index < len(lines):
+        line = lines[index].strip()
+        index += 1
+        if not line:
+            continue
+        if line == "EOF":
+            break
+
+        key = line.split(":", 1)[0].strip().upper()
+        if ":" in line and not key.endswith("_SECTION"):
+            # Riga di specifica, es. "EDGE_WEIGHT_TYPE : EUC_2D"
+            value = line.split(":", 1)[1].strip()
+            if key == "DIMENSION":
+                problem["dimension"] = int(value)
+            elif key == "COMMENT":
+                problem["comment"] = (problem["comment"] + " " + value).strip()
+            elif key in ("NAME", "TYPE"):
+                problem[key.lower()] = value
+            elif key in ("EDGE_WEIGHT_TYPE", "EDGE_WEIGHT_FORMAT"):
+                problem[key.lower()] = value.upper()
+            continue
+
+        section = key.split()[0]
+        n = problem["dimension"]
+        if section == "NODE_COORD_SECTION":
+            problem["node_coords"], index = _read_coordinates(lines, index, n)
+        elif section == "DISPLAY_DATA_SECTION":
+            problem["display_data"], index = _read_coordinates(lines, index, n)
+        elif section == "EDGE_WEIGHT_SECTION":
+            count = _edge_weight_count(n, problem["edge_weight_format"])
+            problem["edge_weights"], index = _read_numbers(lines, index, count)
+        elif section in SKIPPED_SECTIONS:
+            # Salta i dati fino al terminatore -1
+            while index < len(lines) and lines[index].strip() not in ("-1", "EOF"):
+                index += 1
+            index += 1
+        else:
+            raise ValueError(f"Riga non riconosciuta nel file {file_path}: {line}")
+
+    if problem["dimension"] is None:
+        raise ValueError(f"Il file {file_path} non contiene il campo DIMENSION")
+    return problem
+
+def _edge_weight_count(n, edge_weight_format):
+    """
+    Returns the number of values contained in an EDGE_WEIGHT_SECTION of the given format.
+    """
+    if edge_weight_format == "FULL_MATRIX":
+        return n * n
+    if edge_weight_format in TRIANGULAR_FORMATS:
+        includes_diagonal, _ = TRIANGULAR_FORMATS[edge_weight_format]
+        return n * (n + 1) // 2 if includes_diagonal else n * (n - 1) // 2
+    raise ValueError(f"EDGE_WEIGHT_FORMAT non supportato: {edge_weight_format}")
+
+def explicit_weight_matrix(values, n, edge_weight_format):
+    """
+    Builds the full (n, n) weight matrix from the values of an EDGE_WEIGHT_SECTION.
+    The triangular formats are mirrored, so the resulting matrix is symmetric; the diagonal is set to 0.
+    Args:
+        values (numpy.ndarray): The values of the section, in the order they appear in the file.
+        n (int): The number of nodes.
+        edge_weight_format (str): The format of the section (FULL_MATRIX, UPPER_ROW, LOWER_DIAG_ROW, ...).
+    Returns:
+        numpy.ndarray: The weight matrix of shape (n, n).
+    """
+    if edge_weight_format == "FULL_MATRIX":
+        matrix = values.reshape(n, n).copy()
+    else:
+        includes_diagonal, upper = TRIANGULAR_FORMATS[edge_weight_format]
+        offset = 0 if includes_diagonal else 1
+        # triu_indices/tril_indices restituiscono gli indici riga per riga, nello stesso ordine del file
+        rows, cols = np.triu_indices(n, offset) if upper else np.tril_indices(n, -offset)
+        matrix = np.zeros((n, n), dtype=values.dtype)
+        matrix[rows, cols] = values
+        matrix[cols, rows] = values
+    np.fill_diagonal(matrix, 0)
+    return matrix
+
+def weight_matrix(problem):
+    """
+    Returns the full (n, n) weight matrix of a parsed problem, for every EDGE_WEIGHT_TYPE.
+    The values are stored as integers when all of them are integral, as tsplib95 does.
+    Args:
+        problem (dict): The problem returned by parse_tsplib.
+    Returns:
+        numpy.ndarray: The weight matrix of shape (n, n), with zeros on the diagonal.
+    Raises:
+        ValueError: If the EDGE_WEIGHT_TYPE is not supported or the needed section is missing.
+    """
+    n = problem["dimension"]
+    edge_weight_type = problem["edge_weight_type"]
+
+    if edge_weight_type == "EXPLICIT":
+        if problem["edge_weights"] is None:
+            raise ValueError("Istanza EXPLICIT senza EDGE_WEIGHT_SECTION")
+        matrix = explicit_weight_matrix(problem["edge_weights"], n, problem["edge_weight_format"])
+    elif edge_weight_type in KERNELS or edge_weight_type in TYPES:
+        coords = problem["node_coords"]
+        if coords is None:
+            raise ValueError(f"Istanza {edge_weight_type} senza NODE_COORD_SECTION")
+        if edge_weight_type in KERNELS:
+            # Kernel vettoriale: tutta la matrice in pochi millisecondi
+            return distance_matrix(coords, edge_weight_type)
+        # Metriche rare (es. XRAY) senza kernel vettoriale: funzione scalare di tsplib95
+        distance = TYPES[edge_weight_type]
+        points = [tuple(point) for point in coords.tolist()]
+        matrix = np.array([[distance(points[i], points[j]) if i != j else 0 for j in range(n)]
+                           for i in range(n)], dtype=float)
+    else:
+        raise ValueError(f"EDGE_WEIGHT_TYPE non supportato: {edge_weight_type}")
+
+    if np.all(matrix == np.round(matrix)):
+        return matrix.astype(np.int64)
+    return matrix